@@ -0,0 +1,57 @@
+"""Benchmark recursive_chunks on synthetic documents from 1 MB to 100 MB.
+
+Throughput (MB/s) should stay roughly flat as the input grows, which is
+what linear scaling looks like.
+
+Usage:
+    python -m benchmarks.chunker_scaling
+    python -m benchmarks.chunker_scaling --sizes 1 5 10 --chunk-size 1024
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from src.ingestion.chunker import recursive_chunks
+
+_WORDS = (
+    "enterprise document retrieval graph vector embedding policy contract "
+    "revenue quarter report customer service pipeline latency index"
+).split()
+
+
+def synthetic_text(size_bytes: int, seed: int = 0) -> str:
+    """Paragraphs of sentences of words, with the occasional over-long paragraph."""
+    rng = random.Random(seed)
+    paragraphs: list[str] = []
+    total = 0
+    while total < size_bytes:
+        sentences = rng.randint(2, 40)
+        paragraph = " ".join(
+            " ".join(rng.choices(_WORDS, k=rng.randint(5, 20))).capitalize() + "." for _ in range(sentences)
+        )
+        paragraphs.append(paragraph)
+        total += len(paragraph) + 2
+    return "\n\n".join(paragraphs)[:size_bytes]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 25, 50, 100], help="Input sizes in MB")
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--overlap", type=int, default=64)
+    args = parser.parse_args()
+
+    print(f"{'size (MB)':>10} {'chunks':>10} {'seconds':>10} {'MB/s':>10}")
+    for size_mb in args.sizes:
+        text = synthetic_text(size_mb * 1024 * 1024)
+        start = time.perf_counter()
+        chunks = recursive_chunks(text, chunk_size=args.chunk_size, overlap=args.overlap)
+        elapsed = time.perf_counter() - start
+        print(f"{size_mb:>10} {len(chunks):>10} {elapsed:>10.2f} {size_mb / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
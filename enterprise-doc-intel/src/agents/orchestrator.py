@@ -3,16 +3,14 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Iterator
 from dataclasses import dataclass, field
 
-from ollama import Client
-
 from src.agents.planner import decompose_query
 from src.agents.tools import Tool, build_tools
 from src.config import settings
 from src.knowledge_graph.neo4j_client import Neo4jClient
-
-_client = Client(host=settings.ollama_base_url, timeout=settings.ollama_timeout)
+from src.llm import INTERACTIVE, gateway
 from src.vectorstore.chroma import ChromaStore
 
 logger = logging.getLogger(__name__)
@@ -64,6 +62,21 @@ def run_agent(
     2. Execute: Run each step, calling the appropriate tool.
     3. Synthesize: Combine all observations into a final answer.
     """
+    for event in iter_agent(question, chroma, neo4j):
+        if isinstance(event, AgentResult):
+            return event
+    raise AssertionError("unreachable")
+
+
+def iter_agent(
+    question: str,
+    chroma: ChromaStore,
+    neo4j: Neo4jClient | None = None,
+) -> Iterator[AgentStep | AgentResult]:
+    """Run the agent like run_agent, yielding each AgentStep as it completes.
+
+    The last item yielded is the AgentResult.
+    """
     tools = build_tools(chroma, neo4j)
     tool_map = {t.name: t for t in tools}
     tool_descriptions = "\n".join(f"- {t.name}: {t.description}" for t in tools)
@@ -91,14 +104,14 @@ def run_agent(
                 logger.exception("Tool %s failed", tool_name)
                 observation = f"Error: tool '{tool_name}' failed to execute."
 
-        steps.append(
-            AgentStep(
-                thought=reason,
-                tool=tool_name,
-                tool_input=tool_input,
-                observation=observation[:2000],  # Limit observation size
-            )
+        step = AgentStep(
+            thought=reason,
+            tool=tool_name,
+            tool_input=tool_input,
+            observation=observation[:2000],  # Limit observation size
         )
+        steps.append(step)
+        yield step
 
     # 3. Synthesize
     observations_text = "\n\n".join(
@@ -107,7 +120,7 @@ def run_agent(
     )
 
     try:
-        response = _client.chat(
+        response = gateway.chat(
             model=settings.ollama_model,
             messages=[
                 {
@@ -119,10 +132,11 @@ def run_agent(
                 }
             ],
             options={"temperature": 0.1},
+            priority=INTERACTIVE,
         )
         answer = response["message"]["content"]
     except Exception as exc:
         logger.error("Agent synthesis failed: %s", exc)
         answer = "I collected research but could not generate a synthesis. Please try again."
 
-    return AgentResult(answer=answer, steps=steps)
+    yield AgentResult(answer=answer, steps=steps)
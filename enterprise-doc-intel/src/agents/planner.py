@@ -5,11 +5,8 @@ from __future__ import annotations
 import json
 import logging
 
-from ollama import Client
-
 from src.config import settings
-
-_client = Client(host=settings.ollama_base_url, timeout=settings.ollama_timeout)
+from src.llm import INTERACTIVE, gateway
 
 logger = logging.getLogger(__name__)
 
@@ -53,10 +50,11 @@ def decompose_query(question: str, tool_descriptions: str) -> list[dict]:
     )
 
     try:
-        response = _client.chat(
+        response = gateway.chat(
             model=settings.ollama_model,
             messages=[{"role": "user", "content": prompt}],
             options={"temperature": 0.0},
+            priority=INTERACTIVE,
         )
     except Exception as exc:
         logger.error("Ollama planner call failed: %s", exc)
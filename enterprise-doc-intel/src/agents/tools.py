@@ -6,12 +6,10 @@ import logging
 from dataclasses import dataclass
 from typing import Callable
 
-from ollama import Client
-
 from src.config import settings
 
-_client = Client(host=settings.ollama_base_url, timeout=settings.ollama_timeout)
 from src.knowledge_graph.neo4j_client import Neo4jClient
+from src.llm import INTERACTIVE, gateway
 from src.rag.retriever import retrieve
 from src.vectorstore.chroma import ChromaStore
 
@@ -46,13 +44,14 @@ def search_documents(query: str, *, chroma: ChromaStore, neo4j: Neo4jClient | No
 
 def query_knowledge_graph(entity: str, *, neo4j: Neo4jClient) -> str:
     """Query the knowledge graph for information about an entity."""
-    neighbors = neo4j.get_neighbors(entity, max_hops=2)
-    if not neighbors:
-        # Try searching
-        matches = neo4j.search_entities(entity, limit=5)
-        if not matches:
-            return f"No information found about '{entity}' in the knowledge graph."
-        return f"Related entities: {', '.join(m['name'] for m in matches)}"
+    with neo4j.session():
+        neighbors = neo4j.get_neighbors(entity, max_hops=2)
+        if not neighbors:
+            # Try searching
+            matches = neo4j.search_entities(entity, limit=5)
+            if not matches:
+                return f"No information found about '{entity}' in the knowledge graph."
+            return f"Related entities: {', '.join(m['name'] for m in matches)}"
 
     lines = [f"Neighbors of '{entity}':"]
     for n in neighbors[:15]:
@@ -64,12 +63,13 @@ def query_knowledge_graph(entity: str, *, neo4j: Neo4jClient) -> str:
 def summarize(text: str) -> str:
     """Summarize a long piece of text using the LLM."""
     try:
-        response = _client.chat(
+        response = gateway.chat(
             model=settings.ollama_model,
             messages=[
                 {"role": "user", "content": f"Summarize the following text concisely:\n\n{text[:4000]}"},
             ],
             options={"temperature": 0.1},
+            priority=INTERACTIVE,
         )
         return response["message"]["content"]
     except Exception as exc:
@@ -1,12 +1,16 @@
 """FastAPI application — Enterprise Document Intelligence Platform."""
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
 from src.api.routes import graph, health, ingest, query
+from src.config import settings
+from src.knowledge_graph.entity_index import load_entity_index
 from src.knowledge_graph.neo4j_client import Neo4jClient
+from src.llm import gateway
 from src.vectorstore.chroma import ChromaStore
 
 logger = logging.getLogger(__name__)
@@ -17,6 +21,14 @@ logging.basicConfig(level=logging.INFO, format="%(levelname)s | %(name)s | %(mes
 async def lifespan(application: FastAPI):
     """Manage shared client instances across the app lifetime."""
     # Startup: create shared clients
+    # Routes are async: LLM calls are awaited on the shared gateway, and the
+    # blocking Chroma/Neo4j/embedding calls run on a dedicated thread pool.
+    application.state.llm = gateway
+    application.state.executor = ThreadPoolExecutor(
+        max_workers=settings.api_blocking_workers, thread_name_prefix="api-io"
+    )
+    # Agent runs hold api-io threads for minutes; health checks get their own.
+    application.state.health_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="api-health")
     application.state.chroma = ChromaStore()
     logger.info("ChromaDB client initialized")
 
@@ -26,6 +38,15 @@ async def lifespan(application: FastAPI):
     except Exception:
         application.state.neo4j = None
         logger.warning("Neo4j not available, proceeding without knowledge graph")
+    else:
+        try:
+            application.state.neo4j.ensure_schema()
+        except Exception:
+            logger.exception("Could not bootstrap the knowledge graph schema; lookups may be slow")
+        try:
+            load_entity_index(application.state.neo4j)
+        except Exception:
+            logger.exception("Could not load the entity name index; it will load on the first query")
 
     yield
 
@@ -33,6 +54,10 @@ async def lifespan(application: FastAPI):
     if application.state.neo4j is not None:
         application.state.neo4j.close()
         logger.info("Neo4j client closed")
+    application.state.executor.shutdown(wait=False, cancel_futures=True)
+    application.state.health_executor.shutdown(wait=False, cancel_futures=True)
+    await gateway.aclose()
+    gateway.close()
 
 
 app = FastAPI(
@@ -0,0 +1,33 @@
+"""Run the blocking Chroma, Neo4j and embedding clients from async routes."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+from collections.abc import AsyncIterator, Callable, Iterator
+from typing import Any, TypeVar
+
+from fastapi import Request
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+async def run_blocking(request: Request, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """Call fn on the app's I/O executor so the event loop keeps serving other requests.
+
+    Falls back to the loop's default executor when the app has none.
+    """
+    executor = getattr(request.app.state, "executor", None)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+
+async def iterate_blocking(request: Request, iterator: Iterator[T]) -> AsyncIterator[T]:
+    """Advance a blocking iterator on the I/O executor, one item at a time."""
+    while True:
+        item = await run_blocking(request, next, iterator, _DONE)
+        if item is _DONE:
+            return
+        yield item
@@ -9,12 +9,19 @@ from pydantic import BaseModel, Field
 
 class IngestRequest(BaseModel):
     data_dir: str = Field(default="./data/sample_docs", description="Directory containing documents to ingest")
+    incremental: bool = Field(
+        default=False,
+        description="Only process files that are new or changed since the last incremental ingest",
+    )
 
 
 class IngestResponse(BaseModel):
     documents: int
     chunks: int
     entities: int
+    unchanged: int = 0
+    removed: int = 0
+    duplicates: int = 0
 
 
 class QueryRequest(BaseModel):
@@ -24,6 +31,14 @@ class QueryRequest(BaseModel):
         description="Query mode: 'rag' for simple retrieval, 'agent' for multi-step reasoning",
     )
     top_k: int = Field(default=5, ge=1, le=20, description="Number of documents to retrieve")
+    bypass_cache: bool = Field(
+        default=False,
+        description="Always run the full RAG pipeline instead of reusing a cached answer",
+    )
+    stream: bool = Field(
+        default=False,
+        description="Stream events as NDJSON, or as Server-Sent Events with 'Accept: text/event-stream'",
+    )
 
 
 class SourceInfo(BaseModel):
@@ -37,6 +52,7 @@ class QueryResponse(BaseModel):
     sources: list[SourceInfo] = Field(default_factory=list)
     graph_context: str = ""
     agent_steps: list[dict] = Field(default_factory=list)
+    cached: bool = False
 
 
 class EntityResponse(BaseModel):
@@ -67,6 +83,21 @@ class GraphSubgraphResponse(BaseModel):
     edges: list[GraphEdgeResponse]
 
 
+class CacheStatsResponse(BaseModel):
+    enabled: bool
+    entries: int = 0
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    hit_rate: float = 0.0
+    generation: int | None = None
+
+
+class QueryCacheStatsResponse(BaseModel):
+    embeddings: dict[str, CacheStatsResponse] = Field(default_factory=dict)  # by tier: memory, disk
+    answers: CacheStatsResponse | None = None
+
+
 class HealthResponse(BaseModel):
     status: str
     chroma_docs: int = 0
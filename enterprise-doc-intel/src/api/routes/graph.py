@@ -1,9 +1,55 @@
+import threading
+from collections.abc import Callable, Hashable
+from typing import Any
+
 from fastapi import APIRouter, HTTPException, Query, Request
 
-from src.api.models import EntityResponse, GraphEdgeResponse, GraphNodeResponse, GraphSubgraphResponse, NeighborResponse
+from src.api.concurrency import run_blocking
+from src.api.models import (
+    CacheStatsResponse,
+    EntityResponse,
+    GraphEdgeResponse,
+    GraphNodeResponse,
+    GraphSubgraphResponse,
+    NeighborResponse,
+)
+from src.cache import TTLCache, corpus_generation
+from src.config import settings
 
 router = APIRouter(prefix="/graph")
 
+# Neo4j results by (route, params, corpus generation), created on first use.
+# An ingest bumps the generation, so earlier entries are never served again.
+_cache: TTLCache | None = None
+_cache_lock = threading.Lock()
+
+
+def _get_cache() -> TTLCache | None:
+    global _cache
+    if _cache is None and settings.graph_cache_enabled:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TTLCache(settings.graph_cache_max_entries, ttl=settings.graph_cache_ttl)
+    return _cache
+
+
+def reset_graph_cache() -> None:
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
+def _cached(route: str, params: tuple[Hashable, ...], load: Callable[[], Any]) -> Any:
+    cache = _get_cache()
+    if cache is None:
+        return load()
+    key = (route, params, corpus_generation.value)
+    result = cache.get(key)
+    if result is None:
+        result = load()
+        cache.put(key, result)
+    return result
+
 
 def _require_neo4j(request: Request):
     neo4j = request.app.state.neo4j
@@ -13,23 +59,27 @@ def _require_neo4j(request: Request):
 
 
 @router.get("/entities", response_model=list[EntityResponse])
-def list_entities(request: Request, limit: int = 100) -> list[EntityResponse]:
+async def list_entities(request: Request, limit: int = 100) -> list[EntityResponse]:
     neo4j = _require_neo4j(request)
-    entities = neo4j.get_all_entities(limit=limit)
+    entities = await run_blocking(request, _cached, "entities", (limit,), lambda: neo4j.get_all_entities(limit=limit))
     return [EntityResponse(name=e["name"], labels=e["labels"]) for e in entities]
 
 
 @router.get("/neighbors/{entity}", response_model=list[NeighborResponse])
-def get_neighbors(request: Request, entity: str, max_hops: int = Query(default=2, ge=1, le=4)) -> list[NeighborResponse]:
+async def get_neighbors(
+    request: Request, entity: str, max_hops: int = Query(default=2, ge=1, le=4)
+) -> list[NeighborResponse]:
     neo4j = _require_neo4j(request)
-    neighbors = neo4j.get_neighbors(entity, max_hops=max_hops)
+    neighbors = await run_blocking(
+        request, _cached, "neighbors", (entity, max_hops), lambda: neo4j.get_neighbors(entity, max_hops=max_hops)
+    )
     if not neighbors:
         raise HTTPException(status_code=404, detail=f"Entity '{entity}' not found")
     return [NeighborResponse(name=n["name"], labels=n["labels"], distance=n["distance"]) for n in neighbors]
 
 
 @router.get("/subgraph/{entity}", response_model=GraphSubgraphResponse)
-def get_subgraph(
+async def get_subgraph(
     request: Request,
     entity: str,
     max_hops: int = Query(default=2, ge=1, le=4),
@@ -37,11 +87,17 @@ def get_subgraph(
     edge_limit: int = Query(default=400, ge=1, le=2000),
 ) -> GraphSubgraphResponse:
     neo4j = _require_neo4j(request)
-    result = neo4j.get_subgraph(
-        entity,
-        max_hops=max_hops,
-        node_limit=node_limit,
-        edge_limit=edge_limit,
+    result = await run_blocking(
+        request,
+        _cached,
+        "subgraph",
+        (entity, max_hops, node_limit, edge_limit),
+        lambda: neo4j.get_subgraph(
+            entity,
+            max_hops=max_hops,
+            node_limit=node_limit,
+            edge_limit=edge_limit,
+        ),
     )
     if not result["nodes"]:
         raise HTTPException(status_code=404, detail=f"Entity '{entity}' not found")
@@ -50,3 +106,17 @@ def get_subgraph(
         nodes=[GraphNodeResponse(**node) for node in result["nodes"]],
         edges=[GraphEdgeResponse(**edge) for edge in result["edges"]],
     )
+
+
+@router.get("/cache", response_model=CacheStatsResponse)
+async def cache_stats() -> CacheStatsResponse:
+    """Hit-rate metrics of the /graph response cache."""
+    cache = _get_cache()
+    if cache is None:
+        return CacheStatsResponse(enabled=False, generation=corpus_generation.value)
+    return CacheStatsResponse(
+        enabled=True,
+        entries=len(cache),
+        generation=corpus_generation.value,
+        **cache.stats.as_dict(),
+    )
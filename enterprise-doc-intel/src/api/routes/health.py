@@ -1,3 +1,5 @@
+import asyncio
+
 from fastapi import APIRouter, Request
 
 from src.api.models import HealthResponse
@@ -6,12 +8,14 @@ router = APIRouter()
 
 
 @router.get("/health", response_model=HealthResponse)
-def health_check(request: Request) -> HealthResponse:
+async def health_check(request: Request) -> HealthResponse:
     chroma = request.app.state.chroma
     neo4j = request.app.state.neo4j
 
+    # Not run_blocking: the shared I/O executor can be full of long agent runs.
+    executor = getattr(request.app.state, "health_executor", None)
     try:
-        chroma_docs = chroma.count
+        chroma_docs = await asyncio.get_running_loop().run_in_executor(executor, lambda: chroma.count)
     except Exception:
         chroma_docs = 0
 
@@ -18,5 +18,5 @@ def ingest_documents(request: IngestRequest) -> IngestResponse:
         raise HTTPException(status_code=400, detail="data_dir must be inside ./data/")
     if not target.is_dir():
         raise HTTPException(status_code=400, detail="data_dir does not exist or is not a directory")
-    summary = run_pipeline(data_dir=request.data_dir)
+    summary = run_pipeline(data_dir=request.data_dir, incremental=request.incremental)
     return IngestResponse(**summary)
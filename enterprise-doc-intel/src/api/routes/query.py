@@ -1,41 +1,121 @@
+import json
 import logging
+from collections.abc import AsyncIterator
 
 from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
 
-from src.agents.orchestrator import run_agent
-from src.api.models import QueryRequest, QueryResponse, SourceInfo
-from src.rag.generator import generate_answer
+from src.agents.orchestrator import AgentResult, AgentStep, iter_agent, run_agent
+from src.api.concurrency import iterate_blocking, run_blocking
+from src.api.models import CacheStatsResponse, QueryCacheStatsResponse, QueryRequest, QueryResponse, SourceInfo
+from src.embeddings.provider import query_embedding_cache_stats
+from src.rag.generator import agenerate_answer, answer_cache_stats, astream_answer
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-@router.post("/query", response_model=QueryResponse)
-def query_documents(request: QueryRequest, http_request: Request) -> QueryResponse:
-    chroma = http_request.app.state.chroma
-    neo4j = http_request.app.state.neo4j
+def _step_dict(step: AgentStep) -> dict:
+    return {
+        "thought": step.thought,
+        "tool": step.tool,
+        "input": step.tool_input,
+        "observation": step.observation[:500],
+    }
+
+
+async def _agent_events(http_request: Request, question: str, chroma, neo4j) -> AsyncIterator[dict]:
+    # The agent's tools are blocking, so each step is advanced on the I/O executor.
+    async for event in iterate_blocking(http_request, iter_agent(question, chroma, neo4j)):
+        if isinstance(event, AgentResult):
+            yield {"type": "token", "content": event.answer}
+            yield {"type": "done", "cached": False}
+        else:
+            yield {"type": "step", "step": _step_dict(event)}
+
+
+def _stream(events: AsyncIterator[dict], sse: bool) -> StreamingResponse:
+    """Send events as NDJSON lines, or as Server-Sent Events when sse is set.
+
+    A failure mid-stream cannot change the status code any more, so it is
+    logged and sent as a final {"type": "error"} event with a fixed detail,
+    like the generic 500 of the non-streaming path.
+    """
+
+    async def lines() -> AsyncIterator[str]:
+        try:
+            async for event in events:
+                data = json.dumps(event)
+                yield f"event: {event['type']}\ndata: {data}\n\n" if sse else data + "\n"
+        except Exception:
+            logger.exception("Streaming query failed")
+            data = json.dumps({"type": "error", "detail": "Query failed"})
+            yield f"event: error\ndata: {data}\n\n" if sse else data + "\n"
+
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(lines(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+
+@router.post(
+    "/query",
+    response_model=QueryResponse,
+    responses={200: {"content": {"application/x-ndjson": {}, "text/event-stream": {}}}},
+)
+async def query_documents(request: QueryRequest, http_request: Request):
+    state = http_request.app.state
+    chroma = state.chroma
+    neo4j = state.neo4j
+
+    if request.stream:
+        sse = "text/event-stream" in http_request.headers.get("accept", "")
+        if request.mode == "agent":
+            return _stream(_agent_events(http_request, request.question, chroma, neo4j), sse)
+        return _stream(
+            astream_answer(
+                request.question,
+                chroma,
+                neo4j,
+                top_k=request.top_k,
+                use_cache=not request.bypass_cache,
+                llm=state.llm,
+                executor=state.executor,
+            ),
+            sse,
+        )
 
     if request.mode == "agent":
-        result = run_agent(request.question, chroma, neo4j)
+        result = await run_blocking(http_request, run_agent, request.question, chroma, neo4j)
         return QueryResponse(
             answer=result.answer,
             mode="agent",
-            agent_steps=[
-                {
-                    "thought": s.thought,
-                    "tool": s.tool,
-                    "input": s.tool_input,
-                    "observation": s.observation[:500],
-                }
-                for s in result.steps
-            ],
+            agent_steps=[_step_dict(s) for s in result.steps],
         )
     else:
-        result = generate_answer(request.question, chroma, neo4j, top_k=request.top_k)
+        result = await agenerate_answer(
+            request.question,
+            chroma,
+            neo4j,
+            top_k=request.top_k,
+            use_cache=not request.bypass_cache,
+            llm=state.llm,
+            executor=state.executor,
+        )
         return QueryResponse(
             answer=result.answer,
             mode="rag",
             sources=[SourceInfo(source=s["source"], score=s["score"]) for s in result.sources],
             graph_context=result.graph_context,
+            cached=result.cached,
         )
+
+
+@router.get("/query/cache", response_model=QueryCacheStatsResponse)
+async def query_cache_stats() -> QueryCacheStatsResponse:
+    """Hit-rate metrics of the caches on the /query path."""
+    embeddings = query_embedding_cache_stats() or {}
+    answers = answer_cache_stats()
+    return QueryCacheStatsResponse(
+        embeddings={tier: CacheStatsResponse(enabled=True, **stats) for tier, stats in embeddings.items()},
+        answers=CacheStatsResponse(enabled=True, **answers) if answers is not None else None,
+    )
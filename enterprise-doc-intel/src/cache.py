@@ -0,0 +1,346 @@
+"""Local caches shared by the ingestion and query paths."""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss/eviction counters for a cache."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hit_rate, 4),
+        }
+
+
+class PersistentCache:
+    """SQLite-backed key/value store with least-recently-used eviction.
+
+    Values are opaque bytes. When the total stored size exceeds max_bytes,
+    the least recently read or written entries are dropped until the cache
+    is back under 90% of the limit. The total is kept in the database, so
+    the limit holds across every process sharing the file. Safe to share
+    between threads.
+    """
+
+    def __init__(self, path: str | Path, max_bytes: int) -> None:
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be > 0")
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self._path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        # Single row holding SUM(size), updated in the same transaction as every write.
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "INSERT OR IGNORE INTO totals (id, bytes) SELECT 0, COALESCE(SUM(size), 0) FROM entries"
+        )
+        self._conn.commit()
+        self.stats = CacheStats()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    @property
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._total()
+
+    def _total(self) -> int:
+        return self._conn.execute("SELECT bytes FROM totals WHERE id = 0").fetchone()[0]
+
+    def get(self, key: str) -> bytes | None:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: list[str]) -> dict[str, bytes]:
+        """Return the cached values for the keys that are present."""
+        found: dict[str, bytes] = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit.
+            for start in range(0, len(unique), 500):
+                batch = unique[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE entries SET accessed = ? WHERE key = ?", [(now, key) for key in found]
+                )
+                self._conn.commit()
+            self.stats.hits += len(found)
+            self.stats.misses += len(unique) - len(found)
+        return found
+
+    def put(self, key: str, value: bytes) -> None:
+        self.put_many({key: value})
+
+    def put_many(self, items: dict[str, bytes]) -> None:
+        """Insert or replace entries, then evict if over the size limit."""
+        if not items:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            # Take the write lock before reading sizes, so writers in other processes cannot interleave.
+            self._conn.execute("BEGIN IMMEDIATE")
+            keys = list(items)
+            added = sum(len(value) for value in items.values())
+            for start in range(0, len(keys), 500):
+                batch = keys[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                added -= self._conn.execute(
+                    f"SELECT COALESCE(SUM(size), 0) FROM entries WHERE key IN ({placeholders})", batch
+                ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                [(key, value, len(value), now) for key, value in items.items()],
+            )
+            self._conn.execute("UPDATE totals SET bytes = bytes + ? WHERE id = 0", (added,))
+            total = self._total()
+            if total > self._max_bytes:
+                self._evict(total)
+
+    def _evict(self, total: int) -> None:
+        target = int(self._max_bytes * 0.9)
+        cursor = self._conn.execute("SELECT key, size FROM entries ORDER BY accessed")
+        evicted: list[tuple[str]] = []
+        freed = 0
+        for key, size in cursor:
+            if total - freed <= target:
+                break
+            evicted.append((key,))
+            freed += size
+        cursor.close()
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+        self._conn.execute("UPDATE totals SET bytes = bytes - ? WHERE id = 0", (freed,))
+        self.stats.evictions += len(evicted)
+        logger.info("Evicted %d entries from %s", len(evicted), self._path.name)
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("UPDATE totals SET bytes = 0 WHERE id = 0")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class TTLCache:
+    """In-memory cache with least-recently-used eviction and optional expiry.
+
+    Holds at most max_entries values; entries older than ttl seconds are
+    treated as missing (ttl=None keeps them until evicted). None cannot be
+    cached, since get() returns it for a miss. Safe to share between threads.
+    """
+
+    def __init__(self, max_entries: int, ttl: float | None = None) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries must be > 0")
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.stats = CacheStats()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._ttl is not None and time.monotonic() - entry[0] > self._ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if value is None:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SemanticCache:
+    """Values keyed by embedding, returned for any nearby enough embedding.
+
+    get() returns the value stored under the most similar embedding when
+    their cosine similarity is at least threshold. Entries also carry a
+    scope (lookups only match entries stored under an equal scope) and the
+    generation they were computed at; entries from an older generation, or
+    older than ttl seconds (ttl=None keeps them until evicted), are dropped
+    on the next lookup. Holds at most max_entries values, evicting the least
+    recently used. Vectors live in one numpy matrix, so a lookup is a single
+    matrix-vector product (about max_entries x dimensions multiply-adds)
+    done under the lock. Safe to share between threads.
+    """
+
+    def __init__(self, max_entries: int, threshold: float, ttl: float | None = None) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries must be > 0")
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        self.threshold = threshold
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        # One row per slot; allocated on the first put, when the dimension is known.
+        self._vectors: np.ndarray | None = None
+        self._live = np.zeros(max_entries, dtype=bool)
+        self._scopes = np.zeros(max_entries, dtype=np.int64)
+        self._generations = np.zeros(max_entries, dtype=np.int64)
+        self._stored_at = np.zeros(max_entries, dtype=np.float64)
+        self._values: list[Any] = [None] * max_entries
+        self._scope_ids: dict[Hashable, int] = {}
+        self._lru: OrderedDict[int, None] = OrderedDict()  # live slots, least recently used first
+        self.stats = CacheStats()
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    @staticmethod
+    def _unit(embedding: Sequence[float]) -> np.ndarray | None:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    def _free(self, slots: np.ndarray) -> None:
+        for slot in slots.tolist():
+            self._live[slot] = False
+            self._values[slot] = None
+            del self._lru[slot]
+
+    def get(self, embedding: Sequence[float], scope: Hashable, generation: int) -> Any | None:
+        query = self._unit(embedding)
+        with self._lock:
+            stale = self._live & (self._generations != generation)
+            if self._ttl is not None:
+                stale |= self._live & (time.monotonic() - self._stored_at > self._ttl)
+            self._free(np.flatnonzero(stale))
+
+            scope_id = self._scope_ids.get(scope)
+            best = None
+            if query is not None and scope_id is not None and self._vectors is not None:
+                if len(query) == self._vectors.shape[1]:
+                    candidates = np.flatnonzero(self._live & (self._scopes == scope_id))
+                    if len(candidates):
+                        scores = self._vectors[candidates] @ query
+                        top = int(np.argmax(scores))
+                        if scores[top] >= self.threshold:
+                            best = int(candidates[top])
+            if best is None:
+                self.stats.misses += 1
+                return None
+            self._lru.move_to_end(best)
+            self.stats.hits += 1
+            return self._values[best]
+
+    def put(self, embedding: Sequence[float], scope: Hashable, generation: int, value: Any) -> None:
+        vector = self._unit(embedding)
+        if vector is None or value is None:
+            return
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != len(vector):
+                # First entry, or the embedding model changed: start over.
+                self._vectors = np.zeros((self._max_entries, len(vector)), dtype=np.float32)
+                self._free(np.flatnonzero(self._live))
+            scope_id = self._scope_ids.setdefault(scope, len(self._scope_ids))
+
+            # A value for the very same embedding replaces the older one.
+            same_scope = np.flatnonzero(self._live & (self._scopes == scope_id))
+            self._free(same_scope[(self._vectors[same_scope] == vector).all(axis=1)])
+
+            if len(self._lru) >= self._max_entries:
+                slot, _ = self._lru.popitem(last=False)
+                self._live[slot] = False
+                self.stats.evictions += 1
+            else:
+                slot = int(np.argmin(self._live))
+            self._vectors[slot] = vector
+            self._live[slot] = True
+            self._scopes[slot] = scope_id
+            self._generations[slot] = generation
+            self._stored_at[slot] = time.monotonic()
+            self._values[slot] = value
+            self._lru[slot] = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._free(np.flatnonzero(self._live))
+
+
+class Generation:
+    """A counter bumped whenever the data behind a cache changes.
+
+    Caches include the current value in their keys, so entries stored
+    before a bump are never returned again and age out through eviction.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._value = 0
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def bump(self) -> int:
+        with self._lock:
+            self._value += 1
+            return self._value
+
+
+# Bumped by run_pipeline whenever it changes the vector store or the graph.
+corpus_generation = Generation()
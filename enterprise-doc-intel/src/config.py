@@ -6,21 +6,74 @@ class Settings(BaseSettings):
     ollama_base_url: str = "http://localhost:11434"
     ollama_model: str = "llama3.2"
     ollama_embed_model: str = "nomic-embed-text"
-    ollama_timeout: int = 120  # seconds per LLM/embedding call
+    ollama_timeout: int = 120  # seconds per LLM/embedding call (background calls)
+    llm_interactive_timeout: float = 60  # seconds per LLM/embedding call made for a query
+    llm_interactive_concurrency: int = 8  # query-time LLM calls in flight at once
+    llm_background_concurrency: int = 4  # ingestion LLM calls in flight at once; leaves Ollama slots free for queries
+    llm_keepalive_expiry: float = 30  # seconds an idle pooled connection to Ollama stays open
+
+    # Embeddings
+    embed_batch_size: int = 32  # inputs per Ollama embed request
+    embed_batch_max_chars: int = 64_000  # cap on total characters per embed request
+    embed_concurrency: int = 4  # embed requests in flight at once
+    embed_max_retries: int = 2  # retries per failed embed request
+    embed_retry_backoff: float = 0.5  # seconds; doubles on each retry
+    embedding_cache_enabled: bool = True
+    embedding_cache_path: str = "./cache/embeddings.sqlite3"
+    embedding_cache_max_mb: int = 1024  # least recently used vectors evicted beyond this
+    query_embedding_cache_enabled: bool = True
+    query_embedding_cache_max_entries: int = 4096  # query vectors kept in memory (least recently used evicted)
+    query_embedding_cache_disk: bool = False  # also keep query vectors on disk, shared between API workers
+    query_embedding_cache_path: str = "./cache/query_embeddings.sqlite3"
+    query_embedding_cache_max_mb: int = 64
 
     # Neo4j
     neo4j_uri: str = "bolt://localhost:7687"
     neo4j_user: str = "neo4j"
     neo4j_password: str = ""  # must be set via .env or environment
+    graph_node_budget: int = 200  # nodes a neighborhood traversal may visit
+    graph_max_degree: int = 500  # nodes with more relationships are returned but not expanded
+    graph_cache_enabled: bool = True  # cache /graph/* responses until the next ingest
+    graph_cache_ttl: float = 300  # seconds; also bounds staleness after CLI ingests
+    graph_cache_max_entries: int = 1024
+    entity_index_ttl: float = 60  # seconds between checks for entities written by other processes (e.g. CLI ingests)
 
     # ChromaDB
     chroma_persist_dir: str = "./chroma_data"
     chroma_collection: str = "enterprise_docs"
 
     # Ingestion
-    chunk_size: int = 512
+    chunk_strategy: str = "recursive"  # recursive | fixed | token
+    chunk_size: int = 512  # characters, or tokens with the token strategy
     chunk_overlap: int = 64
+    tokenizer_path: str = "./models/tokenizer.json"  # Hugging Face tokenizer.json for the token strategy
     data_dir: str = "./data/sample_docs"
+    loader_workers: int = 0  # PDF extraction processes; 0 = one per CPU core
+    pdf_pages_per_task: int = 16  # large PDFs are split into page ranges of this size
+    lazy_load_min_bytes: int = 64 * 1024 * 1024  # text files this large are memory-mapped
+    lazy_window_bytes: int = 4 * 1024 * 1024  # window read from a memory-mapped file per chunking pass
+    ingest_flush_size: int = 256  # chunks buffered before each embed + upsert
+    dedup_enabled: bool = True  # skip duplicate chunks before embedding; holds ~0.5 KB per distinct chunk per run
+    dedup_threshold: float = 0.9  # estimated Jaccard similarity that counts as a near duplicate
+    ingest_manifest_path: str = "./cache/ingest_manifest.json"  # used by incremental ingestion
+    extract_concurrency: int = 4  # concurrent LLM entity-extraction calls per document
+    extraction_cache_enabled: bool = True
+    extraction_cache_path: str = "./cache/extractions.sqlite3"
+    extraction_cache_max_mb: int = 256  # least recently used results evicted beyond this
+
+    # API
+    api_blocking_workers: int = 32  # threads for Chroma, Neo4j and embedding calls made by async routes
+
+    # Answer cache
+    answer_cache_enabled: bool = True  # reuse /query answers for repeated or paraphrased questions
+    answer_cache_threshold: float = 0.95  # cosine similarity of question embeddings that counts as the same question
+    answer_cache_max_entries: int = 512  # each lookup compares against every entry
+    answer_cache_ttl: float = 600  # seconds; bounds staleness after ingests by other processes
+
+    # Retrieval
+    retrieval_vector_timeout: float = 30  # seconds for the query embedding (one request, no retries)
+    retrieval_graph_timeout: float = 2.0  # seconds; graph context not ready by then is left out
+    retrieval_graph_workers: int = 8  # threads running graph lookups alongside vector search
 
     # Context limits
     max_context_chars: int = 8000  # cap assembled context sent to LLM
@@ -0,0 +1,41 @@
+"""Content-addressed on-disk cache of embedding vectors."""
+
+from __future__ import annotations
+
+import hashlib
+from array import array
+
+from src.cache import CacheStats, PersistentCache
+
+
+def _cache_key(model: str, text: str) -> str:
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model}:{digest}"
+
+
+class EmbeddingCache:
+    """Embedding vectors keyed by (embed model name, SHA-256 of the text)."""
+
+    def __init__(self, path: str, max_bytes: int) -> None:
+        self._store = PersistentCache(path, max_bytes=max_bytes)
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._store.stats
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def get_many(self, model: str, texts: list[str]) -> dict[str, list[float]]:
+        """Return cached vectors for the texts that are present, keyed by text."""
+        keys = {_cache_key(model, text): text for text in texts}
+        found = self._store.get_many(list(keys))
+        return {keys[key]: array("d", value).tolist() for key, value in found.items()}
+
+    def put_many(self, model: str, vectors: dict[str, list[float]]) -> None:
+        self._store.put_many(
+            {_cache_key(model, text): array("d", vector).tobytes() for text, vector in vectors.items()}
+        )
+
+    def close(self) -> None:
+        self._store.close()
@@ -3,53 +3,294 @@
 from __future__ import annotations
 
 import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 
-from ollama import Client
-
+from src.cache import TTLCache
 from src.config import settings
+from src.embeddings.cache import EmbeddingCache
+from src.llm import BACKGROUND, INTERACTIVE, gateway
 
 logger = logging.getLogger(__name__)
 
-_client = Client(host=settings.ollama_base_url, timeout=settings.ollama_timeout)
+# Opened on first use so importing this module never touches the disk.
+_cache: EmbeddingCache | None = None
+_cache_lock = threading.Lock()
+
+
+def _get_cache() -> EmbeddingCache | None:
+    global _cache
+    if _cache is None and settings.embedding_cache_enabled:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache(
+                    settings.embedding_cache_path,
+                    max_bytes=settings.embedding_cache_max_mb * 1024 * 1024,
+                )
+    return _cache
+
+
+# Query vectors: an in-memory LRU, optionally backed by an on-disk tier that
+# several API workers can share. Separate from _cache so query traffic never
+# evicts document vectors.
+_query_cache: TTLCache | None = None
+_query_disk_cache: EmbeddingCache | None = None
+_query_cache_lock = threading.Lock()
+
+
+def _get_query_caches() -> tuple[TTLCache | None, EmbeddingCache | None]:
+    global _query_cache, _query_disk_cache
+    if _query_cache is None and settings.query_embedding_cache_enabled:
+        with _query_cache_lock:
+            if _query_cache is None:
+                if settings.query_embedding_cache_disk:
+                    _query_disk_cache = EmbeddingCache(
+                        settings.query_embedding_cache_path,
+                        max_bytes=settings.query_embedding_cache_max_mb * 1024 * 1024,
+                    )
+                _query_cache = TTLCache(settings.query_embedding_cache_max_entries)
+    return _query_cache, _query_disk_cache
+
+
+def reset_query_embedding_cache() -> None:
+    global _query_cache, _query_disk_cache
+    with _query_cache_lock:
+        if _query_disk_cache is not None:
+            _query_disk_cache.close()
+        _query_cache = None
+        _query_disk_cache = None
+
+
+def query_embedding_cache_stats() -> dict | None:
+    """Counters of the query embedding cache tiers, or None when it is disabled."""
+    memory, disk = _get_query_caches()
+    if memory is None:
+        return None
+    stats = {"memory": {"entries": len(memory), **memory.stats.as_dict()}}
+    if disk is not None:
+        stats["disk"] = {"entries": len(disk), **disk.stats.as_dict()}
+    return stats
 
 
 class EmbeddingError(RuntimeError):
     """Raised when Ollama embedding fails."""
 
 
-def get_embeddings(texts: list[str]) -> list[list[float]]:
-    """Generate embeddings for a list of texts using Ollama.
+def _iter_batches(texts: list[str], batch_size: int, max_batch_chars: int) -> Iterator[list[str]]:
+    """Group texts into batches capped by item count and total characters.
 
-    Uses the model specified in settings.ollama_embed_model (default: nomic-embed-text).
-    Raises EmbeddingError on network or model failures.
+    A single text longer than max_batch_chars is sent on its own rather than dropped.
     """
-    embeddings: list[list[float]] = []
+    batch: list[str] = []
+    batch_chars = 0
 
     for text in texts:
+        if batch and (len(batch) >= batch_size or batch_chars + len(text) > max_batch_chars):
+            yield batch
+            batch = []
+            batch_chars = 0
+        batch.append(text)
+        batch_chars += len(text)
+
+    if batch:
+        yield batch
+
+
+def _embed_batch(
+    batch: list[str], priority: str = BACKGROUND, timeout: float | None = None
+) -> list[list[float]]:
+    """Embed one batch in a single Ollama call. Raises EmbeddingError on failure."""
+    try:
+        response = gateway.embed(
+            model=settings.ollama_embed_model,
+            input=batch,
+            priority=priority,
+            timeout=timeout,
+        )
+        vectors = response["embeddings"]
+    except Exception as exc:
+        raise EmbeddingError(
+            f"Ollama embedding failed (model={settings.ollama_embed_model}): {exc}"
+        ) from exc
+
+    if len(vectors) != len(batch):
+        raise EmbeddingError(
+            f"Ollama embedding failed (model={settings.ollama_embed_model}): "
+            f"expected {len(batch)} vectors, got {len(vectors)}"
+        )
+    return vectors
+
+
+def _embed_batch_with_retry(batch: list[str]) -> list[list[float]]:
+    """Embed one batch, retrying with exponential backoff before giving up."""
+    attempts = settings.embed_max_retries + 1
+    for attempt in range(attempts):
         try:
-            response = _client.embed(
-                model=settings.ollama_embed_model,
-                input=text,
+            return _embed_batch(batch)
+        except EmbeddingError as exc:
+            if attempt == attempts - 1:
+                raise
+            delay = settings.embed_retry_backoff * (2**attempt)
+            logger.warning(
+                "Embedding batch of %d failed (attempt %d/%d), retrying in %.1fs: %s",
+                len(batch),
+                attempt + 1,
+                attempts,
+                delay,
+                exc,
             )
-            embeddings.append(response["embeddings"][0])
-        except Exception as exc:
-            raise EmbeddingError(
-                f"Ollama embedding failed (model={settings.ollama_embed_model}): {exc}"
-            ) from exc
+            time.sleep(delay)
+    raise AssertionError("unreachable")
 
-    logger.info("Generated %d embeddings via %s", len(embeddings), settings.ollama_embed_model)
+
+def get_embeddings(
+    texts: list[str],
+    batch_size: int | None = None,
+    max_batch_chars: int | None = None,
+    concurrency: int | None = None,
+) -> list[list[float]]:
+    """Generate embeddings for a list of texts using Ollama.
+
+    Texts are sent in batches of up to batch_size inputs (default:
+    settings.embed_batch_size) and at most max_batch_chars characters
+    (default: settings.embed_batch_max_chars) per request. Up to concurrency
+    requests (default: settings.embed_concurrency) are in flight at once, each
+    retried with backoff on failure. Results are returned in input order.
+
+    Texts already in the on-disk embedding cache are not sent to Ollama,
+    and newly computed vectors are added to it.
+
+    Uses the model specified in settings.ollama_embed_model (default: nomic-embed-text).
+    Raises EmbeddingError on network or model failures.
+    """
+    if batch_size is None:
+        batch_size = settings.embed_batch_size
+    if max_batch_chars is None:
+        max_batch_chars = settings.embed_batch_max_chars
+    if concurrency is None:
+        concurrency = settings.embed_concurrency
+    if batch_size <= 0:
+        raise ValueError("batch_size must be > 0")
+
+    cache = _get_cache()
+    cached = cache.get_many(settings.ollama_embed_model, texts) if cache is not None else {}
+    # Each distinct uncached text is embedded once, however often it repeats.
+    pending = [text for text in dict.fromkeys(texts) if text not in cached]
+
+    batches = list(_iter_batches(pending, batch_size, max_batch_chars))
+
+    if concurrency <= 1 or len(batches) <= 1:
+        results = [_embed_batch_with_retry(batch) for batch in batches]
+    else:
+        workers = min(concurrency, len(batches))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed") as pool:
+            futures = [pool.submit(_embed_batch_with_retry, batch) for batch in batches]
+            try:
+                # Collect in submission order so vectors line up with their inputs.
+                results = [future.result() for future in futures]
+            except EmbeddingError:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    computed = dict(zip(pending, (vector for batch_vectors in results for vector in batch_vectors)))
+    if cache is not None and computed:
+        cache.put_many(settings.ollama_embed_model, computed)
+
+    embeddings = [cached[text] if text in cached else computed[text] for text in texts]
+    logger.info(
+        "Generated %d embeddings in %d requests via %s (%d from cache)",
+        len(embeddings),
+        len(batches),
+        settings.ollama_embed_model,
+        sum(1 for text in texts if text in cached),
+    )
     return embeddings
 
 
 def get_single_embedding(text: str) -> list[float]:
-    """Generate an embedding for a single text. Raises EmbeddingError on failure."""
+    """Generate an embedding for a single text. Raises EmbeddingError on failure.
+
+    Consults the on-disk embedding cache first.
+    """
+    cache = _get_cache()
+    if cache is not None:
+        cached = cache.get_many(settings.ollama_embed_model, [text])
+        if text in cached:
+            return cached[text]
+
     try:
-        response = _client.embed(
+        response = gateway.embed(
             model=settings.ollama_embed_model,
             input=text,
+            priority=INTERACTIVE,
         )
-        return response["embeddings"][0]
+        vector = response["embeddings"][0]
     except Exception as exc:
         raise EmbeddingError(
             f"Ollama embedding failed (model={settings.ollama_embed_model}): {exc}"
         ) from exc
+
+    if cache is not None:
+        cache.put_many(settings.ollama_embed_model, {text: vector})
+    return vector
+
+
+def normalize_query(text: str) -> str:
+    """Canonical form of a query: NFKC-normalized, with runs of whitespace collapsed."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def get_query_embedding(query: str, timeout: float | None = None) -> list[float]:
+    """Embed a search query, reusing vectors of earlier identical queries.
+
+    Queries that differ only in case, whitespace or Unicode form share one
+    cache entry; the first one's normalized text is what gets embedded.
+    Looks in memory, then in the on-disk tier if enabled, before calling
+    Ollama with timeout (seconds; the gateway's interactive default if
+    None). A query is waiting on the result, so the request is not retried.
+    Raises EmbeddingError on failure.
+    """
+    vector = cached_query_embedding(query)
+    return vector if vector is not None else embed_query(query, timeout)
+
+
+def cached_query_embedding(query: str) -> list[float] | None:
+    """The first half of get_query_embedding: the cached vector, or None without calling Ollama."""
+    memory, disk = _get_query_caches()
+    if memory is None:
+        return None
+
+    model = settings.ollama_embed_model
+    key = normalize_query(query).casefold()
+    vector = memory.get((model, key))
+    if vector is None and disk is not None:
+        try:
+            vector = disk.get_many(model, [key]).get(key)
+        except sqlite3.Error:
+            # The tier is shared between workers; a locked file is a miss, not a failed query.
+            logger.warning("Query embedding disk cache read failed", exc_info=True)
+        if vector is not None:
+            memory.put((model, key), vector)
+    return vector
+
+
+def embed_query(query: str, timeout: float | None = None) -> list[float]:
+    """The second half of get_query_embedding: embed with Ollama and cache the vector."""
+    text = normalize_query(query)
+    vector = _embed_batch([text], INTERACTIVE, timeout)[0]
+    memory, disk = _get_query_caches()
+    if memory is not None:
+        model = settings.ollama_embed_model
+        key = text.casefold()
+        if disk is not None:
+            try:
+                disk.put_many(model, {key: vector})
+            except sqlite3.Error:
+                logger.warning("Query embedding disk cache write failed", exc_info=True)
+        memory.put((model, key), vector)
+    return vector
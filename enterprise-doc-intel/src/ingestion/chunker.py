@@ -1,6 +1,14 @@
 from __future__ import annotations
 
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from src.config import settings
+
+if TYPE_CHECKING:
+    from tokenizers import Tokenizer
 
 
 @dataclass
@@ -53,6 +61,76 @@ def fixed_size_chunks(
 _SEPARATORS = ["\n\n", "\n", ". ", " "]
 
 
+def _part_spans(text: str, start: int, end: int, separator: str) -> Iterator[tuple[int, int]]:
+    """Yield (start, end) offsets of text[start:end].split(separator) without copying."""
+    pos = start
+    while True:
+        idx = text.find(separator, pos, end)
+        if idx == -1:
+            yield pos, end
+            return
+        yield pos, idx
+        pos = idx + len(separator)
+
+
+def _append_chunk(out: list[str], text: str, start: int, end: int) -> None:
+    """Append text[start:end] stripped, unless it is only whitespace."""
+    chunk = text[start:end].strip()
+    if chunk:
+        out.append(chunk)
+
+
+def _split_span(
+    text: str,
+    start: int,
+    end: int,
+    chunk_size: int,
+    overlap: int,
+    separators: list[str],
+    out: list[str],
+) -> None:
+    """Merge the parts of text[start:end] into chunks, appending them to out.
+
+    The chunk being built is always a contiguous slice text[cur_start:cur_end],
+    so candidate lengths are computed from offsets instead of by concatenating
+    strings. A part that is itself longer than chunk_size is split recursively
+    with the remaining, finer separators.
+    """
+    separator = ""
+    remaining: list[str] = []
+    for i, sep in enumerate(separators):
+        if text.find(sep, start, end) != -1:
+            separator = sep
+            remaining = separators[i + 1 :]
+            break
+
+    if separator:
+        parts: Iterable[tuple[int, int]] = _part_spans(text, start, end, separator)
+    else:
+        parts = ((i, min(i + chunk_size, end)) for i in range(start, end, chunk_size))
+
+    cur_start = cur_end = start
+    for part_start, part_end in parts:
+        if separator and part_end - part_start > chunk_size:
+            if cur_end > cur_start:
+                _append_chunk(out, text, cur_start, cur_end)
+            _split_span(text, part_start, part_end, chunk_size, overlap, remaining, out)
+            cur_start = cur_end = part_end
+            continue
+
+        if cur_end == cur_start:
+            cur_start, cur_end = part_start, part_end
+        elif part_end - cur_start > chunk_size:
+            _append_chunk(out, text, cur_start, cur_end)
+            # Keep overlap from end of current chunk
+            cur_start = max(cur_start, cur_end - overlap) if overlap else part_start
+            cur_end = part_end
+        else:
+            cur_end = part_end
+
+    _append_chunk(out, text, cur_start, cur_end)
+
+
 def recursive_chunks(
     text: str,
     chunk_size: int = 512,
@@ -63,7 +141,8 @@ def recursive_chunks(
     """Recursively split text using a hierarchy of separators.
 
     Tries the most meaningful separator first (paragraph break), then falls
-    back to less meaningful ones (newline, sentence, word).
+    back to less meaningful ones (newline, sentence, word) for any part that
+    is still longer than chunk_size. Runs in time linear in len(text).
     """
     overlap = _normalize_chunk_params(chunk_size, overlap)
     metadata = metadata or {}
@@ -79,41 +158,110 @@ def recursive_chunks(
             ]
         return []
 
-    # Find the best separator that actually exists in the text
-    separator = ""
-    for sep in separators:
-        if sep in text:
-            separator = sep
-            break
+    pieces: list[str] = []
+    _split_span(text, 0, len(text), chunk_size, overlap, separators, pieces)
+    return [
+        Chunk(text=piece, metadata={**metadata, "chunk_index": i, "strategy": "recursive"})
+        for i, piece in enumerate(pieces)
+    ]
 
-    parts = text.split(separator) if separator else [text[i : i + chunk_size] for i in range(0, len(text), chunk_size)]
 
-    # Merge small parts into chunk-sized groups
-    chunks: list[Chunk] = []
-    current = ""
+@lru_cache(maxsize=4)
+def get_tokenizer(path: str) -> Tokenizer:
+    """Load a Hugging Face tokenizer.json from disk, once per process and path."""
+    try:
+        from tokenizers import Tokenizer
+    except ModuleNotFoundError as exc:
+        raise RuntimeError(
+            "tokenizers is required for token chunking. Install dependencies with `pip install -e .`."
+        ) from exc
+    try:
+        return Tokenizer.from_file(path)
+    except Exception as exc:
+        raise RuntimeError(
+            f"Could not load tokenizer from {path}. Download the tokenizer.json that matches "
+            "your embedding model and point TOKENIZER_PATH at it."
+        ) from exc
+
+
+def _boundary_rank(text: str, prev_end: int, next_start: int) -> int:
+    """How good a place the gap between two tokens is to end a chunk.
+
+    Mirrors the recursive separator hierarchy: 4 = paragraph break,
+    3 = line break, 2 = sentence end, 1 = word break, 0 = inside a word.
+    """
+    gap_end = next_start
+    while gap_end < len(text) and text[gap_end].isspace():
+        gap_end += 1
+    gap = text[prev_end:gap_end]
+    if not gap or not gap.isspace():
+        return 0
+    if "\n\n" in gap:
+        return 4
+    if "\n" in gap:
+        return 3
+    if text[prev_end - 1] in ".!?":
+        return 2
+    return 1
 
-    for part in parts:
-        candidate = current + separator + part if current else part
 
-        if len(candidate) > chunk_size and current:
+def token_chunks(
+    text: str,
+    chunk_size: int = 512,
+    overlap: int = 64,
+    metadata: dict | None = None,
+    tokenizer: Tokenizer | None = None,
+) -> list[Chunk]:
+    """Split text into chunks of at most chunk_size tokens, with overlap in tokens.
+
+    Paragraphs are tokenized together with one encode_batch call, then chunks
+    are cut at the best boundary inside each chunk_size-token window
+    (paragraph, then line, sentence and word), like recursive_chunks does
+    with characters. Uses the tokenizer at settings.tokenizer_path by default.
+    """
+    overlap = _normalize_chunk_params(chunk_size, overlap)
+    metadata = metadata or {}
+    tokenizer = tokenizer or get_tokenizer(settings.tokenizer_path)
+
+    paragraphs = [(start, end) for start, end in _part_spans(text, 0, len(text), "\n\n") if text[start:end].strip()]
+    encodings = tokenizer.encode_batch([text[start:end] for start, end in paragraphs], add_special_tokens=False)
+
+    # Character span of every token, in document offsets.
+    starts: list[int] = []
+    ends: list[int] = []
+    for (para_start, _), encoding in zip(paragraphs, encodings):
+        for tok_start, tok_end in encoding.offsets:
+            if tok_end > tok_start:
+                starts.append(para_start + tok_start)
+                ends.append(para_start + tok_end)
+
+    # ranks[k] scores a cut between token k-1 and token k; a cut after the last token is always fine.
+    ranks = [0] + [_boundary_rank(text, ends[k - 1], starts[k]) for k in range(1, len(starts))] + [4]
+
+    chunks: list[Chunk] = []
+    begin = 0
+    while begin < len(starts):
+        limit = min(begin + chunk_size, len(starts))
+        cut = limit
+        if limit < len(starts):
+            best = max(ranks[begin + 1 : limit + 1])
+            if best > 0:
+                cut = max(k for k in range(begin + 1, limit + 1) if ranks[k] == best)
+
+        piece = text[starts[begin] : ends[cut - 1]].strip()
+        if piece:
             chunks.append(
                 Chunk(
-                    text=current.strip(),
-                    metadata={**metadata, "chunk_index": len(chunks), "strategy": "recursive"},
+                    text=piece,
+                    metadata={**metadata, "chunk_index": len(chunks), "strategy": "token", "tokens": cut - begin},
                 )
             )
-            # Keep overlap from end of current chunk
-            current = current[-overlap:] + separator + part if overlap else part
-        else:
-            current = candidate
+        if cut >= len(starts):
+            break
 
-    if current.strip():
-        chunks.append(
-            Chunk(
-                text=current.strip(),
-                metadata={**metadata, "chunk_index": len(chunks), "strategy": "recursive"},
-            )
-        )
+        # Start the next chunk overlap tokens back, moved forward to a word break if there is one.
+        next_begin = max(begin + 1, cut - overlap)
+        begin = next((k for k in range(next_begin, cut) if ranks[k] > 0), next_begin) if overlap else cut
 
     return chunks
 
@@ -125,10 +273,38 @@ def chunk_text(
     overlap: int = 64,
     metadata: dict | None = None,
 ) -> list[Chunk]:
-    """Chunk text using the specified strategy."""
+    """Chunk text using the specified strategy.
+
+    chunk_size and overlap count characters, except for the "token" strategy
+    where they count tokens.
+    """
     if strategy == "fixed":
         return fixed_size_chunks(text, chunk_size, overlap, metadata)
     elif strategy == "recursive":
         return recursive_chunks(text, chunk_size, overlap, metadata)
+    elif strategy == "token":
+        return token_chunks(text, chunk_size, overlap, metadata)
     else:
         raise ValueError(f"Unknown chunking strategy: {strategy}")
+
+
+def chunk_windows(
+    windows: Iterable[str],
+    strategy: str = "recursive",
+    chunk_size: int = 512,
+    overlap: int = 64,
+    metadata: dict | None = None,
+) -> Iterator[list[Chunk]]:
+    """Chunk consecutive windows of one long text, yielding each window's chunks.
+
+    chunk_index keeps counting across windows, so the result matches one
+    document's numbering while only one window is in memory at a time.
+    """
+    next_index = 0
+    for window in windows:
+        chunks = chunk_text(window, strategy, chunk_size, overlap, metadata)
+        for chunk in chunks:
+            chunk.metadata["chunk_index"] = next_index
+            next_index += 1
+        if chunks:
+            yield chunks
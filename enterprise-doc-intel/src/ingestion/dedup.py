@@ -0,0 +1,100 @@
+"""Chunk deduplication: exact hashing plus MinHash/LSH near-duplicate detection.
+
+Boilerplate such as repeated policy headers and footers produces many
+identical or almost identical chunks. The pipeline keeps the first copy as
+the canonical chunk and skips embedding and storing the rest.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+# Below 2**32, so a * h + b (a, b < p, h a CRC32) never overflows uint64.
+_PRIME = (1 << 31) - 1
+_SHINGLE_WORDS = 3
+
+
+def _normalize(text: str) -> list[str]:
+    return text.lower().split()
+
+
+def _shingle_hashes(words: list[str]) -> np.ndarray:
+    """CRC32 of every run of _SHINGLE_WORDS consecutive words."""
+    size = min(_SHINGLE_WORDS, len(words))
+    hashes = {zlib.crc32(" ".join(words[i : i + size]).encode("utf-8")) for i in range(len(words) - size + 1)}
+    return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+
+class ChunkDeduplicator:
+    """Remembers canonical chunks and maps later copies of them back to their IDs.
+
+    Exact duplicates (same text up to case and whitespace) are found by hash.
+    Near duplicates are found with a MinHash signature over word shingles,
+    bucketed into LSH bands; a candidate counts as a duplicate when the
+    signatures agree on at least threshold of their slots, i.e. when the
+    estimated Jaccard similarity of the two chunks is at least threshold.
+
+    State grows with the number of distinct chunks seen: a 16-byte digest,
+    a num_perm * 4-byte signature and one bucket entry per band for each,
+    roughly 0.5 KB per canonical chunk with the defaults.
+    """
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = 64, bands: int = 16, seed: int = 1) -> None:
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self._bands = bands
+        self._rows = num_perm // bands
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+        self._exact: dict[bytes, str] = {}
+        self._signatures: dict[str, np.ndarray] = {}
+        self._buckets: dict[int, list[str]] = defaultdict(list)
+
+    def _signature(self, hashes: np.ndarray) -> np.ndarray:
+        # One (shingles x num_perm) pass instead of a Python loop per permutation.
+        return ((np.outer(hashes, self._a) + self._b) % _PRIME).min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> list[int]:
+        return [
+            hash((band, signature[band * self._rows : (band + 1) * self._rows].tobytes()))
+            for band in range(self._bands)
+        ]
+
+    def check(self, chunk_id: str, text: str) -> str | None:
+        """Return the canonical chunk ID if text duplicates a known chunk.
+
+        Otherwise registers chunk_id as a new canonical chunk and returns None.
+        """
+        words = _normalize(text)
+        digest = hashlib.blake2b(" ".join(words).encode("utf-8"), digest_size=16).digest()
+        canonical = self._exact.get(digest)
+        if canonical is not None:
+            return canonical
+
+        if words:
+            signature = self._signature(_shingle_hashes(words))
+            keys = self._band_keys(signature)
+            seen: set[str] = set()
+            for key in keys:
+                for candidate in self._buckets.get(key, ()):
+                    if candidate in seen:
+                        continue
+                    seen.add(candidate)
+                    agreement = np.count_nonzero(signature == self._signatures[candidate]) / len(signature)
+                    if agreement >= self.threshold:
+                        self._exact[digest] = candidate
+                        return candidate
+            self._signatures[chunk_id] = signature
+            for key in keys:
+                self._buckets[key].append(chunk_id)
+
+        self._exact[digest] = chunk_id
+        return None
@@ -1,9 +1,16 @@
 from __future__ import annotations
 
 import logging
+import mmap
+import multiprocessing
+import os
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
 from dataclasses import dataclass, field
 from pathlib import Path
 
+from src.config import settings
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,6 +22,59 @@ class Document:
     metadata: dict = field(default_factory=dict)
 
 
+@dataclass
+class MappedDocument:
+    """A large text file read on demand through a memory map.
+
+    The decoded content is never held as one string; consumers read it
+    through windows() (or head() for a short prefix) instead.
+    """
+
+    path: Path
+    metadata: dict = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        """Size of the file in bytes."""
+        return self.path.stat().st_size
+
+    def head(self, max_chars: int) -> str:
+        """Decode roughly the first max_chars characters."""
+        with open(self.path, "rb") as f:
+            return f.read(max_chars * 4).decode("utf-8", errors="ignore")[:max_chars]
+
+    def windows(self, window_bytes: int | None = None) -> Iterator[str]:
+        """Yield the decoded text in consecutive windows of about window_bytes.
+
+        Windows end after a paragraph break where possible, then a line break
+        or space, and never inside a UTF-8 sequence. Undecodable bytes are
+        replaced rather than aborting the ingest.
+        """
+        window_bytes = window_bytes or settings.lazy_window_bytes
+        if self.size == 0:
+            return
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = 0
+            while start < len(mm):
+                end = min(start + window_bytes, len(mm))
+                if end < len(mm):
+                    end = _window_cut(mm, start, end)
+                yield mm[start:end].decode("utf-8", errors="replace")
+                start = end
+
+
+def _window_cut(mm: mmap.mmap, start: int, end: int) -> int:
+    """Pick where a window ending near `end` should stop."""
+    for separator in (b"\n\n", b"\n", b" "):
+        cut = mm.rfind(separator, start, end)
+        if cut > start:
+            return cut + len(separator)
+    # No separator: back off to the start of a UTF-8 character (skip 10xxxxxx bytes).
+    while end > start + 1 and mm[end] & 0xC0 == 0x80:
+        end -= 1
+    return end
+
+
 def load_text(path: Path) -> Document:
     return Document(
         content=path.read_text(encoding="utf-8"),
@@ -29,22 +89,34 @@ def load_markdown(path: Path) -> Document:
     )
 
 
-def load_pdf(path: Path) -> Document:
+def _pdf_reader(path: Path):
     try:
         from pypdf import PdfReader
     except ModuleNotFoundError as exc:
         raise RuntimeError(
             "pypdf is required to load PDF files. Install dependencies with `pip install -e .`."
         ) from exc
+    return PdfReader(path)
 
-    reader = PdfReader(path)
-    pages = [page.extract_text() or "" for page in reader.pages]
+
+def _pdf_document(path: Path, pages: list[str]) -> Document:
     return Document(
         content="\n\n".join(pages),
-        metadata={"source": str(path), "type": "pdf", "pages": len(reader.pages)},
+        metadata={"source": str(path), "type": "pdf", "pages": len(pages)},
     )
 
 
+def load_pdf(path: Path) -> Document:
+    reader = _pdf_reader(path)
+    return _pdf_document(path, [page.extract_text() or "" for page in reader.pages])
+
+
+def _extract_pdf_pages(path: str, start: int, stop: int) -> list[str]:
+    """Extract text from pages [start, stop) of a PDF. Runs in a worker process."""
+    reader = _pdf_reader(Path(path))
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
 LOADERS = {
     ".txt": load_text,
     ".md": load_markdown,
@@ -52,20 +124,149 @@ LOADERS = {
 }
 
 
-def load_directory(directory: str | Path) -> list[Document]:
-    """Load all supported documents from a directory recursively."""
-    directory = Path(directory)
-    documents: list[Document] = []
+def find_documents(directory: str | Path) -> list[Path]:
+    """List all supported files under a directory recursively, sorted by path."""
+    return [
+        path
+        for path in sorted(Path(directory).rglob("*"))
+        if path.is_file() and path.suffix.lower() in LOADERS
+    ]
+
+
+_MAPPED_TYPES = {".txt": "text", ".md": "markdown"}
+
+
+def load_document(path: Path) -> Document | MappedDocument:
+    """Load a single supported file with the loader for its extension.
+
+    Text and markdown files of at least settings.lazy_load_min_bytes are
+    returned as a MappedDocument instead of being read into memory.
+    """
+    suffix = path.suffix.lower()
+    if suffix in _MAPPED_TYPES and path.stat().st_size >= settings.lazy_load_min_bytes:
+        return MappedDocument(path=path, metadata={"source": str(path), "type": _MAPPED_TYPES[suffix]})
+    return LOADERS[suffix](path)
+
+
+def _describe(doc: Document | MappedDocument) -> str:
+    if isinstance(doc, MappedDocument):
+        return f"{doc.size} bytes, memory-mapped"
+    return f"{len(doc.content)} chars"
 
-    for path in sorted(directory.rglob("*")):
-        suffix = path.suffix.lower()
-        if path.is_file() and suffix in LOADERS:
+
+def _load_isolated(path: Path) -> Document | MappedDocument | None:
+    try:
+        doc = load_document(path)
+    except Exception:
+        logger.exception("Failed to load %s", path)
+        return None
+    logger.info("Loaded %s (%s)", path.name, _describe(doc))
+    return doc
+
+
+@dataclass
+class _PdfJob:
+    """A PDF being extracted as one or more page-range tasks."""
+
+    path: Path
+    parts: list[list[str] | None]
+    failed: bool = False
+
+    @property
+    def done(self) -> bool:
+        return all(part is not None for part in self.parts)
+
+
+def _iter_documents_parallel(paths: Iterable[Path], workers: int) -> Iterator[Document | MappedDocument]:
+    """Extract PDFs in a process pool while loading text files inline.
+
+    Large PDFs are split into ranges of settings.pdf_pages_per_task pages so
+    their pages are extracted across cores. At most two tasks per worker are
+    in flight, and documents are yielded as soon as they are complete.
+    """
+    # spawn, not fork: this can run inside the threaded API server.
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    pending: dict[Future, tuple[_PdfJob, int]] = {}
+    max_in_flight = workers * 2
+    step = max(1, settings.pdf_pages_per_task)
+
+    def collect(block: bool) -> Iterator[Document]:
+        if not pending:
+            return
+        done, _ = wait(pending, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for future in done:
+            job, index = pending.pop(future)
             try:
-                doc = LOADERS[suffix](path)
-                documents.append(doc)
-                logger.info("Loaded %s (%d chars)", path.name, len(doc.content))
+                job.parts[index] = future.result()
+            except Exception:
+                if not job.failed:
+                    logger.exception("Failed to load %s", job.path)
+                job.failed = True
+                job.parts[index] = []
+            if job.done and not job.failed:
+                doc = _pdf_document(job.path, [page for part in job.parts for page in part])
+                logger.info("Loaded %s (%d chars)", job.path.name, len(doc.content))
+                yield doc
+
+    try:
+        for path in paths:
+            if path.suffix.lower() != ".pdf":
+                doc = _load_isolated(path)
+                if doc is not None:
+                    yield doc
+                yield from collect(block=False)
+                continue
+
+            try:
+                page_count = len(_pdf_reader(path).pages)
             except Exception:
                 logger.exception("Failed to load %s", path)
+                continue
+
+            ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+            if not ranges:
+                yield _pdf_document(path, [])
+                continue
+            job = _PdfJob(path=path, parts=[None] * len(ranges))
+            for index, (start, stop) in enumerate(ranges):
+                while len(pending) >= max_in_flight:
+                    yield from collect(block=True)
+                pending[pool.submit(_extract_pdf_pages, str(path), start, stop)] = (job, index)
+
+        while pending:
+            yield from collect(block=True)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_documents(paths: Iterable[Path], workers: int | None = None) -> Iterator[Document | MappedDocument]:
+    """Load files, skipping (and logging) any that fail.
+
+    PDFs are extracted in a pool of worker processes (default:
+    settings.loader_workers, 0 = one per CPU core) and may be yielded out
+    of path order. With workers=1 everything loads serially in order.
+    """
+    workers = settings.loader_workers if workers is None else workers
+    if workers <= 0:
+        workers = os.cpu_count() or 1
 
+    if workers == 1:
+        for path in paths:
+            doc = _load_isolated(path)
+            if doc is not None:
+                yield doc
+        return
+
+    yield from _iter_documents_parallel(paths, workers)
+
+
+def iter_directory(directory: str | Path) -> Iterator[Document | MappedDocument]:
+    """Lazily load all supported documents from a directory recursively."""
+    return iter_documents(find_documents(directory))
+
+
+def load_directory(directory: str | Path) -> list[Document | MappedDocument]:
+    """Load all supported documents from a directory recursively."""
+    documents = list(iter_directory(directory))
     logger.info("Loaded %d documents from %s", len(documents), directory)
     return documents
@@ -0,0 +1,140 @@
+"""Ingestion manifest: remembers which files were ingested and what they produced.
+
+Used by incremental ingestion to skip unchanged files and to clean up the
+chunks and graph edges of files that changed or disappeared. The vector
+and graph stages are tracked separately, so a file whose graph extraction
+failed (or ran without Neo4j) is not re-embedded just to retry the graph.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_MANIFEST_VERSION = 1
+
+
+@dataclass
+class ManifestEntry:
+    """What the manifest knows about one ingested file."""
+
+    mtime_ns: int
+    size: int
+    sha256: str
+    chunk_ids: list[str] = field(default_factory=list)
+    graph: bool = True  # False until the file's graph extraction (or deletion) succeeded
+
+
+@dataclass
+class ManifestPlan:
+    """Result of comparing the files on disk against the manifest."""
+
+    changed: list[Path] = field(default_factory=list)
+    unchanged: list[Path] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    graph_pending: list[Path] = field(default_factory=list)  # unchanged, but still need the graph stage
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 of a file's bytes, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """JSON-backed map of source path → ManifestEntry."""
+
+    def __init__(self, path: str | Path, entries: dict[str, ManifestEntry] | None = None) -> None:
+        self.path = Path(path)
+        self.entries: dict[str, ManifestEntry] = entries or {}
+
+    @classmethod
+    def load(cls, path: str | Path) -> Manifest:
+        """Load a manifest, starting empty if the file is missing or unreadable."""
+        path = Path(path)
+        try:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return cls(path)
+        except (OSError, ValueError):
+            logger.warning("Ignoring unreadable ingestion manifest at %s", path)
+            return cls(path)
+
+        if raw.get("version") != _MANIFEST_VERSION:
+            logger.warning("Ignoring ingestion manifest with unknown version at %s", path)
+            return cls(path)
+        entries = {source: ManifestEntry(**entry) for source, entry in raw.get("files", {}).items()}
+        return cls(path, entries)
+
+    def save(self) -> None:
+        """Write the manifest atomically (write to a temp file, then rename)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "version": _MANIFEST_VERSION,
+            "files": {source: asdict(entry) for source, entry in sorted(self.entries.items())},
+        }
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(payload, indent=1), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def plan(self, paths: list[Path], directory: str | Path) -> ManifestPlan:
+        """Sort files into changed and unchanged, and list sources that disappeared.
+
+        A file is unchanged when its mtime and size match the manifest, or
+        when they differ but its content hash does not (e.g. after a touch).
+        Unchanged files whose graph stage has not succeeded are also listed
+        in graph_pending. Only manifest entries under directory are
+        considered for removal.
+        """
+        plan = ManifestPlan()
+        seen: set[str] = set()
+
+        for path in paths:
+            source = str(path)
+            seen.add(source)
+            entry = self.entries.get(source)
+            if entry is None:
+                plan.changed.append(path)
+                continue
+
+            stat = path.stat()
+            if stat.st_mtime_ns == entry.mtime_ns and stat.st_size == entry.size:
+                plan.unchanged.append(path)
+            elif file_digest(path) == entry.sha256:
+                entry.mtime_ns, entry.size = stat.st_mtime_ns, stat.st_size
+                plan.unchanged.append(path)
+            else:
+                plan.changed.append(path)
+                continue
+            if not entry.graph:
+                plan.graph_pending.append(path)
+
+        root = Path(directory).resolve()
+        for source in self.entries:
+            if source not in seen and Path(source).resolve().is_relative_to(root):
+                plan.removed.append(source)
+
+        return plan
+
+    def record(self, path: Path, chunk_ids: list[str], graph: bool = True) -> None:
+        """Remember a freshly ingested file, the chunk IDs it produced and whether its graph is stored."""
+        stat = path.stat()
+        self.entries[str(path)] = ManifestEntry(
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            sha256=file_digest(path),
+            chunk_ids=chunk_ids,
+            graph=graph,
+        )
+
+    def forget(self, source: str) -> None:
+        self.entries.pop(source, None)
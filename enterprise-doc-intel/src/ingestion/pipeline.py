@@ -1,15 +1,28 @@
-"""Ingestion pipeline: load documents → chunk → embed → store in vector DB + knowledge graph."""
+"""Ingestion pipeline: load documents → chunk → embed → store in vector DB + knowledge graph.
+
+Stages are chained generators, so only one document (or, for memory-mapped
+files, one window of it) and at most settings.ingest_flush_size pending
+chunks are held in memory at a time.
+"""
 
 from __future__ import annotations
 
+import argparse
 import hashlib
+import json
 import logging
+from collections.abc import Iterator
+from pathlib import Path
 
+from src.cache import corpus_generation
 from src.config import settings
 from src.embeddings.provider import get_embeddings
-from src.ingestion.chunker import chunk_text
-from src.ingestion.loader import load_directory
-from src.knowledge_graph.extractor import extract_and_store
+from src.ingestion.chunker import Chunk, chunk_text, chunk_windows
+from src.ingestion.dedup import ChunkDeduplicator
+from src.ingestion.loader import Document, MappedDocument, find_documents, iter_directory, iter_documents
+from src.ingestion.manifest import Manifest, ManifestPlan
+from src.knowledge_graph.entity_index import batched_entity_updates, update_entity_index
+from src.knowledge_graph.extractor import MAX_EXTRACTION_CHARS, extract_and_store
 from src.knowledge_graph.neo4j_client import Neo4jClient
 from src.vectorstore.chroma import ChromaStore
 
@@ -23,76 +36,335 @@ def _build_chunk_id(index: int, text: str, metadata: dict) -> str:
     return f"chunk_{digest}"
 
 
-def run_pipeline(data_dir: str | None = None) -> dict:
+def _iter_chunk_batches(doc: Document | MappedDocument) -> Iterator[list[Chunk]]:
+    """Chunk a document, yielding one batch for in-memory documents and one per window for mapped ones."""
+    options = {
+        "strategy": settings.chunk_strategy,
+        "chunk_size": settings.chunk_size,
+        "overlap": settings.chunk_overlap,
+        "metadata": doc.metadata,
+    }
+    if isinstance(doc, MappedDocument):
+        yield from chunk_windows(doc.windows(), **options)
+    else:
+        yield chunk_text(doc.content, **options)
+
+
+def _location(metadata: dict) -> str:
+    return f"{metadata.get('source', 'unknown')}#{metadata.get('chunk_index', 0)}"
+
+
+class _ChunkWriter:
+    """Bounded chunk buffer that embeds and upserts to ChromaDB every flush_size chunks.
+
+    With a deduplicator, duplicate chunks are dropped before embedding and
+    their locations are recorded on the canonical chunk's metadata
+    (duplicate_locations as a JSON list, duplicate_count).
+    """
+
+    def __init__(self, flush_size: int, dedup: ChunkDeduplicator | None = None) -> None:
+        if flush_size <= 0:
+            raise ValueError("flush_size must be > 0")
+        self._flush_size = flush_size
+        self._dedup = dedup
+        self._ids: list[str] = []
+        self._chunks: list[Chunk] = []
+        self._chroma: ChromaStore | None = None
+        self._duplicates: dict[str, list[str]] = {}
+        self._pending: set[str] = set()  # IDs in the buffer; every other canonical chunk is stored
+        self._stale_metadata: set[str] = set()
+        self.stored = 0
+        self.skipped = 0
+
+    @property
+    def chroma(self) -> ChromaStore:
+        if self._chroma is None:
+            self._chroma = ChromaStore()
+        return self._chroma
+
+    def write(self, ids: list[str], chunks: list[Chunk]) -> list[str]:
+        """Buffer chunks for storage and return the IDs they are stored under.
+
+        A duplicate chunk maps to its canonical chunk's ID.
+        """
+        stored_ids: list[str] = []
+        for chunk_id, chunk in zip(ids, chunks):
+            canonical = self._dedup.check(chunk_id, chunk.text) if self._dedup is not None else None
+            if canonical is not None:
+                self._duplicates.setdefault(canonical, []).append(_location(chunk.metadata))
+                if canonical not in self._pending:
+                    self._stale_metadata.add(canonical)
+                self.skipped += 1
+                stored_ids.append(canonical)
+                continue
+            self._ids.append(chunk_id)
+            self._chunks.append(chunk)
+            self._pending.add(chunk_id)
+            stored_ids.append(chunk_id)
+            if len(self._chunks) >= self._flush_size:
+                self._flush(self._flush_size)
+        return stored_ids
+
+    def close(self) -> None:
+        if self._chunks:
+            self._flush(len(self._chunks))
+        if self._stale_metadata:
+            # Canonical chunks that gained duplicates after they were stored.
+            ids = sorted(self._stale_metadata)
+            self.chroma.update_metadata(ids, [self._duplicate_metadata(chunk_id) for chunk_id in ids])
+            self._stale_metadata.clear()
+
+    def _duplicate_metadata(self, chunk_id: str) -> dict:
+        locations = self._duplicates[chunk_id]
+        return {"duplicate_locations": json.dumps(locations), "duplicate_count": len(locations)}
+
+    def _flush(self, count: int) -> None:
+        ids, self._ids = self._ids[:count], self._ids[count:]
+        chunks, self._chunks = self._chunks[:count], self._chunks[count:]
+        for chunk_id, chunk in zip(ids, chunks):
+            if chunk_id in self._duplicates:
+                chunk.metadata.update(self._duplicate_metadata(chunk_id))
+        texts = [c.text for c in chunks]
+        embeddings = get_embeddings(texts)
+        self.chroma.add(ids=ids, texts=texts, embeddings=embeddings, metadatas=[c.metadata for c in chunks])
+        self._pending.difference_update(ids)
+        self.stored += len(chunks)
+        logger.info("Stored %d chunks in ChromaDB (%d so far)", len(chunks), self.stored)
+
+
+class _GraphWriter:
+    """Lazily connects to Neo4j and stops extracting after the first failure."""
+
+    def __init__(self) -> None:
+        self._neo4j: Neo4jClient | None = None
+        self.entities = 0
+        self.error: str | None = None
+
+    def _client(self) -> Neo4jClient | None:
+        if self.error is not None:
+            return None
+        if self._neo4j is None:
+            try:
+                self._neo4j = Neo4jClient()
+                self._neo4j.ensure_schema()
+            except Exception as exc:
+                self._fail(exc)
+        return self._neo4j
+
+    def _fail(self, exc: Exception) -> None:
+        self.error = str(exc)
+        logger.exception("Knowledge graph extraction failed (Neo4j may not be running)")
+
+    def ready(self) -> bool:
+        """Connect if needed; False once Neo4j has failed."""
+        return self._client() is not None
+
+    def extract(self, doc: Document | MappedDocument, replace: bool) -> bool:
+        """Extract a document into the graph; returns whether it was stored."""
+        neo4j = self._client()
+        if neo4j is None:
+            return False
+        if isinstance(doc, MappedDocument):
+            # Stream extraction chunks window by window instead of materialising the file.
+            text = (
+                chunk.text
+                for chunks in chunk_windows(doc.windows(), "recursive", MAX_EXTRACTION_CHARS, 0)
+                for chunk in chunks
+            )
+        else:
+            text = doc.content
+        try:
+            with neo4j.session(write=True):
+                if replace:
+                    neo4j.delete_document_mentions(doc.metadata["source"])
+                self.entities += extract_and_store(text, doc.metadata, neo4j)
+        except Exception as exc:
+            self._fail(exc)
+            return False
+        return True
+
+    def delete(self, source: str) -> bool:
+        """Remove a document's nodes from the graph; returns whether that succeeded."""
+        neo4j = self._client()
+        if neo4j is None:
+            return False
+        try:
+            neo4j.delete_document(source)
+            update_entity_index(removed=[source])
+        except Exception as exc:
+            self._fail(exc)
+            return False
+        return True
+
+    def close(self) -> None:
+        if self._neo4j is not None:
+            self._neo4j.close()
+
+
+def _advance_manifest(
+    manifest: Manifest, plan: ManifestPlan, chunk_ids_by_source: dict[str, list[str]], graph_done: dict[str, bool]
+) -> None:
+    """Record a run whose vector stage completed; graph failures stay pending for the next run."""
+    for source, ids in chunk_ids_by_source.items():
+        manifest.record(Path(source), ids, graph=graph_done.get(source, False))
+    for path in plan.graph_pending:
+        if graph_done.get(str(path), False):
+            manifest.entries[str(path)].graph = True
+    for source in plan.removed:
+        if graph_done.get(source, False):
+            manifest.forget(source)
+        else:
+            # Its chunks are gone; keep the entry so the graph deletion is retried,
+            # with a size no file has, so the file counts as changed if it reappears.
+            entry = manifest.entries[source]
+            entry.chunk_ids, entry.graph, entry.size, entry.sha256 = [], False, -1, ""
+    manifest.save()
+
+
+def run_pipeline(
+    data_dir: str | None = None,
+    incremental: bool = False,
+    flush_size: int | None = None,
+) -> dict:
     """Run the full ingestion pipeline.
 
+    Documents are loaded, chunked and graph-extracted one at a time. Chunks
+    are buffered and embedded + upserted every flush_size chunks (default:
+    settings.ingest_flush_size), so peak memory does not grow with the corpus.
+    Unless settings.dedup_enabled is off, exact and near-duplicate chunks are
+    dropped before embedding and recorded on their canonical chunk.
+
+    With incremental=True, only files that are new or changed since the last
+    incremental run (per the manifest at settings.ingest_manifest_path) are
+    processed. Chunks and MENTIONS edges left behind by changed or deleted
+    files are removed. The manifest records the vector and graph stages
+    separately: files whose graph extraction failed, or ran without Neo4j,
+    only get the graph stage retried on later runs.
+
     Returns a summary dict with counts of documents, chunks, and entities processed.
     """
     data_dir = data_dir or settings.data_dir
+    flush_size = flush_size or settings.ingest_flush_size
 
-    # 1. Load documents
     logger.info("Loading documents from %s", data_dir)
-    documents = load_directory(data_dir)
+    manifest: Manifest | None = None
+    plan = ManifestPlan()
+    if incremental:
+        manifest = Manifest.load(settings.ingest_manifest_path)
+        plan = manifest.plan(find_documents(data_dir), data_dir)
+        logger.info(
+            "Incremental ingest: %d changed, %d unchanged, %d removed",
+            len(plan.changed),
+            len(plan.unchanged),
+            len(plan.removed),
+        )
+        documents = iter_documents(plan.changed)
+    else:
+        documents = iter_directory(data_dir)
 
-    if not documents:
-        logger.warning("No documents found in %s", data_dir)
-        return {"documents": 0, "chunks": 0, "entities": 0}
+    dedup = ChunkDeduplicator(settings.dedup_threshold) if settings.dedup_enabled else None
+    chunks_writer = _ChunkWriter(flush_size, dedup)
+    graph_writer = _GraphWriter()
+    document_count = 0
+    chunk_count = 0
+    chunk_ids_by_source: dict[str, list[str]] = {}
+    graph_done: dict[str, bool] = {}  # per source: did its graph stage succeed this run
+    stale_ids: set[str] = set()
 
-    # 2. Chunk documents
-    all_chunks = []
-    for doc in documents:
-        chunks = chunk_text(
-            doc.content,
-            strategy="recursive",
-            chunk_size=settings.chunk_size,
-            overlap=settings.chunk_overlap,
-            metadata=doc.metadata,
-        )
-        all_chunks.extend(chunks)
+    # The entity name index is rebuilt once when the run ends, not per document.
+    with batched_entity_updates():
+        try:
+            for doc in documents:
+                source = doc.metadata.get("source", "unknown")
+                document_count += 1
+                ids: list[str] = []
+                for chunks in _iter_chunk_batches(doc):
+                    batch_ids = [_build_chunk_id(i, c.text, c.metadata) for i, c in enumerate(chunks, len(ids))]
+                    ids.extend(chunks_writer.write(batch_ids, chunks))
+                    chunk_count += len(chunks)
 
-    logger.info("Created %d chunks from %d documents", len(all_chunks), len(documents))
+                previous = manifest.entries.get(source) if manifest is not None else None
+                if manifest is not None:
+                    chunk_ids_by_source[source] = ids
+                if previous is not None:
+                    stale_ids.update(previous.chunk_ids)
 
-    # 3. Generate embeddings and store in ChromaDB
-    if all_chunks:
-        chroma = ChromaStore()
-        texts = [c.text for c in all_chunks]
-        metadatas = [c.metadata for c in all_chunks]
-        ids = [_build_chunk_id(i, c.text, c.metadata) for i, c in enumerate(all_chunks)]
+                graph_done[source] = graph_writer.extract(doc, replace=previous is not None)
 
-        embeddings = get_embeddings(texts)
-        chroma.add(ids=ids, texts=texts, embeddings=embeddings, metadatas=metadatas)
-        logger.info("Stored %d chunks in ChromaDB", len(all_chunks))
-    else:
-        logger.warning("No non-empty chunks generated; skipping vector storage")
+            chunks_writer.close()
 
-    # 4. Extract entities/relations and store in Neo4j
-    entity_count = 0
-    kg_error: str | None = None
-    neo4j = None
-    try:
-        neo4j = Neo4jClient()
-        for doc in documents:
-            count = extract_and_store(doc.content, doc.metadata, neo4j)
-            entity_count += count
-        logger.info("Extracted %d entities into Neo4j", entity_count)
-    except Exception as exc:
-        kg_error = str(exc)
-        logger.exception("Knowledge graph extraction failed (Neo4j may not be running)")
-    finally:
-        if neo4j is not None:
-            neo4j.close()
+            # Unchanged files whose earlier graph extraction failed: graph stage only.
+            if plan.graph_pending and graph_writer.ready():
+                for doc in iter_documents(plan.graph_pending):
+                    graph_done[doc.metadata["source"]] = graph_writer.extract(doc, replace=True)
+
+            for source in plan.removed:
+                stale_ids.update(manifest.entries[source].chunk_ids)
+                graph_done[source] = graph_writer.delete(source)
+
+            if stale_ids:
+                # A canonical chunk stays while any file still maps a duplicate onto it.
+                referenced = {i for ids in chunk_ids_by_source.values() for i in ids}
+                for path in plan.unchanged:
+                    referenced.update(manifest.entries[str(path)].chunk_ids)
+                chunks_writer.chroma.delete(sorted(stale_ids - referenced))
+        finally:
+            graph_writer.close()
+            if document_count or plan.removed or any(graph_done.values()):
+                # Even a partial run may have changed what cached reads would return.
+                corpus_generation.bump()
+
+    if manifest is not None:
+        _advance_manifest(manifest, plan, chunk_ids_by_source, graph_done)
+    graph_retried = sum(graph_done.get(str(path), False) for path in plan.graph_pending)
+
+    if document_count == 0 and not plan.removed:
+        if incremental and plan.unchanged:
+            logger.info("Nothing changed in %s", data_dir)
+            summary = {
+                "documents": 0,
+                "chunks": 0,
+                "entities": graph_writer.entities,
+                "unchanged": len(plan.unchanged),
+                "removed": 0,
+            }
+            if plan.graph_pending:
+                summary["graph_retried"] = graph_retried
+            if graph_writer.error is not None:
+                summary["kg_warning"] = f"Knowledge graph extraction failed: {graph_writer.error}"
+            return summary
+        logger.warning("No documents found in %s", data_dir)
+        return {"documents": 0, "chunks": 0, "entities": 0}
+
+    if chunk_count == 0:
+        logger.warning("No non-empty chunks generated; skipping vector storage")
+    logger.info("Created %d chunks from %d documents", chunk_count, document_count)
+    if chunks_writer.skipped:
+        logger.info("Skipped %d duplicate chunks", chunks_writer.skipped)
+    if graph_writer.error is None:
+        logger.info("Extracted %d entities into Neo4j", graph_writer.entities)
 
     summary: dict = {
-        "documents": len(documents),
-        "chunks": len(all_chunks),
-        "entities": entity_count,
+        "documents": document_count,
+        "chunks": chunk_count,
+        "entities": graph_writer.entities,
+        "duplicates": chunks_writer.skipped,
     }
-    if kg_error is not None:
-        summary["kg_warning"] = f"Knowledge graph extraction failed: {kg_error}"
+    if incremental:
+        summary["unchanged"] = len(plan.unchanged)
+        summary["removed"] = len(plan.removed)
+        if plan.graph_pending:
+            summary["graph_retried"] = graph_retried
+    if graph_writer.error is not None:
+        summary["kg_warning"] = f"Knowledge graph extraction failed: {graph_writer.error}"
     logger.info("Pipeline complete: %s", summary)
     return summary
 
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format="%(levelname)s | %(name)s | %(message)s")
-    run_pipeline()
+    parser = argparse.ArgumentParser(description="Ingest documents into ChromaDB and Neo4j.")
+    parser.add_argument("data_dir", nargs="?", default=None, help="Directory to ingest (default: settings.data_dir)")
+    parser.add_argument("--incremental", action="store_true", help="Only process new or changed files")
+    args = parser.parse_args()
+    run_pipeline(data_dir=args.data_dir, incremental=args.incremental)
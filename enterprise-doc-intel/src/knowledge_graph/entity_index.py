@@ -0,0 +1,269 @@
+"""In-process index of knowledge graph entity names for matching them in queries.
+
+Names are tokenized into words (and single punctuation marks) and compiled
+into an Aho-Corasick automaton over those tokens, so finding every entity
+mentioned in a query takes one pass over the query, matches only whole
+words, and never asks Neo4j for the entity list.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+
+from src.config import settings
+from src.knowledge_graph.neo4j_client import Neo4jClient
+
+logger = logging.getLogger(__name__)
+
+MIN_ENTITY_LENGTH = 3  # skip very short names to avoid false positives (e.g. "IT", "AI")
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def _tokens(text: str) -> tuple[str, ...]:
+    return tuple(_TOKEN_RE.findall(text.casefold()))
+
+
+class _Automaton:
+    """Immutable Aho-Corasick automaton over token sequences."""
+
+    __slots__ = ("goto", "fail", "output", "output_link")
+
+    def __init__(self, patterns: dict[tuple[str, ...], tuple[str, ...]]) -> None:
+        goto: list[dict[str, int]] = [{}]
+        output: list[tuple[str, ...]] = [()]
+        for pattern, names in patterns.items():
+            state = 0
+            for token in pattern:
+                nxt = goto[state].get(token)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][token] = nxt
+                    goto.append({})
+                    output.append(())
+                state = nxt
+            output[state] = names
+
+        # Breadth-first: fail = longest proper suffix that is also a trie path;
+        # output_link = nearest state on the fail chain that ends a pattern.
+        fail = [0] * len(goto)
+        output_link = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and token not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(token, 0)
+                output_link[nxt] = fail[nxt] if output[fail[nxt]] else output_link[fail[nxt]]
+
+        self.goto = goto
+        self.fail = fail
+        self.output = output
+        self.output_link = output_link
+
+    def find(self, tokens: Iterable[str]) -> list[str]:
+        goto, fail, output, output_link = self.goto, self.fail, self.output, self.output_link
+        found: dict[str, None] = {}
+        state = 0
+        for token in tokens:
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            match = state if output[state] else output_link[state]
+            while match:
+                for name in output[match]:
+                    found.setdefault(name)
+                match = output_link[match]
+        return list(found)
+
+
+class EntityIndex:
+    """Set of entity names that can be matched against free text.
+
+    Matching is case-insensitive and on whole words: "VPN" matches "the vpn
+    client" but not "vpnclient". Names shorter than MIN_ENTITY_LENGTH are
+    ignored. add() and discard() rebuild the automaton on the caller's
+    thread and swap it in atomically, so find() never blocks or waits for a
+    rebuild. Inside batch() they only record the change, and the automaton
+    is rebuilt once when the outermost batch ends.
+    """
+
+    def __init__(self, names: Iterable[str] = ()) -> None:
+        self._lock = threading.Lock()
+        self._patterns: dict[tuple[str, ...], set[str]] = {}
+        self._automaton = _Automaton({})
+        self._batch_depth = 0
+        self._dirty = False
+        self.add(names)
+
+    @property
+    def size(self) -> int:
+        return sum(len(names) for names in self._patterns.values())
+
+    def add(self, names: Iterable[str]) -> None:
+        with self._lock:
+            changed = False
+            for name in names:
+                name = (name or "").strip()
+                if len(name) < MIN_ENTITY_LENGTH:
+                    continue
+                pattern = _tokens(name)
+                if pattern and name not in self._patterns.get(pattern, ()):
+                    self._patterns.setdefault(pattern, set()).add(name)
+                    changed = True
+            if changed:
+                self._changed()
+
+    def discard(self, names: Iterable[str]) -> None:
+        with self._lock:
+            changed = False
+            for name in names:
+                name = (name or "").strip()
+                pattern = _tokens(name)
+                existing = self._patterns.get(pattern)
+                if existing and name in existing:
+                    existing.discard(name)
+                    if not existing:
+                        del self._patterns[pattern]
+                    changed = True
+            if changed:
+                self._changed()
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Defer rebuilding for add()/discard() calls made inside the block to its end.
+
+        find() keeps matching the names from before the block until then.
+        """
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if not self._batch_depth and self._dirty:
+                    self._rebuild()
+
+    def _changed(self) -> None:
+        self._dirty = True
+        if not self._batch_depth:
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        self._automaton = _Automaton({pattern: tuple(sorted(names)) for pattern, names in self._patterns.items()})
+        self._dirty = False
+
+    def find(self, text: str) -> list[str]:
+        """Entity names mentioned in text, in order of where their mention ends."""
+        return self._automaton.find(_tokens(text))
+
+
+# Process-wide index, loaded from Neo4j on first use (or at API startup).
+# Ingests run by other processes (e.g. the CLI) never call
+# update_entity_index() here, so every ENTITY_INDEX_TTL seconds the entity
+# count in Neo4j is compared with the one seen at load time and the index
+# is reloaded when it differs. Every _FULL_RELOAD_CHECKS-th check reloads
+# regardless, to catch changes that leave the count unchanged.
+_FULL_RELOAD_CHECKS = 10
+
+_index: EntityIndex | None = None
+_index_lock = threading.Lock()
+_node_count: int | None = None  # entity count in Neo4j when the index was loaded
+_checked_at = 0.0  # time.monotonic() of the last load or staleness check
+_checks = 0  # staleness checks since the last load
+
+
+def load_entity_index(neo4j: Neo4jClient) -> EntityIndex:
+    """(Re)build the process-wide index from every entity name in the graph."""
+    global _index, _node_count, _checked_at, _checks
+    # Counted first: a write landing between the two reads makes the next check reload.
+    count = neo4j.count_entities()
+    names = [entity["name"] for entity in neo4j.get_all_entities(limit=None) if entity.get("name")]
+    index = EntityIndex(names)
+    with _index_lock:
+        _index = index
+        _node_count = count
+        _checked_at = time.monotonic()
+        _checks = 0
+    logger.info("Entity name index loaded with %d names", index.size)
+    return index
+
+
+def _refresh_if_stale(neo4j: Neo4jClient, index: EntityIndex) -> EntityIndex:
+    global _checked_at, _checks
+    with _index_lock:
+        if time.monotonic() - _checked_at < settings.entity_index_ttl:
+            return index
+        # Claim this check; concurrent callers keep using the current index meanwhile.
+        _checked_at = time.monotonic()
+        _checks += 1
+        full_reload = _checks >= _FULL_RELOAD_CHECKS
+        known_count = _node_count
+    try:
+        if full_reload or neo4j.count_entities() != known_count:
+            return load_entity_index(neo4j)
+    except Exception as exc:
+        logger.warning("Could not refresh the entity name index, keeping the loaded one: %s", exc)
+    return index
+
+
+def get_entity_index(neo4j: Neo4jClient) -> EntityIndex:
+    """Return the process-wide index, loading it from neo4j if needed.
+
+    An index older than ENTITY_INDEX_TTL is reloaded if the graph changed since.
+    """
+    index = _index
+    if index is None:
+        with _index_lock:
+            index = _index
+        if index is None:
+            return load_entity_index(neo4j)
+    if time.monotonic() - _checked_at >= settings.entity_index_ttl:
+        index = _refresh_if_stale(neo4j, index)
+    return index
+
+
+def update_entity_index(added: Iterable[str] = (), removed: Iterable[str] = ()) -> None:
+    """Apply graph changes to the process-wide index, if it has been loaded.
+
+    An index that was never loaded is left alone: its first load reads the
+    current names straight from Neo4j.
+    """
+    index = _index
+    if index is None:
+        return
+    index.add(added)
+    index.discard(removed)
+
+
+@contextmanager
+def batched_entity_updates() -> Iterator[None]:
+    """Collect update_entity_index() calls made inside the block into one rebuild.
+
+    Used by ingestion, which updates the index once per document.
+    """
+    index = _index
+    if index is None:
+        yield
+        return
+    with index.batch():
+        yield
+
+
+def reset_entity_index() -> None:
+    global _index, _node_count, _checked_at, _checks
+    with _index_lock:
+        _index = None
+        _node_count = None
+        _checked_at = 0.0
+        _checks = 0
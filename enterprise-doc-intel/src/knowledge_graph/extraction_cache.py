@@ -0,0 +1,37 @@
+"""On-disk cache of parsed LLM entity-extraction results."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+
+from src.cache import CacheStats, PersistentCache
+
+
+def _cache_key(model: str, prompt_version: str, text: str) -> str:
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model}:{prompt_version}:{digest}"
+
+
+class ExtractionCache:
+    """Extraction JSON keyed by (LLM model name, prompt version, SHA-256 of the text)."""
+
+    def __init__(self, path: str, max_bytes: int) -> None:
+        self._store = PersistentCache(path, max_bytes=max_bytes)
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._store.stats
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def get(self, model: str, prompt_version: str, text: str) -> dict | None:
+        value = self._store.get(_cache_key(model, prompt_version, text))
+        return json.loads(value) if value is not None else None
+
+    def put(self, model: str, prompt_version: str, text: str, result: dict) -> None:
+        self._store.put(_cache_key(model, prompt_version, text), json.dumps(result).encode("utf-8"))
+
+    def close(self) -> None:
+        self._store.close()
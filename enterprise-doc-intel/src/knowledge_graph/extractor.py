@@ -2,18 +2,24 @@
 
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
-
-from ollama import Client
+import threading
+from collections.abc import Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 
 from src.config import settings
-
-_client = Client(host=settings.ollama_base_url, timeout=settings.ollama_timeout)
+from src.ingestion.chunker import recursive_chunks
+from src.knowledge_graph.entity_index import update_entity_index
+from src.knowledge_graph.extraction_cache import ExtractionCache
 from src.knowledge_graph.neo4j_client import Neo4jClient
+from src.llm import BACKGROUND, gateway
 
 logger = logging.getLogger(__name__)
 
+MAX_EXTRACTION_CHARS = 3000  # Limit input size per LLM call; longer text is extracted chunk by chunk
+
 EXTRACTION_PROMPT = """\
 You are an entity and relationship extractor. Given the following text, extract:
 1. **Entities**: Important nouns — people, organizations, systems, policies, concepts, technologies.
@@ -36,24 +42,52 @@ Text:
 {text}
 """
 
+# Changes whenever the prompt does, so cached extractions from an older prompt are never reused.
+PROMPT_VERSION = hashlib.sha256(EXTRACTION_PROMPT.encode("utf-8")).hexdigest()[:12]
+
+# Opened on first use so importing this module never touches the disk.
+_cache: ExtractionCache | None = None
+_cache_lock = threading.Lock()
+
+
+def _get_cache() -> ExtractionCache | None:
+    global _cache
+    if _cache is None and settings.extraction_cache_enabled:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ExtractionCache(
+                    settings.extraction_cache_path,
+                    max_bytes=settings.extraction_cache_max_mb * 1024 * 1024,
+                )
+    return _cache
+
 
 def extract_entities_and_relations(text: str) -> dict:
     """Use the LLM to extract entities and relationships from text.
 
     Returns a dict with "entities" and "relationships" lists.
-    Falls back to empty lists on parse failure.
+    Falls back to empty lists on parse failure. Parsed results are cached
+    per (model, prompt version, text), so re-ingesting known text skips the LLM.
     """
     if not text or not text.strip():
         logger.debug("Skipping entity extraction for empty text")
         return {"entities": [], "relationships": []}
 
-    prompt = EXTRACTION_PROMPT.format(text=text[:3000])  # Limit input size
+    text = text[:MAX_EXTRACTION_CHARS]
+    cache = _get_cache()
+    if cache is not None:
+        cached = cache.get(settings.ollama_model, PROMPT_VERSION, text)
+        if cached is not None:
+            return cached
+
+    prompt = EXTRACTION_PROMPT.format(text=text)
 
     try:
-        response = _client.chat(
+        response = gateway.chat(
             model=settings.ollama_model,
             messages=[{"role": "user", "content": prompt}],
             options={"temperature": 0.0},
+            priority=BACKGROUND,
         )
     except Exception as exc:
         logger.error("Ollama entity extraction failed: %s", exc)
@@ -68,42 +102,149 @@ def extract_entities_and_relations(text: str) -> dict:
             start = content.index("{")
             end = content.rindex("}") + 1
             content = content[start:end]
-        return json.loads(content)
+        result = json.loads(content)
     except (json.JSONDecodeError, ValueError):
         logger.warning("Failed to parse LLM extraction output, returning empty result")
         return {"entities": [], "relationships": []}
 
+    # Failures above are not cached, so they are retried on the next ingest.
+    if cache is not None and isinstance(result, dict):
+        cache.put(settings.ollama_model, PROMPT_VERSION, text, result)
+    return result
+
+
+def split_for_extraction(text: str) -> list[str]:
+    """Split a document into chunks of at most MAX_EXTRACTION_CHARS for extraction."""
+    return [chunk.text for chunk in recursive_chunks(text, chunk_size=MAX_EXTRACTION_CHARS, overlap=0)]
 
-def extract_and_store(text: str, metadata: dict, neo4j: Neo4jClient) -> int:
-    """Extract entities/relations from text and store them in Neo4j.
 
-    Also creates a Document node linked to extracted entities.
-    Returns the number of entities created.
+def _field(item: dict, key: str, default: str = "") -> str:
+    value = item.get(key)
+    return value.strip() if isinstance(value, str) and value.strip() else default
+
+
+def _records(result: dict, key: str) -> list[dict]:
+    items = result.get(key)
+    if not isinstance(items, list):
+        return []
+    records = [item for item in items if isinstance(item, dict)]
+    if len(records) < len(items):
+        logger.warning("Skipping %d malformed %s in extraction output", len(items) - len(records), key)
+    return records
+
+
+def merge_extractions(results: Iterable[dict]) -> dict:
+    """Merge per-chunk extraction results into one, dropping duplicates.
+
+    Entities are matched by case-insensitive name; the first label seen wins.
+    Relationships are matched by (from, to, type) after mapping both ends to
+    the merged entity names. Results, entities and relationships that are
+    not JSON objects (the LLM does not always follow the prompt) are skipped.
     """
-    result = extract_entities_and_relations(text)
+    entities: dict[str, dict] = {}
+    relationships: dict[tuple[str, str, str], dict] = {}
+
+    for result in results:
+        if not isinstance(result, dict):
+            logger.warning("Skipping extraction output of type %s, expected an object", type(result).__name__)
+            continue
+
+        for entity in _records(result, "entities"):
+            name = _field(entity, "name")
+            if name and name.casefold() not in entities:
+                entities[name.casefold()] = {"name": name, "label": _field(entity, "label", "Concept")}
+
+        for rel in _records(result, "relationships"):
+            from_name = _field(rel, "from")
+            to_name = _field(rel, "to")
+            if not from_name or not to_name:
+                continue
+            from_name = entities.get(from_name.casefold(), {}).get("name", from_name)
+            to_name = entities.get(to_name.casefold(), {}).get("name", to_name)
+            rel_type = _field(rel, "type", "RELATES_TO").replace(" ", "_")
+            key = (from_name.casefold(), to_name.casefold(), rel_type)
+            relationships.setdefault(key, {"from": from_name, "to": to_name, "type": rel_type})
+
+    return {"entities": list(entities.values()), "relationships": list(relationships.values())}
+
+
+def extract_from_chunks(chunks: Iterable[str], concurrency: int | None = None) -> dict:
+    """Run extraction on every chunk through a bounded thread pool and merge the results.
+
+    At most concurrency (default: settings.extract_concurrency) LLM calls run
+    at once, and chunks are pulled from the iterable only as workers free up,
+    so a lazily generated chunk stream is never fully materialised. Repeated
+    chunk texts are extracted once; they are recognised by a 16-byte digest,
+    so the chunks themselves are not kept.
+    """
+    concurrency = max(1, concurrency or settings.extract_concurrency)
+    results: dict[int, dict] = {}
+    seen: set[bytes] = set()
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="extract") as pool:
+        pending: dict[Future, int] = {}
+        for index, chunk in enumerate(chunks):
+            if not chunk.strip():
+                continue
+            digest = hashlib.blake2b(chunk.encode("utf-8"), digest_size=16).digest()
+            if digest in seen:
+                continue
+            seen.add(digest)
+            if len(pending) >= concurrency:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[pending.pop(future)] = future.result()
+            pending[pool.submit(extract_entities_and_relations, chunk)] = index
+        for future, index in pending.items():
+            results[index] = future.result()
+
+    # Merge in document order so "first label wins" does not depend on timing.
+    return merge_extractions(results[index] for index in sorted(results))
+
+
+def extract_and_store(text: str | Iterable[str], metadata: dict, neo4j: Neo4jClient) -> int:
+    """Extract entities/relations from a document and store them in Neo4j.
+
+    text is the whole document, which is split into MAX_EXTRACTION_CHARS
+    chunks, or an iterable of already split chunks (e.g. from the windows of
+    a memory-mapped file). Chunks are extracted concurrently and the merged,
+    deduplicated result is written with one bulk transaction, together with
+    a Document node linked to every extracted entity.
+    Returns the number of distinct entities extracted.
+    """
+    chunks = split_for_extraction(text) if isinstance(text, str) else text
+    result = extract_from_chunks(chunks)
 
-    entities = result.get("entities", [])
-    relationships = result.get("relationships", [])
+    entities = result["entities"]
+    relationships = result["relationships"]
 
-    # Create a document node
     source = metadata.get("source", "unknown")
-    neo4j.create_entity("Document", source, {"type": metadata.get("type", "unknown")})
+    node_rows = [{"label": "Document", "name": source, "properties": {"type": metadata.get("type", "unknown")}}]
+    edge_rows = []
+    labels: dict[str, str] = {}
 
-    # Create entity nodes
     for entity in entities:
-        name = entity.get("name", "").strip()
-        label = entity.get("label", "Concept").strip()
-        if name:
-            neo4j.create_entity(label, name)
-            neo4j.create_relationship("Document", source, label, name, "MENTIONS")
+        name, label = entity["name"], entity["label"]
+        labels[name] = label
+        node_rows.append({"label": label, "name": name})
+        edge_rows.append(
+            {"from_label": "Document", "from_name": source, "to_label": label, "to_name": name, "type": "MENTIONS"}
+        )
 
-    # Create relationships
     for rel in relationships:
-        from_name = rel.get("from", "").strip()
-        to_name = rel.get("to", "").strip()
-        rel_type = rel.get("type", "RELATES_TO").strip().replace(" ", "_")
-        if from_name and to_name:
-            neo4j.create_relationship("Concept", from_name, "Concept", to_name, rel_type)
+        # Attach to the extracted node when its label is known, instead of a duplicate Concept node.
+        edge_rows.append(
+            {
+                "from_label": labels.get(rel["from"], "Concept"),
+                "from_name": rel["from"],
+                "to_label": labels.get(rel["to"], "Concept"),
+                "to_name": rel["to"],
+                "type": rel["type"],
+            }
+        )
+
+    neo4j.merge_graph(node_rows, edge_rows)
+    update_entity_index(added=[row["name"] for row in node_rows])
 
     logger.info("Extracted %d entities, %d relationships from %s", len(entities), len(relationships), source)
     return len(entities)
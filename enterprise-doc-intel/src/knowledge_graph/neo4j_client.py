@@ -4,9 +4,15 @@ from __future__ import annotations
 
 import logging
 import re
-from typing import Any
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, TypeVar
 
-from neo4j import GraphDatabase
+from neo4j import READ_ACCESS, WRITE_ACCESS, GraphDatabase, Session
+from neo4j.exceptions import ClientError
 
 from src.config import settings
 
@@ -24,6 +30,27 @@ _ALLOWED_LABELS = {
     "Document",
 }
 _ALLOWED_REL_TYPES = {"RELATES_TO", "PART_OF", "GOVERNS", "USES", "DEPENDS_ON", "DEFINES", "MENTIONS"}
+_UNWIND_BATCH_SIZE = 1000  # rows per UNWIND statement
+
+# Every node this client writes also carries ENTITY_LABEL, so lookups by name
+# that do not know the node's label can still use an index.
+ENTITY_LABEL = "Entity"
+FULLTEXT_INDEX = "entity_names"
+# After a failed full-text query, lookups scan for this long before trying the index again.
+_FULLTEXT_RETRY_SECONDS = 60
+# How long ensure_schema() waits for new indexes to come online.
+_INDEX_AWAIT_SECONDS = 300
+_LUCENE_TERM_RE = re.compile(r"\w+")
+
+# Relationships get_neighborhoods() examines per frontier node and hop before
+# ranking neighbors, so hub nodes cannot blow up a single graph-context query.
+_NEIGHBORHOOD_PATH_LIMIT = 1000
+
+T = TypeVar("T")
+
+# The session opened by the innermost Neo4jClient.session() block in this
+# thread/task, as (client, session, is_write).
+_active_session: ContextVar[tuple[Neo4jClient, Session, bool] | None] = ContextVar("neo4j_session", default=None)
 
 
 def _safe_identifier(value: str, fallback: str, allowed: set[str] | None = None) -> str:
@@ -35,9 +62,101 @@ def _safe_identifier(value: str, fallback: str, allowed: set[str] | None = None)
     return candidate
 
 
+def schema_statements() -> list[str]:
+    """Cypher that creates the knowledge graph's constraints and indexes (idempotent).
+
+    - a uniqueness constraint on name per allowed label, which MERGE uses
+      and which also backs an index for label + name lookups;
+    - a range index on :Entity(name) for lookups by name alone;
+    - a full-text index on :Entity(name) for search_entities.
+    """
+    statements = [
+        f"CREATE CONSTRAINT {label.lower()}_name_unique IF NOT EXISTS FOR (n:{label}) REQUIRE n.name IS UNIQUE"
+        for label in sorted(_ALLOWED_LABELS)
+    ]
+    statements.append(f"CREATE INDEX entity_name IF NOT EXISTS FOR (n:{ENTITY_LABEL}) ON (n.name)")
+    statements.append(
+        f"CREATE FULLTEXT INDEX {FULLTEXT_INDEX} IF NOT EXISTS FOR (n:{ENTITY_LABEL}) ON EACH [n.name]"
+    )
+    return statements
+
+
+def _labels(var: str) -> str:
+    """Cypher for a node's labels, without the internal ENTITY_LABEL."""
+    return f"[label IN labels({var}) WHERE label <> '{ENTITY_LABEL}']"
+
+
+def _fulltext_query(query: str) -> str:
+    """Turn free text into a Lucene query matching names that contain every word."""
+    return " AND ".join(f"*{term}*" for term in _LUCENE_TERM_RE.findall(query.lower()))
+
+
+def _batched(rows: list[dict]) -> list[list[dict]]:
+    return [rows[i : i + _UNWIND_BATCH_SIZE] for i in range(0, len(rows), _UNWIND_BATCH_SIZE)]
+
+
+def _entity_statements(entities: list[dict]) -> list[tuple[str, dict]]:
+    """One UNWIND ... MERGE statement per label (and per batch of rows).
+
+    Each entity is a dict with "label", "name" and optional "properties".
+    Rows with empty names are dropped and repeated (label, name) pairs are
+    merged, so each node is written once.
+    """
+    by_label: dict[str, dict[str, dict]] = defaultdict(dict)
+    for entity in entities:
+        name = (entity.get("name") or "").strip()
+        if not name:
+            continue
+        label = _safe_identifier(entity.get("label") or "", fallback="Concept", allowed=_ALLOWED_LABELS)
+        by_label[label].setdefault(name, {}).update(entity.get("properties") or {})
+
+    statements = []
+    for label, props_by_name in sorted(by_label.items()):
+        # Sorted rows keep lock acquisition order stable across concurrent writers.
+        rows = [{"name": name, "props": props} for name, props in sorted(props_by_name.items())]
+        cypher = f"UNWIND $rows AS row MERGE (e:{label} {{name: row.name}}) SET e:{ENTITY_LABEL}, e += row.props"
+        statements.extend((cypher, {"rows": batch}) for batch in _batched(rows))
+    return statements
+
+
+def _relationship_statements(relationships: list[dict]) -> list[tuple[str, dict]]:
+    """One UNWIND ... MERGE statement per (from label, type, to label) group.
+
+    Each relationship is a dict with "from_label", "from_name", "to_label",
+    "to_name", "type" and optional "properties".
+    """
+    groups: dict[tuple[str, str, str], dict[tuple[str, str], dict]] = defaultdict(dict)
+    for rel in relationships:
+        from_name = (rel.get("from_name") or "").strip()
+        to_name = (rel.get("to_name") or "").strip()
+        if not from_name or not to_name:
+            continue
+        key = (
+            _safe_identifier(rel.get("from_label") or "", fallback="Concept", allowed=_ALLOWED_LABELS),
+            _safe_identifier(rel.get("type") or "", fallback="RELATES_TO", allowed=_ALLOWED_REL_TYPES),
+            _safe_identifier(rel.get("to_label") or "", fallback="Concept", allowed=_ALLOWED_LABELS),
+        )
+        groups[key].setdefault((from_name, to_name), {}).update(rel.get("properties") or {})
+
+    statements = []
+    for (from_label, rel_type, to_label), props_by_pair in sorted(groups.items()):
+        rows = [{"from": a, "to": b, "props": props} for (a, b), props in sorted(props_by_pair.items())]
+        cypher = (
+            "UNWIND $rows AS row "
+            f"MERGE (a:{from_label} {{name: row.from}}) "
+            f"MERGE (b:{to_label} {{name: row.to}}) "
+            f"MERGE (a)-[r:{rel_type}]->(b) "
+            f"SET a:{ENTITY_LABEL}, b:{ENTITY_LABEL}, r += row.props"
+        )
+        statements.extend((cypher, {"rows": batch}) for batch in _batched(rows))
+    return statements
+
+
 class Neo4jClient:
     """Thin wrapper around the Neo4j Python driver."""
 
+    _fulltext_retry_at = 0.0  # time.monotonic() before which full-text lookups fall back to scans
+
     def __init__(self) -> None:
         self._driver = GraphDatabase.driver(
             settings.neo4j_uri,
@@ -46,15 +165,139 @@ class Neo4jClient:
         self._driver.verify_connectivity()
         logger.info("Connected to Neo4j at %s", settings.neo4j_uri)
 
+    def ensure_schema(self) -> None:
+        """Create constraints and indexes, and label nodes written before they existed.
+
+        Safe to run on every startup. A constraint that cannot be created
+        (e.g. because existing data already holds duplicate names) is logged
+        and skipped rather than failing startup. The label backfill scans
+        every node, so it only runs when the node counts (read from Neo4j's
+        count store, without a scan) show nodes lacking ENTITY_LABEL. Waits
+        for new indexes to finish populating, so the first queries do not
+        hit an index that is not online yet.
+        """
+        if self._count_nodes() > self._count_nodes(ENTITY_LABEL):
+            logger.info("Labelling nodes written before the %s label existed", ENTITY_LABEL)
+            self.run_query(
+                f"MATCH (n) WHERE n.name IS NOT NULL AND NOT n:{ENTITY_LABEL} "
+                f"CALL {{ WITH n SET n:{ENTITY_LABEL} }} IN TRANSACTIONS OF 10000 ROWS"
+            )
+        for statement in schema_statements():
+            try:
+                self.run_query(statement)
+            except ClientError as exc:
+                logger.warning("Could not apply graph schema statement %r: %s", statement, exc)
+        try:
+            self.run_query(f"CALL db.awaitIndexes({_INDEX_AWAIT_SECONDS})")
+        except ClientError as exc:
+            logger.warning("Graph indexes still populating, lookups may be slow until they are online: %s", exc)
+        logger.info("Knowledge graph schema is in place")
+
+    def _fulltext_ready(self) -> bool:
+        return time.monotonic() >= self._fulltext_retry_at
+
+    def _fulltext_failed(self, exc: ClientError) -> None:
+        """Scan instead of using the full-text index for a while, then try it again.
+
+        The error may be transient (an index still populating), so the index
+        is never given up on for good.
+        """
+        self._fulltext_retry_at = time.monotonic() + _FULLTEXT_RETRY_SECONDS
+        logger.warning(
+            "Full-text index %s unavailable, falling back to a scan for %ds: %s",
+            FULLTEXT_INDEX,
+            _FULLTEXT_RETRY_SECONDS,
+            exc,
+        )
+
+    def count_entities(self) -> int:
+        """Number of entity nodes in the graph."""
+        return self._count_nodes(ENTITY_LABEL)
+
+    def _count_nodes(self, label: str | None = None) -> int:
+        pattern = f"(n:{label})" if label else "(n)"
+        rows = self.run_query(f"MATCH {pattern} RETURN count(n) AS count")
+        return rows[0]["count"] if rows else 0
+
     def close(self) -> None:
         self._driver.close()
 
+    def _current_session(self) -> tuple[Session, bool] | None:
+        active = _active_session.get()
+        if active is None or active[0] is not self:
+            return None
+        return active[1], active[2]
+
+    @contextmanager
+    def session(self, write: bool = False) -> Iterator[Session]:
+        """Reuse one driver session for every query issued inside the block.
+
+        Read sessions are routed to read replicas on a cluster. Blocks nest:
+        an inner block reuses the outer session unless it needs write access
+        and the outer one is read-only.
+        """
+        current = self._current_session()
+        if current is not None and (current[1] or not write):
+            yield current[0]
+            return
+
+        access_mode = WRITE_ACCESS if write else READ_ACCESS
+        with self._driver.session(default_access_mode=access_mode) as session:
+            token = _active_session.set((self, session, write))
+            try:
+                yield session
+            finally:
+                _active_session.reset(token)
+
+    def execute_read(self, work: Callable[..., T], *args: Any) -> T:
+        """Run work(tx, *args) as a managed read transaction (retried on transient errors)."""
+        with self.session() as session:
+            return session.execute_read(work, *args)
+
+    def execute_write(self, work: Callable[..., T], *args: Any) -> T:
+        """Run work(tx, *args) as a managed write transaction (retried on transient errors)."""
+        with self.session(write=True) as session:
+            return session.execute_write(work, *args)
+
     def run_query(self, cypher: str, params: dict | None = None) -> list[dict[str, Any]]:
-        """Execute a Cypher query and return the results as dicts."""
+        """Execute a Cypher query and return the results as dicts.
+
+        Runs in the active session() block if there is one, else in a new session.
+        """
+        current = self._current_session()
+        if current is not None:
+            return [record.data() for record in current[0].run(cypher, params or {})]
         with self._driver.session() as session:
             result = session.run(cypher, params or {})
             return [record.data() for record in result]
 
+    def run_write_transaction(self, statements: list[tuple[str, dict]]) -> None:
+        """Run (cypher, params) statements in order inside one write transaction.
+
+        The driver retries the whole transaction on transient errors, so the
+        statements must be idempotent (MERGE rather than CREATE).
+        """
+        if not statements:
+            return
+
+        def work(tx) -> None:
+            for cypher, params in statements:
+                tx.run(cypher, params).consume()
+
+        self.execute_write(work)
+
+    def merge_entities(self, entities: list[dict]) -> None:
+        """Merge many entity nodes in one transaction, one UNWIND per label."""
+        self.run_write_transaction(_entity_statements(entities))
+
+    def merge_relationships(self, relationships: list[dict]) -> None:
+        """Merge many relationships in one transaction, one UNWIND per label pair and type."""
+        self.run_write_transaction(_relationship_statements(relationships))
+
+    def merge_graph(self, entities: list[dict], relationships: list[dict]) -> None:
+        """Merge entities, then relationships, all in a single transaction."""
+        self.run_write_transaction(_entity_statements(entities) + _relationship_statements(relationships))
+
     def create_entity(self, label: str, name: str, properties: dict | None = None) -> None:
         """Create or merge an entity node. Skips empty names."""
         if not name or not name.strip():
@@ -62,7 +305,7 @@ class Neo4jClient:
             return
         safe_label = _safe_identifier(label, fallback="Concept", allowed=_ALLOWED_LABELS)
         props = properties or {}
-        cypher = f"MERGE (e:{safe_label} {{name: $name}}) SET e += $props"
+        cypher = f"MERGE (e:{safe_label} {{name: $name}}) SET e:{ENTITY_LABEL}, e += $props"
         self.run_query(cypher, {"name": name.strip(), "props": props})
 
     def create_relationship(
@@ -84,33 +327,166 @@ class Neo4jClient:
             f"MERGE (a:{safe_from_label} {{name: $from_name}}) "
             f"MERGE (b:{safe_to_label} {{name: $to_name}}) "
             f"MERGE (a)-[r:{safe_rel_type}]->(b) "
-            "SET r += $props"
+            f"SET a:{ENTITY_LABEL}, b:{ENTITY_LABEL}, r += $props"
         )
         self.run_query(cypher, {"from_name": from_name, "to_name": to_name, "props": props})
 
     def get_neighbors(self, name: str, max_hops: int = 2) -> list[dict[str, Any]]:
-        """Get all entities within N hops of the given entity."""
-        cypher = (
-            "MATCH path = (start {name: $name})-[*1.." + str(max_hops) + "]-(neighbor) "
-            "RETURN DISTINCT neighbor.name AS name, labels(neighbor) AS labels, "
-            "length(path) AS distance "
-            "ORDER BY distance"
-        )
-        return self.run_query(cypher, {"name": name})
+        """Get entities within N hops of the given entity, nearest first.
+
+        At most settings.graph_node_budget entities are returned; see traverse().
+        """
+        result = self.traverse(name, max_hops=max_hops, node_limit=settings.graph_node_budget + 1, edge_limit=0)
+        return [
+            {"name": node["name"], "labels": node["labels"], "distance": node["distance"]}
+            for node in result["nodes"]
+            if node["distance"] > 0
+        ]
 
     def search_entities(self, query: str, limit: int = 10) -> list[dict[str, Any]]:
-        """Search entities by name (case-insensitive contains)."""
+        """Search entities whose name contains every word of query (case-insensitive).
+
+        Uses the full-text index, best matches first. Falls back to a label
+        scan when the index fails (e.g. the schema could not be created, or
+        it is still populating); see _fulltext_failed.
+        """
+        lucene = _fulltext_query(query)
+        if not lucene:
+            return []
+        if self._fulltext_ready():
+            cypher = (
+                "CALL db.index.fulltext.queryNodes($index, $lucene) YIELD node, score "
+                f"RETURN node.name AS name, {_labels('node')} AS labels "
+                "LIMIT $limit"
+            )
+            try:
+                return self.run_query(cypher, {"index": FULLTEXT_INDEX, "lucene": lucene, "limit": limit})
+            except ClientError as exc:
+                self._fulltext_failed(exc)
+
         cypher = (
-            "MATCH (e) WHERE toLower(e.name) CONTAINS toLower($query) "
-            "RETURN e.name AS name, labels(e) AS labels "
+            f"MATCH (e:{ENTITY_LABEL}) WHERE toLower(e.name) CONTAINS toLower($query) "
+            f"RETURN e.name AS name, {_labels('e')} AS labels "
             "LIMIT $limit"
         )
         return self.run_query(cypher, {"query": query, "limit": limit})
 
-    def get_all_entities(self, limit: int = 100) -> list[dict[str, Any]]:
-        """List all entities in the graph."""
-        cypher = "MATCH (e) RETURN e.name AS name, labels(e) AS labels LIMIT $limit"
-        return self.run_query(cypher, {"limit": limit})
+    def get_neighborhoods(
+        self,
+        queries: list[str],
+        max_hops: int = 2,
+        match_limit: int = 3,
+        neighbor_limit: int = 10,
+    ) -> list[dict[str, Any]]:
+        """Neighborhoods of the entities matching each query, for all queries at once.
+
+        Each query is resolved like search_entities() (up to match_limit
+        entities), all in one query; every distinct matched entity then gets
+        its nearest neighbors within max_hops, at most neighbor_limit of
+        them. Like traverse(), neighbors are found breadth-first, with one
+        query per hop covering every entity, inside one read session. Each
+        hop looks at no more than _NEIGHBORHOOD_PATH_LIMIT relationships per
+        frontier node, so a hub's direct neighbors still come first. Returns
+        [{"name": ..., "neighbors": [{"name", "labels", "distance"}, ...]}]
+        in query order, leaving out entities without neighbors.
+        """
+        safe_hops = max(1, min(int(max_hops), 4))
+        terms = [_fulltext_query(query) for query in queries]
+        queries = [query for query, term in zip(queries, terms) if term]
+        terms = [term for term in terms if term]
+        if not terms:
+            return []
+
+        with self.session():
+            starts = self._match_starts(queries, terms, match_limit)
+            neighbors: dict[str, list[dict[str, Any]]] = {start["id"]: [] for start in starts}
+            visited = {start["id"]: {start["id"]} for start in starts}
+            frontier = {start["id"]: [start["id"]] for start in starts}
+            for distance in range(1, safe_hops + 1):
+                rows = [
+                    {"start": start, "node": node, "visited": sorted(visited[start])}
+                    for start, nodes in frontier.items()
+                    for node in nodes
+                ]
+                if not rows:
+                    break
+                candidates: dict[str, dict[str, dict[str, Any]]] = {}
+                for row in self._neighborhood_hop(rows, neighbor_limit):
+                    candidates.setdefault(row["start"], {}).setdefault(row["id"], row)
+
+                frontier = {}
+                for start, found in candidates.items():
+                    layer = sorted(found.values(), key=lambda row: (row["name"] is None, row["name"] or "", row["id"]))
+                    layer = layer[: neighbor_limit - len(neighbors[start])]
+                    neighbors[start].extend(
+                        {"name": row["name"], "labels": row["labels"], "distance": distance} for row in layer
+                    )
+                    visited[start].update(row["id"] for row in layer)
+                    if len(neighbors[start]) < neighbor_limit:
+                        frontier[start] = [row["id"] for row in layer]
+
+        return [{"name": start["name"], "neighbors": neighbors[start["id"]]} for start in starts if neighbors[start["id"]]]
+
+    def _match_starts(self, queries: list[str], terms: list[str], match_limit: int) -> list[dict[str, Any]]:
+        """Distinct entities matching any query, as [{"id", "name"}], in order of the first query matching each."""
+        rank = (
+            "WITH start, min(i) AS rank "
+            "RETURN elementId(start) AS id, start.name AS name "
+            "ORDER BY rank"
+        )
+        if self._fulltext_ready():
+            cypher = (
+                "UNWIND range(0, size($terms) - 1) AS i "
+                "CALL { "
+                "WITH i "
+                "CALL db.index.fulltext.queryNodes($index, $terms[i]) YIELD node "
+                "RETURN node AS start LIMIT $match_limit "
+                "} " + rank
+            )
+            try:
+                return self.run_query(cypher, {"index": FULLTEXT_INDEX, "terms": terms, "match_limit": match_limit})
+            except ClientError as exc:
+                self._fulltext_failed(exc)
+
+        cypher = (
+            "UNWIND range(0, size($queries) - 1) AS i "
+            "CALL { "
+            "WITH i "
+            f"MATCH (start:{ENTITY_LABEL}) WHERE toLower(start.name) CONTAINS toLower($queries[i]) "
+            "RETURN start LIMIT $match_limit "
+            "} " + rank
+        )
+        return self.run_query(cypher, {"queries": queries, "match_limit": match_limit})
+
+    def _neighborhood_hop(self, rows: list[dict[str, Any]], neighbor_limit: int) -> list[dict[str, Any]]:
+        """One get_neighborhoods() level: unvisited neighbors of each {"start", "node", "visited"} row.
+
+        Per frontier node, the first _NEIGHBORHOOD_PATH_LIMIT relationships
+        are examined and the neighbor_limit first neighbors by name returned.
+        """
+        return self.run_query(
+            (
+                "UNWIND $rows AS row "
+                "MATCH (node) WHERE elementId(node) = row.node "
+                "CALL { "
+                "WITH node, row "
+                "MATCH (node)--(neighbor) "
+                "WITH neighbor LIMIT $path_limit "
+                "WITH DISTINCT neighbor WHERE NOT elementId(neighbor) IN row.visited "
+                "RETURN neighbor ORDER BY neighbor.name LIMIT $neighbor_limit "
+                "} "
+                "RETURN row.start AS start, elementId(neighbor) AS id, neighbor.name AS name, "
+                f"{_labels('neighbor')} AS labels"
+            ),
+            {"rows": rows, "path_limit": _NEIGHBORHOOD_PATH_LIMIT, "neighbor_limit": neighbor_limit},
+        )
+
+    def get_all_entities(self, limit: int | None = 100) -> list[dict[str, Any]]:
+        """List entities in the graph; limit=None returns all of them."""
+        cypher = f"MATCH (e:{ENTITY_LABEL}) RETURN e.name AS name, {_labels('e')} AS labels"
+        if limit is None:
+            return self.run_query(cypher)
+        return self.run_query(cypher + " LIMIT $limit", {"limit": limit})
 
     def get_subgraph(
         self,
@@ -124,52 +500,112 @@ class Neo4jClient:
         safe_node_limit = max(1, min(int(node_limit), 1000))
         safe_edge_limit = max(1, min(int(edge_limit), 2000))
 
-        start = self.run_query(
-            (
-                "MATCH (start {name: $name}) "
-                "RETURN elementId(start) AS id, coalesce(start.name, elementId(start)) AS name, "
-                "labels(start) AS labels "
-                "LIMIT 1"
-            ),
-            {"name": name},
-        )
-        if not start:
-            return {"nodes": [], "edges": []}
+        result = self.traverse(name, max_hops=safe_hops, node_limit=safe_node_limit, edge_limit=safe_edge_limit)
+        return {
+            "nodes": [{"id": node["id"], "name": node["name"], "labels": node["labels"]} for node in result["nodes"]],
+            "edges": result["edges"],
+        }
 
-        nodes = self.run_query(
-            (
-                "MATCH path = (start {name: $name})-[*1.."
-                + str(safe_hops)
-                + "]-(neighbor) "
-                "UNWIND nodes(path) AS node "
-                "RETURN DISTINCT elementId(node) AS id, "
-                "coalesce(node.name, elementId(node)) AS name, "
-                "labels(node) AS labels "
-                "LIMIT $limit"
-            ),
-            {"name": name, "limit": safe_node_limit},
-        )
+    def traverse(
+        self,
+        name: str,
+        max_hops: int = 2,
+        node_limit: int = 200,
+        edge_limit: int = 400,
+        max_degree: int | None = None,
+    ) -> dict[str, list[dict[str, Any]]]:
+        """Breadth-first expansion from an entity, collecting nodes and edges in one pass.
+
+        Runs one query per hop over the whole frontier, inside one read
+        session. The walk stops once node_limit nodes are visited; at most
+        edge_limit relationships between visited nodes are kept (0 skips
+        edges entirely). Nodes with more than max_degree relationships
+        (settings.graph_max_degree by default) are returned but not
+        expanded, so hubs cannot flood the result; the start node is always
+        expanded.
+
+        Returns {"nodes": [{"id", "name", "labels", "distance"}, ...],
+        "edges": [{"source", "target", "type"}, ...]}, nodes in BFS order
+        starting with the entity itself, or empty lists if it does not exist.
+        """
+        max_degree = settings.graph_max_degree if max_degree is None else max_degree
+        with self.session():
+            start = self.run_query(
+                (
+                    f"MATCH (start:{ENTITY_LABEL} {{name: $name}}) "
+                    "RETURN elementId(start) AS id, coalesce(start.name, elementId(start)) AS name, "
+                    f"{_labels('start')} AS labels "
+                    "LIMIT 1"
+                ),
+                {"name": name},
+            )
+            if not start:
+                return {"nodes": [], "edges": []}
 
-        edges = self.run_query(
+            nodes: dict[str, dict[str, Any]] = {start[0]["id"]: {**start[0], "distance": 0}}
+            edges: dict[str, dict[str, Any]] = {}
+            frontier = [start[0]["id"]]
+            for distance in range(1, max_hops + 1):
+                remaining = (node_limit - len(nodes)) + (edge_limit - len(edges))
+                if not frontier or len(nodes) >= node_limit or remaining <= 0:
+                    break
+                rows = self._expand(frontier, list(nodes) if edge_limit <= 0 else [], remaining)
+
+                frontier = []
+                for row in rows:
+                    node_id = row["id"]
+                    if node_id not in nodes:
+                        if len(nodes) >= node_limit:
+                            continue
+                        nodes[node_id] = {
+                            "id": node_id,
+                            "name": row["name"],
+                            "labels": row["labels"],
+                            "distance": distance,
+                        }
+                        if row["degree"] <= max_degree:
+                            frontier.append(node_id)
+                    if row["rel_id"] not in edges and len(edges) < edge_limit:
+                        edges[row["rel_id"]] = {"source": row["source"], "target": row["target"], "type": row["type"]}
+
+        return {"nodes": list(nodes.values()), "edges": list(edges.values())}
+
+    def _expand(self, frontier: list[str], exclude: list[str], limit: int) -> list[dict[str, Any]]:
+        """One BFS level: relationships from frontier nodes and the nodes at their other end.
+
+        Neighbors listed in exclude are skipped. Each row adds a node, an edge
+        or both, so limit is the caller's remaining node plus edge budget.
+        """
+        return self.run_query(
             (
-                "MATCH path = (start {name: $name})-[*1.."
-                + str(safe_hops)
-                + "]-(neighbor) "
-                "UNWIND relationships(path) AS rel "
-                "RETURN DISTINCT elementId(startNode(rel)) AS source, "
-                "elementId(endNode(rel)) AS target, "
-                "type(rel) AS type "
+                "UNWIND $frontier AS node_id "
+                "MATCH (node) WHERE elementId(node) = node_id "
+                "CALL { "
+                "WITH node "
+                "MATCH (node)-[rel]-(neighbor) "
+                "WHERE NOT elementId(neighbor) IN $exclude "
+                "RETURN rel, neighbor "
+                "LIMIT $limit "
+                "} "
+                "RETURN elementId(neighbor) AS id, coalesce(neighbor.name, elementId(neighbor)) AS name, "
+                f"{_labels('neighbor')} AS labels, COUNT {{ (neighbor)--() }} AS degree, "
+                "elementId(rel) AS rel_id, elementId(startNode(rel)) AS source, "
+                "elementId(endNode(rel)) AS target, type(rel) AS type "
                 "LIMIT $limit"
             ),
-            {"name": name, "limit": safe_edge_limit},
+            {"frontier": frontier, "exclude": exclude, "limit": limit},
         )
 
-        if not nodes:
-            nodes = [start[0]]
-        elif start[0]["id"] not in {node["id"] for node in nodes}:
-            nodes.insert(0, start[0])
+    def delete_document_mentions(self, source: str) -> None:
+        """Remove the MENTIONS edges of a Document node so it can be re-extracted."""
+        self.run_query(
+            "MATCH (d:Document {name: $source})-[r:MENTIONS]->() DELETE r",
+            {"source": source},
+        )
 
-        return {"nodes": nodes, "edges": edges}
+    def delete_document(self, source: str) -> None:
+        """Delete a Document node and all of its relationships."""
+        self.run_query("MATCH (d:Document {name: $source}) DETACH DELETE d", {"source": source})
 
     def clear(self) -> None:
         """Delete all nodes and relationships."""
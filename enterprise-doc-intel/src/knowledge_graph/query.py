@@ -2,55 +2,52 @@
 
 from __future__ import annotations
 
+from src.knowledge_graph.entity_index import get_entity_index
 from src.knowledge_graph.neo4j_client import Neo4jClient
 
+MAX_MATCHES_PER_ENTITY = 3  # graph entities matched per query entity
+MAX_NEIGHBORS_PER_ENTITY = 10  # neighbors listed per matched entity
 
-def get_graph_context(query_entities: list[str], neo4j: Neo4jClient, max_hops: int = 2) -> str:
+
+def get_graph_context(
+    query_entities: list[str],
+    neo4j: Neo4jClient,
+    max_hops: int = 2,
+    neighbor_limit: int = MAX_NEIGHBORS_PER_ENTITY,
+) -> str:
     """Build a textual context from the knowledge graph for given entities.
 
-    Looks up each entity in the graph, finds neighbors within max_hops,
-    and formats the result as natural language context.
+    Looks up each entity in the graph, finds up to neighbor_limit neighbors
+    of every match within max_hops, and formats the result as natural
+    language context. Lookups are batched: one query resolves every
+    entity, then one query per hop expands all of them.
     """
-    context_parts: list[str] = []
-
-    for entity_name in query_entities:
-        # Search for the entity
-        matches = neo4j.search_entities(entity_name, limit=3)
-        if not matches:
-            continue
-
-        for match in matches:
-            name = match["name"]
-            neighbors = neo4j.get_neighbors(name, max_hops=max_hops)
-
-            if neighbors:
-                related = [f"{n['name']} ({', '.join(n['labels'])})" for n in neighbors[:10]]
-                context_parts.append(f"'{name}' is related to: {', '.join(related)}")
-
-    if not context_parts:
+    entities = list(dict.fromkeys(query_entities))
+    if not entities:
         return ""
 
-    return "\n".join(context_parts)
+    neighborhoods = neo4j.get_neighborhoods(
+        entities,
+        max_hops=max_hops,
+        match_limit=MAX_MATCHES_PER_ENTITY,
+        neighbor_limit=neighbor_limit,
+    )
 
+    context_parts: list[str] = []
+    for neighborhood in neighborhoods:
+        neighbors = neighborhood["neighbors"][:neighbor_limit]
+        if neighbors:
+            related = [f"{n['name']} ({', '.join(n['labels'])})" for n in neighbors]
+            context_parts.append(f"'{neighborhood['name']}' is related to: {', '.join(related)}")
 
-_MIN_ENTITY_LENGTH = 3  # skip very short names to avoid false positives (e.g. "IT", "AI")
+    return "\n".join(context_parts)
 
 
 def extract_entities_from_query(query: str, neo4j: Neo4jClient) -> list[str]:
     """Find which entities from the knowledge graph are mentioned in the query.
 
-    Uses case-insensitive word-boundary matching against known entity names.
-    Skips entity names shorter than _MIN_ENTITY_LENGTH to avoid false positives.
+    Uses case-insensitive word-boundary matching against every known entity
+    name, via the in-process entity index (loaded from neo4j on first use).
+    Skips entity names shorter than entity_index.MIN_ENTITY_LENGTH to avoid false positives.
     """
-    all_entities = neo4j.get_all_entities(limit=500)
-    query_lower = query.lower()
-
-    found = []
-    for entity in all_entities:
-        name = entity["name"]
-        if len(name) < _MIN_ENTITY_LENGTH:
-            continue
-        if name.lower() in query_lower:
-            found.append(name)
-
-    return found
+    return get_entity_index(neo4j).find(query)
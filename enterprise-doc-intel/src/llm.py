@@ -0,0 +1,220 @@
+"""Shared gateway for every Ollama call — chat and embeddings, sync and async.
+
+One pooled HTTP transport with keep-alive is shared by all callers. Calls
+are split into two priority classes, each with its own concurrency limit
+and timeout, so ingestion (entity extraction, document embeddings) can
+never occupy the slots that interactive queries need. Identical
+non-streaming calls with the same priority and timeout that are in flight
+at the same time are coalesced: one request goes to Ollama and every
+caller gets its response.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+from collections.abc import AsyncIterator, Callable, Iterator
+from concurrent.futures import Future
+from typing import Any
+
+import httpx
+from ollama import AsyncClient, Client
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"  # /query answers, agent steps, query embeddings
+BACKGROUND = "background"  # ingestion: entity extraction, document embeddings
+
+PRIORITIES = (INTERACTIVE, BACKGROUND)
+
+
+def _request_key(method: str, priority: str, timeout: float, kwargs: dict[str, Any]) -> str:
+    # Priority and timeout are part of the key, so an interactive call never
+    # waits on a background request's slot or deadline.
+    return json.dumps([method, priority, timeout, kwargs], sort_keys=True, default=str)
+
+
+class LLMGateway:
+    """Pooled, prioritised and coalescing access to the Ollama API.
+
+    chat/embed block the calling thread; achat/aembed are their async
+    counterparts for the API's event loop. priority selects the class
+    (INTERACTIVE or BACKGROUND) and with it the concurrency limit and
+    default timeout; timeout overrides the latter for a single call.
+    """
+
+    def __init__(self, host: str | None = None) -> None:
+        self.host = host or settings.ollama_base_url
+        self._limits = {
+            INTERACTIVE: settings.llm_interactive_concurrency,
+            BACKGROUND: settings.llm_background_concurrency,
+        }
+        self._timeouts = {INTERACTIVE: settings.llm_interactive_timeout, BACKGROUND: settings.ollama_timeout}
+        self._pool_limits = httpx.Limits(
+            max_connections=sum(self._limits.values()),
+            max_keepalive_connections=sum(self._limits.values()),
+            keepalive_expiry=settings.llm_keepalive_expiry,
+        )
+        self._lock = threading.Lock()
+        self.coalesced = 0  # calls answered by another caller's in-flight request
+
+        self._transport: httpx.HTTPTransport | None = None
+        self._clients: dict[float, Client] = {}
+        self._slots = {p: threading.BoundedSemaphore(n) for p, n in self._limits.items()}
+        self._inflight: dict[str, Future] = {}
+
+        # Async state is bound to the event loop it is first used on and
+        # dropped by aclose(), so a new loop starts from scratch.
+        self._async_transport: httpx.AsyncHTTPTransport | None = None
+        self._async_clients: dict[float, AsyncClient] = {}
+        self._async_slots: dict[str, asyncio.Semaphore] = {}
+        self._async_inflight: dict[str, asyncio.Task] = {}
+
+    def _timeout(self, priority: str, timeout: float | None) -> float:
+        if priority not in self._limits:
+            raise ValueError(f"Unknown LLM priority {priority!r}; expected one of {PRIORITIES}")
+        return timeout if timeout is not None else self._timeouts[priority]
+
+    # --- sync ---
+
+    def _client(self, timeout: float) -> Client:
+        with self._lock:
+            client = self._clients.get(timeout)
+            if client is None:
+                if self._transport is None:
+                    self._transport = httpx.HTTPTransport(limits=self._pool_limits)
+                client = Client(host=self.host, timeout=timeout, transport=self._transport)
+                self._clients[timeout] = client
+            return client
+
+    def _single_flight(self, key: str, call: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = call()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def _stream(self, priority: str, call: Callable[[], Iterator[Any]]) -> Iterator[Any]:
+        # The slot is taken on the first next() and held until the stream ends or is closed.
+        with self._slots[priority]:
+            yield from call()
+
+    def chat(self, *, priority: str = INTERACTIVE, timeout: float | None = None, stream: bool = False, **kwargs):
+        """Client.chat; streaming calls return an iterator of chunks and are never coalesced."""
+        timeout = self._timeout(priority, timeout)
+        client = self._client(timeout)
+        if stream:
+            return self._stream(priority, lambda: client.chat(**kwargs, stream=True))
+
+        def call():
+            with self._slots[priority]:
+                return client.chat(**kwargs)
+
+        return self._single_flight(_request_key("chat", priority, timeout, kwargs), call)
+
+    def embed(self, *, priority: str = INTERACTIVE, timeout: float | None = None, **kwargs):
+        """Client.embed, coalesced with identical in-flight requests."""
+        timeout = self._timeout(priority, timeout)
+        client = self._client(timeout)
+
+        def call():
+            with self._slots[priority]:
+                return client.embed(**kwargs)
+
+        return self._single_flight(_request_key("embed", priority, timeout, kwargs), call)
+
+    def close(self) -> None:
+        with self._lock:
+            transport, self._transport = self._transport, None
+            self._clients = {}
+        if transport is not None:
+            transport.close()
+
+    # --- async ---
+
+    def _async_client(self, timeout: float) -> AsyncClient:
+        client = self._async_clients.get(timeout)
+        if client is None:
+            if self._async_transport is None:
+                self._async_transport = httpx.AsyncHTTPTransport(limits=self._pool_limits)
+            client = AsyncClient(host=self.host, timeout=timeout, transport=self._async_transport)
+            self._async_clients[timeout] = client
+        return client
+
+    def _async_slot(self, priority: str) -> asyncio.Semaphore:
+        slot = self._async_slots.get(priority)
+        if slot is None:
+            slot = self._async_slots[priority] = asyncio.Semaphore(self._limits[priority])
+        return slot
+
+    async def _async_single_flight(self, key: str, call: Callable[[], Any]) -> Any:
+        task = self._async_inflight.get(key)
+        if task is None:
+            task = self._async_inflight[key] = asyncio.ensure_future(call())
+            task.add_done_callback(lambda _: self._async_inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shielded so one caller giving up (e.g. a client disconnect) does not cancel the others.
+        return await asyncio.shield(task)
+
+    async def _astream(self, priority: str, call: Callable[[], Any]) -> AsyncIterator[Any]:
+        async with self._async_slot(priority):
+            async for chunk in await call():
+                yield chunk
+
+    async def achat(
+        self, *, priority: str = INTERACTIVE, timeout: float | None = None, stream: bool = False, **kwargs
+    ):
+        """AsyncClient.chat; with stream=True the awaited result is an async iterator of chunks."""
+        timeout = self._timeout(priority, timeout)
+        client = self._async_client(timeout)
+        if stream:
+            return self._astream(priority, lambda: client.chat(**kwargs, stream=True))
+
+        async def call():
+            async with self._async_slot(priority):
+                return await client.chat(**kwargs)
+
+        return await self._async_single_flight(_request_key("chat", priority, timeout, kwargs), call)
+
+    async def aembed(self, *, priority: str = INTERACTIVE, timeout: float | None = None, **kwargs):
+        """AsyncClient.embed, coalesced with identical in-flight requests."""
+        timeout = self._timeout(priority, timeout)
+        client = self._async_client(timeout)
+
+        async def call():
+            async with self._async_slot(priority):
+                return await client.embed(**kwargs)
+
+        return await self._async_single_flight(_request_key("embed", priority, timeout, kwargs), call)
+
+    async def aclose(self) -> None:
+        transport, self._async_transport = self._async_transport, None
+        self._async_clients = {}
+        self._async_slots = {}
+        self._async_inflight = {}
+        if transport is not None:
+            await transport.aclose()
+
+
+gateway = LLMGateway()
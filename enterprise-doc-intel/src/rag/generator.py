@@ -2,17 +2,21 @@
 
 from __future__ import annotations
 
+import asyncio
+import dataclasses
 import logging
+import threading
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import Executor
 from dataclasses import dataclass, field
 
-from ollama import Client
-
+from src.cache import SemanticCache, corpus_generation
 from src.config import settings
-
-_client = Client(host=settings.ollama_base_url, timeout=settings.ollama_timeout)
+from src.embeddings.provider import cached_query_embedding, embed_query
 from src.knowledge_graph.neo4j_client import Neo4jClient
+from src.llm import INTERACTIVE, LLMGateway, gateway
 from src.rag.context_builder import build_context, build_prompt
-from src.rag.retriever import retrieve
+from src.rag.retriever import GraphSearch, RetrievalResult, retrieve, start_graph_search
 from src.vectorstore.chroma import ChromaStore
 
 logger = logging.getLogger(__name__)
@@ -25,6 +29,119 @@ class GenerationResult:
     answer: str
     sources: list[dict] = field(default_factory=list)
     graph_context: str = ""
+    cached: bool = False
+
+
+# Answers by question embedding, so paraphrased questions reuse them too.
+# Created on first use; entries are keyed to this process's corpus generation
+# and expire after settings.answer_cache_ttl, which bounds how stale an
+# answer can get after an ingest by another process (CLI or API worker).
+_answer_cache: SemanticCache | None = None
+_answer_cache_lock = threading.Lock()
+
+
+def _get_answer_cache() -> SemanticCache | None:
+    global _answer_cache
+    if _answer_cache is None and settings.answer_cache_enabled:
+        with _answer_cache_lock:
+            if _answer_cache is None:
+                _answer_cache = SemanticCache(
+                    settings.answer_cache_max_entries,
+                    settings.answer_cache_threshold,
+                    ttl=settings.answer_cache_ttl,
+                )
+    return _answer_cache
+
+
+def reset_answer_cache() -> None:
+    global _answer_cache
+    with _answer_cache_lock:
+        _answer_cache = None
+
+
+def answer_cache_stats() -> dict | None:
+    """Counters of the semantic answer cache, or None when it is disabled."""
+    cache = _get_answer_cache()
+    if cache is None:
+        return None
+    return {"entries": len(cache), "generation": corpus_generation.value, **cache.stats.as_dict()}
+
+
+def _lookup_answer(
+    question: str, top_k: int, use_cache: bool, neo4j: Neo4jClient | None
+) -> tuple[GenerationResult | None, list[float] | None, int, GraphSearch | None]:
+    """Return (cached result or None, question embedding, corpus generation, graph search).
+
+    A question whose embedding is cached is looked up without touching
+    Neo4j. Otherwise the graph branch is started first, so it runs during
+    the Ollama round trip, and it is cancelled again on a hit. A graph
+    search still running on a miss is left for retrieve().
+    """
+    cache = _get_answer_cache()
+    generation = corpus_generation.value
+    if cache is None:
+        return None, None, generation, None
+    graph_search = None
+    # This is retrieval's vector-branch embedding, handed on to retrieve(),
+    # so the question is embedded only once and under the same timeout.
+    embedding = cached_query_embedding(question)
+    if embedding is None:
+        graph_search = start_graph_search(question, neo4j)
+        try:
+            embedding = embed_query(question, timeout=settings.retrieval_vector_timeout)
+        except BaseException:
+            if graph_search is not None:
+                graph_search.cancel()
+            raise
+    hit = cache.get(embedding, top_k, generation) if use_cache else None
+    if hit is not None:
+        if graph_search is not None:
+            graph_search.cancel()
+        logger.info("Answer cache hit for %r", question[:80])
+        return dataclasses.replace(hit, cached=True), embedding, generation, None
+    return None, embedding, generation, graph_search
+
+
+def _store_answer(result: GenerationResult, embedding: list[float] | None, top_k: int, generation: int) -> None:
+    cache = _get_answer_cache()
+    if cache is not None and embedding is not None:
+        cache.put(embedding, top_k, generation, result)
+
+
+def _retrieve_and_prompt(
+    question: str,
+    chroma: ChromaStore,
+    neo4j: Neo4jClient | None,
+    top_k: int,
+    embedding: list[float] | None = None,
+    graph_search: GraphSearch | None = None,
+) -> tuple[RetrievalResult, str]:
+    retrieval = retrieve(
+        question, chroma, neo4j, top_k=top_k, query_embedding=embedding, graph_search=graph_search
+    )
+    context = build_context(retrieval)
+    return retrieval, build_prompt(question, context)
+
+
+def _sources(retrieval: RetrievalResult) -> list[dict]:
+    return [
+        {"source": r.metadata.get("source", "unknown"), "score": r.score}
+        for r in retrieval.vector_results
+    ]
+
+
+def _chat_request(prompt: str) -> dict:
+    return {
+        "model": settings.ollama_model,
+        "messages": [{"role": "user", "content": prompt}],
+        "options": {"temperature": 0.1},
+        "priority": INTERACTIVE,
+    }
+
+
+def _generation_error(exc: Exception) -> RuntimeError:
+    logger.error("Ollama generation failed: %s", exc)
+    return RuntimeError(f"LLM generation failed (model={settings.ollama_model}): {exc}")
 
 
 def generate_answer(
@@ -32,37 +149,166 @@ def generate_answer(
     chroma: ChromaStore,
     neo4j: Neo4jClient | None = None,
     top_k: int = 5,
+    use_cache: bool = True,
 ) -> GenerationResult:
-    """Full RAG pipeline: retrieve → build context → generate answer."""
-    # 1. Retrieve
-    retrieval = retrieve(question, chroma, neo4j, top_k=top_k)
+    """Full RAG pipeline: retrieve → build context → generate answer.
 
-    # 2. Build context
-    context = build_context(retrieval)
+    A question whose embedding is close enough to one answered since the
+    last ingest (settings.answer_cache_threshold) gets that answer back
+    with cached=True. use_cache=False always runs the pipeline, and the
+    fresh answer replaces cached answers to that question.
+    """
+    hit, embedding, generation, graph_search = _lookup_answer(question, top_k, use_cache, neo4j)
+    if hit is not None:
+        return hit
+
+    # 1. Retrieve and build context
+    retrieval, prompt = _retrieve_and_prompt(question, chroma, neo4j, top_k, embedding, graph_search)
 
-    # 3. Generate
-    prompt = build_prompt(question, context)
+    # 2. Generate
     try:
-        response = _client.chat(
-            model=settings.ollama_model,
-            messages=[{"role": "user", "content": prompt}],
-            options={"temperature": 0.1},
-        )
+        response = gateway.chat(**_chat_request(prompt))
         answer = response["message"]["content"]
     except Exception as exc:
-        logger.error("Ollama generation failed: %s", exc)
-        raise RuntimeError(
-            f"LLM generation failed (model={settings.ollama_model}): {exc}"
-        ) from exc
+        raise _generation_error(exc) from exc
 
-    # Collect source metadata
-    sources = [
-        {"source": r.metadata.get("source", "unknown"), "score": r.score}
-        for r in retrieval.vector_results
-    ]
+    result = GenerationResult(
+        answer=answer,
+        sources=_sources(retrieval),
+        graph_context=retrieval.graph_context,
+    )
+    _store_answer(result, embedding, top_k, generation)
+    return result
 
-    return GenerationResult(
+
+def stream_answer(
+    question: str,
+    chroma: ChromaStore,
+    neo4j: Neo4jClient | None = None,
+    top_k: int = 5,
+    use_cache: bool = True,
+) -> Iterator[dict]:
+    """Streaming variant of generate_answer, as a sequence of events.
+
+    Yields {"type": "sources", "sources": [...], "graph_context": ...} as
+    soon as retrieval is done, then {"type": "token", "content": ...} for
+    each piece of the answer as Ollama generates it, and finally
+    {"type": "done", "cached": ...}. A cached answer arrives as a single
+    token. Raises RuntimeError if generation fails.
+    """
+    hit, embedding, generation, graph_search = _lookup_answer(question, top_k, use_cache, neo4j)
+    if hit is not None:
+        yield {"type": "sources", "sources": hit.sources, "graph_context": hit.graph_context}
+        yield {"type": "token", "content": hit.answer}
+        yield {"type": "done", "cached": True}
+        return
+
+    retrieval, prompt = _retrieve_and_prompt(question, chroma, neo4j, top_k, embedding, graph_search)
+    sources = _sources(retrieval)
+    yield {"type": "sources", "sources": sources, "graph_context": retrieval.graph_context}
+
+    parts: list[str] = []
+    try:
+        for chunk in gateway.chat(**_chat_request(prompt), stream=True):
+            content = chunk["message"]["content"]
+            if content:
+                parts.append(content)
+                yield {"type": "token", "content": content}
+    except Exception as exc:
+        raise _generation_error(exc) from exc
+
+    # Only complete answers are cached; a client that disconnects stops the stream above.
+    _store_answer(
+        GenerationResult(answer="".join(parts), sources=sources, graph_context=retrieval.graph_context),
+        embedding,
+        top_k,
+        generation,
+    )
+    yield {"type": "done", "cached": False}
+
+
+async def agenerate_answer(
+    question: str,
+    chroma: ChromaStore,
+    neo4j: Neo4jClient | None = None,
+    top_k: int = 5,
+    use_cache: bool = True,
+    *,
+    llm: LLMGateway = gateway,
+    executor: Executor | None = None,
+) -> GenerationResult:
+    """generate_answer for async callers.
+
+    Embedding, vector search and graph lookups run on executor (the
+    loop's default one if None); the LLM call is awaited on the gateway,
+    so a slow answer does not hold a thread.
+    """
+    loop = asyncio.get_running_loop()
+    hit, embedding, generation, graph_search = await loop.run_in_executor(
+        executor, _lookup_answer, question, top_k, use_cache, neo4j
+    )
+    if hit is not None:
+        return hit
+
+    retrieval, prompt = await loop.run_in_executor(
+        executor, _retrieve_and_prompt, question, chroma, neo4j, top_k, embedding, graph_search
+    )
+    try:
+        response = await llm.achat(**_chat_request(prompt))
+        answer = response["message"]["content"]
+    except Exception as exc:
+        raise _generation_error(exc) from exc
+
+    result = GenerationResult(
         answer=answer,
-        sources=sources,
+        sources=_sources(retrieval),
         graph_context=retrieval.graph_context,
     )
+    _store_answer(result, embedding, top_k, generation)
+    return result
+
+
+async def astream_answer(
+    question: str,
+    chroma: ChromaStore,
+    neo4j: Neo4jClient | None = None,
+    top_k: int = 5,
+    use_cache: bool = True,
+    *,
+    llm: LLMGateway = gateway,
+    executor: Executor | None = None,
+) -> AsyncIterator[dict]:
+    """stream_answer for async callers; same events, same executor use as agenerate_answer."""
+    loop = asyncio.get_running_loop()
+    hit, embedding, generation, graph_search = await loop.run_in_executor(
+        executor, _lookup_answer, question, top_k, use_cache, neo4j
+    )
+    if hit is not None:
+        yield {"type": "sources", "sources": hit.sources, "graph_context": hit.graph_context}
+        yield {"type": "token", "content": hit.answer}
+        yield {"type": "done", "cached": True}
+        return
+
+    retrieval, prompt = await loop.run_in_executor(
+        executor, _retrieve_and_prompt, question, chroma, neo4j, top_k, embedding, graph_search
+    )
+    sources = _sources(retrieval)
+    yield {"type": "sources", "sources": sources, "graph_context": retrieval.graph_context}
+
+    parts: list[str] = []
+    try:
+        async for chunk in await llm.achat(**_chat_request(prompt), stream=True):
+            content = chunk["message"]["content"]
+            if content:
+                parts.append(content)
+                yield {"type": "token", "content": content}
+    except Exception as exc:
+        raise _generation_error(exc) from exc
+
+    _store_answer(
+        GenerationResult(answer="".join(parts), sources=sources, graph_context=retrieval.graph_context),
+        embedding,
+        top_k,
+        generation,
+    )
+    yield {"type": "done", "cached": False}
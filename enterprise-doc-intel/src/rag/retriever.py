@@ -3,9 +3,14 @@
 from __future__ import annotations
 
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from dataclasses import dataclass, field
 
-from src.embeddings.provider import get_single_embedding
+from src.config import settings
+from src.embeddings.provider import get_query_embedding
 from src.knowledge_graph.neo4j_client import Neo4jClient
 from src.knowledge_graph.query import extract_entities_from_query, get_graph_context
 from src.vectorstore.chroma import ChromaStore, SearchResult
@@ -21,32 +26,106 @@ class RetrievalResult:
     graph_context: str = ""
 
 
+# Threads for the graph branch, which runs alongside the vector search.
+_pool: ThreadPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=settings.retrieval_graph_workers, thread_name_prefix="graph-retrieval"
+                )
+    return _pool
+
+
+def _graph_search(query: str, neo4j: Neo4jClient, cancelled: threading.Event) -> str:
+    """Graph context for the entities mentioned in query, or "" on failure or once cancelled."""
+    try:
+        if cancelled.is_set():
+            return ""
+        with neo4j.session():
+            entities = extract_entities_from_query(query, neo4j)
+            if not entities or cancelled.is_set():
+                return ""
+            graph_context = get_graph_context(entities, neo4j)
+            logger.info("Graph context from %d entities", len(entities))
+            return graph_context
+    except Exception:
+        logger.exception("Graph search failed, proceeding with vector results only")
+        return ""
+
+
+class GraphSearch:
+    """A graph lookup running on the retrieval pool; see start_graph_search."""
+
+    def __init__(self, query: str, neo4j: Neo4jClient) -> None:
+        self._started = time.monotonic()
+        self._cancelled = threading.Event()
+        self._future = _get_pool().submit(_graph_search, query, neo4j, self._cancelled)
+
+    def result(self) -> str:
+        """Graph context, or "" if it is not ready settings.retrieval_graph_timeout seconds after the start."""
+        remaining = settings.retrieval_graph_timeout - (time.monotonic() - self._started)
+        try:
+            return self._future.result(timeout=max(remaining, 0))
+        except FutureTimeoutError:
+            self.cancel()
+            logger.warning(
+                "Graph search missed its %.1fs budget, proceeding with vector results only",
+                settings.retrieval_graph_timeout,
+            )
+            return ""
+
+    def cancel(self) -> None:
+        """Drop the lookup; one already running skips its remaining Neo4j queries."""
+        self._cancelled.set()
+        self._future.cancel()
+
+
+def start_graph_search(query: str, neo4j: Neo4jClient | None) -> GraphSearch | None:
+    """Start retrieve()'s graph branch early, e.g. while the caller embeds the query.
+
+    Its deadline counts from here. Returns None without Neo4j.
+    """
+    return GraphSearch(query, neo4j) if neo4j else None
+
+
 def retrieve(
     query: str,
     chroma: ChromaStore,
     neo4j: Neo4jClient | None = None,
     top_k: int = 5,
+    query_embedding: list[float] | None = None,
+    graph_search: GraphSearch | None = None,
 ) -> RetrievalResult:
     """Retrieve relevant context using hybrid vector + graph search.
 
-    1. Embed the query and search ChromaDB for similar chunks.
+    The two branches run concurrently, so latency is the slower of them:
+    1. Embed the query and search ChromaDB for similar chunks. The embedding
+       request, sent once, may take settings.retrieval_vector_timeout seconds.
     2. If Neo4j is available, find mentioned entities and pull graph context.
+       Graph context not ready settings.retrieval_graph_timeout seconds
+       after the start is left out, as is a failed graph search.
     3. Return combined results.
+
+    A caller that already embedded the query passes query_embedding to
+    skip step 1's embedding call, and one that started step 2 with
+    start_graph_search passes graph_search.
     """
-    # Vector search
-    query_embedding = get_single_embedding(query)
+    if graph_search is None:
+        graph_search = start_graph_search(query, neo4j)
+
+    # Vector search, on this thread while the graph branch runs
+    if query_embedding is None:
+        query_embedding = get_query_embedding(query, timeout=settings.retrieval_vector_timeout)
     vector_results = chroma.search(query_embedding, top_k=top_k)
     logger.info("Vector search returned %d results", len(vector_results))
 
     # Graph search (optional, graceful degradation)
-    graph_context = ""
-    if neo4j:
-        try:
-            entities = extract_entities_from_query(query, neo4j)
-            if entities:
-                graph_context = get_graph_context(entities, neo4j)
-                logger.info("Graph context from %d entities", len(entities))
-        except Exception:
-            logger.exception("Graph search failed, proceeding with vector results only")
+    graph_context = graph_search.result() if graph_search is not None else ""
 
     return RetrievalResult(vector_results=vector_results, graph_context=graph_context)
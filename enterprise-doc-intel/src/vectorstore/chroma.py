@@ -52,6 +52,20 @@ class ChromaStore:
         )
         logger.info("Upserted %d documents (total: %d)", len(ids), self.count)
 
+    def update_metadata(self, ids: list[str], metadatas: list[dict]) -> None:
+        """Merge the given keys into existing documents' metadata."""
+        if not ids:
+            return
+        self._collection.update(ids=ids, metadatas=metadatas)
+        logger.info("Updated metadata of %d documents", len(ids))
+
+    def delete(self, ids: list[str]) -> None:
+        """Delete documents by ID. Unknown IDs are ignored."""
+        if not ids:
+            return
+        self._collection.delete(ids=ids)
+        logger.info("Deleted %d documents (total: %d)", len(ids), self.count)
+
     def search(
         self,
         query_embedding: list[float],
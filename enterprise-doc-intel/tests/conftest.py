@@ -0,0 +1,32 @@
+"""Shared test setup."""
+
+import os
+
+import pytest
+
+# Keep unit tests hermetic: no on-disk caches shared between test runs.
+# Must run before src.config is imported so Settings picks it up.
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+os.environ.setdefault("EXTRACTION_CACHE_ENABLED", "false")
+os.environ.setdefault("GRAPH_CACHE_ENABLED", "false")
+os.environ.setdefault("ANSWER_CACHE_ENABLED", "false")
+
+
+@pytest.fixture(autouse=True)
+def _reset_entity_index():
+    """Each test builds the process-wide entity index from its own mocked graph."""
+    from src.knowledge_graph.entity_index import reset_entity_index
+
+    reset_entity_index()
+    yield
+    reset_entity_index()
+
+
+@pytest.fixture(autouse=True)
+def _reset_query_embedding_cache():
+    """Query vectors cached by one test must not leak into the next."""
+    from src.embeddings.provider import reset_query_embedding_cache
+
+    reset_query_embedding_cache()
+    yield
+    reset_query_embedding_cache()
@@ -4,7 +4,7 @@ from __future__ import annotations
 
 from unittest.mock import MagicMock, patch
 
-from src.agents.orchestrator import AgentResult, run_agent
+from src.agents.orchestrator import AgentResult, AgentStep, iter_agent, run_agent
 from src.agents.planner import decompose_query
 from src.agents.tools import build_tools, compare_documents, search_documents, summarize
 from src.vectorstore.chroma import SearchResult
@@ -17,7 +17,7 @@ def _make_search_result(text: str = "chunk", source: str = "doc.md", score: floa
 # --- Planner tests ---
 
 
-@patch("src.agents.planner._client")
+@patch("src.agents.planner.gateway")
 def test_decompose_query_parses_valid_plan(mock_ollama):
     mock_ollama.chat.return_value = {
         "message": {
@@ -31,7 +31,7 @@ def test_decompose_query_parses_valid_plan(mock_ollama):
     assert steps[0]["tool"] == "search_documents"
 
 
-@patch("src.agents.planner._client")
+@patch("src.agents.planner.gateway")
 def test_decompose_query_falls_back_on_bad_json(mock_ollama):
     mock_ollama.chat.return_value = {"message": {"content": "Not valid json at all"}}
 
@@ -41,7 +41,7 @@ def test_decompose_query_falls_back_on_bad_json(mock_ollama):
     assert steps[0]["tool"] == "search_documents"
 
 
-@patch("src.agents.planner._client")
+@patch("src.agents.planner.gateway")
 def test_decompose_query_falls_back_on_ollama_failure(mock_ollama):
     mock_ollama.chat.side_effect = ConnectionError("unreachable")
 
@@ -79,7 +79,7 @@ def test_search_documents_returns_message_on_no_results():
     assert "No relevant documents found" in result
 
 
-@patch("src.agents.tools._client")
+@patch("src.agents.tools.gateway")
 def test_summarize_returns_llm_output(mock_ollama):
     mock_ollama.chat.return_value = {"message": {"content": "Brief summary."}}
 
@@ -88,7 +88,7 @@ def test_summarize_returns_llm_output(mock_ollama):
     assert result == "Brief summary."
 
 
-@patch("src.agents.tools._client")
+@patch("src.agents.tools.gateway")
 def test_summarize_handles_ollama_failure(mock_ollama):
     mock_ollama.chat.side_effect = ConnectionError("down")
 
@@ -129,7 +129,7 @@ def test_build_tools_with_neo4j():
 # --- Orchestrator tests ---
 
 
-@patch("src.agents.orchestrator._client")
+@patch("src.agents.orchestrator.gateway")
 @patch("src.agents.orchestrator.decompose_query")
 def test_run_agent_returns_answer_with_steps(mock_decompose, mock_ollama):
     mock_decompose.return_value = [
@@ -151,7 +151,7 @@ def test_run_agent_returns_answer_with_steps(mock_decompose, mock_ollama):
     assert result.steps[0].tool == "search_documents"
 
 
-@patch("src.agents.orchestrator._client")
+@patch("src.agents.orchestrator.gateway")
 @patch("src.agents.orchestrator.decompose_query")
 def test_run_agent_handles_unknown_tool(mock_decompose, mock_ollama):
     mock_decompose.return_value = [
@@ -164,7 +164,7 @@ def test_run_agent_handles_unknown_tool(mock_decompose, mock_ollama):
     assert "Unknown tool" in result.steps[0].observation
 
 
-@patch("src.agents.orchestrator._client")
+@patch("src.agents.orchestrator.gateway")
 @patch("src.agents.orchestrator.decompose_query")
 def test_run_agent_synthesis_failure_returns_fallback(mock_decompose, mock_ollama):
     mock_decompose.return_value = [
@@ -182,3 +182,25 @@ def test_run_agent_synthesis_failure_returns_fallback(mock_decompose, mock_ollam
         result = run_agent("question", chroma, neo4j=None)
 
     assert "could not generate" in result.answer.lower()
+
+
+@patch("src.agents.orchestrator.gateway")
+@patch("src.agents.orchestrator.decompose_query")
+def test_iter_agent_yields_steps_before_result(mock_decompose, mock_ollama):
+    mock_decompose.return_value = [
+        {"tool": "nonexistent_tool", "input": "a", "reason": "first"},
+        {"tool": "nonexistent_tool", "input": "b", "reason": "second"},
+    ]
+    mock_ollama.chat.return_value = {"message": {"content": "Done."}}
+
+    events = iter_agent("question", MagicMock(), neo4j=None)
+    first = next(events)
+
+    # The synthesis call has not happened yet when the first step arrives
+    assert isinstance(first, AgentStep)
+    assert first.thought == "first"
+    mock_ollama.chat.assert_not_called()
+    rest = list(events)
+    assert isinstance(rest[0], AgentStep)
+    assert isinstance(rest[-1], AgentResult)
+    assert rest[-1].steps == [first, rest[0]]
@@ -47,3 +47,8 @@ def test_health_response_defaults():
     resp = HealthResponse(status="ok")
     assert resp.chroma_docs == 0
     assert resp.neo4j_connected is False
+
+
+def test_query_request_uses_answer_cache_by_default():
+    assert QueryRequest(question="q").bypass_cache is False
+    assert QueryResponse(answer="A", mode="rag").cached is False
@@ -2,8 +2,13 @@
 
 from __future__ import annotations
 
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
 
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
@@ -16,6 +21,8 @@ def _make_app(chroma=None, neo4j=None) -> FastAPI:
     async def _lifespan(app: FastAPI):
         app.state.chroma = chroma or MagicMock()
         app.state.neo4j = neo4j
+        app.state.llm = MagicMock()
+        app.state.executor = None
         yield
 
     app = FastAPI(lifespan=_lifespan)
@@ -50,6 +57,27 @@ def test_health_degraded_without_neo4j():
     assert resp.json()["neo4j_connected"] is False
 
 
+def test_health_answers_while_the_io_executor_is_busy():
+    release = threading.Event()
+    busy = ThreadPoolExecutor(max_workers=1)
+    busy.submit(release.wait, 5)
+    chroma = MagicMock()
+    chroma.count = 7
+    try:
+        with TestClient(_make_app(chroma=chroma, neo4j=MagicMock())) as client:
+            client.app.state.executor = busy  # e.g. every api-io thread running an agent
+            client.app.state.health_executor = ThreadPoolExecutor(max_workers=1)
+            started = time.monotonic()
+            resp = client.get("/health")
+            elapsed = time.monotonic() - started
+    finally:
+        release.set()
+        busy.shutdown()
+
+    assert resp.json()["chroma_docs"] == 7
+    assert elapsed < 2  # not queued behind the busy thread
+
+
 # --- Ingest ---
 
 
@@ -69,7 +97,12 @@ def test_ingest_rejects_nonexistent_dir():
 # --- Query ---
 
 
-@patch("src.api.routes.query.generate_answer")
+async def _events(events):
+    for event in events:
+        yield event
+
+
+@patch("src.api.routes.query.agenerate_answer", new_callable=AsyncMock)
 def test_query_rag_mode(mock_gen):
     from src.rag.generator import GenerationResult
 
@@ -83,6 +116,82 @@ def test_query_rag_mode(mock_gen):
     assert resp.status_code == 200
     assert resp.json()["mode"] == "rag"
     assert "policy" in resp.json()["answer"].lower()
+    assert mock_gen.await_args.kwargs["llm"] is client.app.state.llm
+
+
+@patch("src.api.routes.query.agenerate_answer", new_callable=AsyncMock)
+def test_query_bypass_cache_flag(mock_gen):
+    from src.rag.generator import GenerationResult
+
+    mock_gen.return_value = GenerationResult(answer="Cached answer", cached=True)
+    with TestClient(_make_app(neo4j=None)) as client:
+        cached = client.post("/query", json={"question": "What is the policy?"})
+        client.post("/query", json={"question": "What is the policy?", "bypass_cache": True})
+
+    assert cached.json()["cached"] is True
+    assert [call.kwargs["use_cache"] for call in mock_gen.call_args_list] == [True, False]
+
+
+@patch("src.api.routes.query.astream_answer")
+def test_query_streams_ndjson(mock_stream):
+    import json
+
+    mock_stream.return_value = _events(
+        [
+            {"type": "sources", "sources": [{"source": "policy.md", "score": 0.9}], "graph_context": ""},
+            {"type": "token", "content": "The policy"},
+            {"type": "done", "cached": False},
+        ]
+    )
+    with TestClient(_make_app(neo4j=None)) as client:
+        resp = client.post("/query", json={"question": "What is the policy?", "stream": True})
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in resp.text.splitlines()]
+    assert [e["type"] for e in events] == ["sources", "token", "done"]
+
+
+@patch("src.api.routes.query.astream_answer")
+def test_query_streams_sse_and_reports_errors(mock_stream):
+    async def failing():
+        yield {"type": "sources", "sources": [], "graph_context": ""}
+        raise RuntimeError("Ollama embedding failed (model=nomic-embed-text): http://ollama.internal:11434")
+
+    mock_stream.return_value = failing()
+    with TestClient(_make_app(neo4j=None)) as client:
+        resp = client.post(
+            "/query",
+            json={"question": "What is the policy?", "stream": True},
+            headers={"Accept": "text/event-stream"},
+        )
+
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    assert resp.text.startswith("event: sources\ndata: ")
+    assert 'event: error\ndata: {"type": "error", "detail": "Query failed"}' in resp.text
+    # Upstream error text (hosts, models) stays in the server log.
+    assert "ollama.internal" not in resp.text
+    assert "nomic-embed-text" not in resp.text
+
+
+@patch("src.api.routes.query.iter_agent")
+def test_query_streams_agent_steps(mock_iter):
+    import json
+
+    from src.agents.orchestrator import AgentResult, AgentStep
+
+    step = AgentStep(thought="search", tool="search_documents", tool_input="q", observation="found it")
+    mock_iter.return_value = iter([step, AgentResult(answer="Based on research...", steps=[step])])
+    with TestClient(_make_app(neo4j=None)) as client:
+        resp = client.post("/query", json={"question": "Compare policies", "mode": "agent", "stream": True})
+
+    events = [json.loads(line) for line in resp.text.splitlines()]
+    assert events[0] == {
+        "type": "step",
+        "step": {"thought": "search", "tool": "search_documents", "input": "q", "observation": "found it"},
+    }
+    assert events[1] == {"type": "token", "content": "Based on research..."}
+    assert events[2]["type"] == "done"
 
 
 @patch("src.api.routes.query.run_agent")
@@ -125,3 +234,50 @@ def test_graph_neighbors_validates_max_hops():
     with TestClient(_make_app(neo4j=MagicMock())) as client:
         resp = client.get("/graph/neighbors/VPN?max_hops=100")
     assert resp.status_code == 422
+
+
+@pytest.fixture
+def graph_cache(monkeypatch):
+    from src.config import settings
+
+    monkeypatch.setattr(settings, "graph_cache_enabled", True)
+    graph.reset_graph_cache()
+    yield
+    graph.reset_graph_cache()
+
+
+def test_graph_routes_are_cached_until_next_ingest(graph_cache):
+    from src.cache import corpus_generation
+
+    neo4j = MagicMock()
+    neo4j.get_neighbors.return_value = [{"name": "IT Team", "labels": ["Organization"], "distance": 1}]
+    with TestClient(_make_app(neo4j=neo4j)) as client:
+        first = client.get("/graph/neighbors/VPN")
+        second = client.get("/graph/neighbors/VPN")
+        client.get("/graph/neighbors/VPN?max_hops=3")
+        corpus_generation.bump()
+        client.get("/graph/neighbors/VPN")
+        stats = client.get("/graph/cache").json()
+
+    assert first.json() == second.json()
+    assert neo4j.get_neighbors.call_count == 3
+    assert stats["enabled"] is True
+    assert stats["hits"] == 1
+    assert stats["misses"] == 3
+    assert stats["entries"] == 3
+
+
+def test_graph_cache_stats_when_disabled():
+    with TestClient(_make_app(neo4j=MagicMock())) as client:
+        resp = client.get("/graph/cache")
+    assert resp.status_code == 200
+    assert resp.json()["enabled"] is False
+
+
+@patch("src.api.routes.query.query_embedding_cache_stats")
+def test_query_cache_stats(mock_stats):
+    mock_stats.return_value = {"memory": {"entries": 2, "hits": 3, "misses": 2, "evictions": 0, "hit_rate": 0.6}}
+    with TestClient(_make_app()) as client:
+        resp = client.get("/query/cache")
+    assert resp.status_code == 200
+    assert resp.json()["embeddings"]["memory"]["hit_rate"] == 0.6
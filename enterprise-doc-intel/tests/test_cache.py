@@ -0,0 +1,188 @@
+"""Unit tests for the shared cache primitives."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from src.cache import CacheStats, Generation, PersistentCache, SemanticCache, TTLCache
+
+
+def test_persistent_cache_round_trip(tmp_path: Path):
+    cache = PersistentCache(tmp_path / "c.sqlite3", max_bytes=1024)
+    cache.put("a", b"alpha")
+
+    assert cache.get("a") == b"alpha"
+    assert cache.get("missing") is None
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+
+
+def test_persistent_cache_survives_reopen(tmp_path: Path):
+    path = tmp_path / "c.sqlite3"
+    first = PersistentCache(path, max_bytes=1024)
+    first.put_many({"a": b"1", "b": b"22"})
+    first.close()
+
+    second = PersistentCache(path, max_bytes=1024)
+    assert second.get_many(["a", "b"]) == {"a": b"1", "b": b"22"}
+    assert second.size_bytes == 3
+
+
+def test_persistent_cache_evicts_least_recently_used(tmp_path: Path):
+    cache = PersistentCache(tmp_path / "c.sqlite3", max_bytes=30)
+    cache.put("old", b"x" * 10)
+    cache.put("recent", b"x" * 10)
+    cache.get("old")  # touch "old" so "recent" becomes the eviction candidate
+    cache.put("new", b"x" * 15)
+
+    assert cache.get("recent") is None
+    assert cache.get("old") is not None
+    assert cache.get("new") is not None
+    assert cache.stats.evictions == 1
+    assert cache.size_bytes <= 30
+
+
+def test_persistent_cache_replace_does_not_double_count(tmp_path: Path):
+    cache = PersistentCache(tmp_path / "c.sqlite3", max_bytes=100)
+    cache.put("a", b"x" * 40)
+    cache.put("a", b"x" * 50)
+
+    assert cache.size_bytes == 50
+    assert len(cache) == 1
+
+
+def test_persistent_cache_limit_holds_across_processes_sharing_the_file(tmp_path: Path):
+    path = tmp_path / "c.sqlite3"
+    # Two connections stand in for two API workers.
+    first = PersistentCache(path, max_bytes=50)
+    second = PersistentCache(path, max_bytes=50)
+    for i in range(3):
+        first.put(f"a{i}", b"x" * 10)
+        second.put(f"b{i}", b"x" * 10)
+
+    assert first.size_bytes == second.size_bytes <= 50
+    assert len(first) * 10 == first.size_bytes
+    assert first.stats.evictions + second.stats.evictions >= 1
+
+
+def test_persistent_cache_rejects_invalid_size(tmp_path: Path):
+    with pytest.raises(ValueError, match="max_bytes must be > 0"):
+        PersistentCache(tmp_path / "c.sqlite3", max_bytes=0)
+
+
+def test_cache_stats_hit_rate():
+    assert CacheStats().hit_rate == 0.0
+    assert CacheStats(hits=3, misses=1).as_dict()["hit_rate"] == 0.75
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+    assert cache.stats.as_dict() == {"hits": 3, "misses": 1, "evictions": 1, "hit_rate": 0.75}
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("src.cache.time.monotonic", lambda: now[0])
+    cache = TTLCache(max_entries=10, ttl=5)
+    cache.put("a", [])
+
+    now[0] += 4
+    assert cache.get("a") == []
+    now[0] += 2
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_rejects_invalid_size():
+    with pytest.raises(ValueError, match="max_entries must be > 0"):
+        TTLCache(max_entries=0)
+
+
+def test_generation_bump():
+    generation = Generation()
+    assert generation.value == 0
+    assert generation.bump() == 1
+    assert generation.value == 1
+
+
+def test_semantic_cache_matches_nearby_embeddings():
+    cache = SemanticCache(max_entries=10, threshold=0.95)
+    cache.put([1.0, 0.0], scope=5, generation=0, value="answer")
+
+    assert cache.get([2.0, 0.1], scope=5, generation=0) == "answer"  # cosine ~0.999
+    assert cache.get([1.0, 1.0], scope=5, generation=0) is None  # cosine ~0.707
+    assert cache.get([1.0, 0.0], scope=3, generation=0) is None  # different scope
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 2
+
+
+def test_semantic_cache_returns_the_closest_entry():
+    cache = SemanticCache(max_entries=10, threshold=0.9)
+    cache.put([1.0, 0.2], scope=None, generation=0, value="near")
+    cache.put([1.0, 0.0], scope=None, generation=0, value="nearest")
+    cache.put([1.0, 0.3], scope=None, generation=0, value="far")
+
+    assert cache.get([1.0, 0.01], scope=None, generation=0) == "nearest"
+
+
+def test_semantic_cache_drops_entries_from_older_generations():
+    cache = SemanticCache(max_entries=10, threshold=0.95)
+    cache.put([1.0, 0.0], scope=None, generation=1, value="old")
+
+    assert cache.get([1.0, 0.0], scope=None, generation=2) is None
+    assert len(cache) == 0
+
+
+def test_semantic_cache_expires_entries_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("src.cache.time.monotonic", lambda: now[0])
+    cache = SemanticCache(max_entries=10, threshold=0.95, ttl=60)
+    cache.put([1.0, 0.0], scope=None, generation=0, value="answer")
+
+    now[0] = 150.0
+    assert cache.get([1.0, 0.0], scope=None, generation=0) == "answer"
+    now[0] = 161.0
+    assert cache.get([1.0, 0.0], scope=None, generation=0) is None
+    assert len(cache) == 0
+
+
+def test_semantic_cache_starts_over_when_the_dimension_changes():
+    cache = SemanticCache(max_entries=10, threshold=0.95)
+    cache.put([1.0, 0.0], scope=None, generation=0, value="2d")
+
+    assert cache.get([1.0, 0.0, 0.0], scope=None, generation=0) is None
+    cache.put([1.0, 0.0, 0.0], scope=None, generation=0, value="3d")
+    assert cache.get([1.0, 0.0, 0.0], scope=None, generation=0) == "3d"
+    assert len(cache) == 1
+
+
+def test_semantic_cache_evicts_least_recently_used_and_replaces_same_embedding():
+    cache = SemanticCache(max_entries=2, threshold=0.99)
+    cache.put([1.0, 0.0], scope=None, generation=0, value="a")
+    cache.put([0.0, 1.0], scope=None, generation=0, value="b")
+    cache.put([0.0, 1.0], scope=None, generation=0, value="b2")
+    assert len(cache) == 2
+    cache.get([1.0, 0.0], scope=None, generation=0)  # "b2" is now least recently used
+    cache.put([-1.0, 0.0], scope=None, generation=0, value="c")
+
+    assert cache.get([0.0, 1.0], scope=None, generation=0) is None
+    assert cache.get([1.0, 0.0], scope=None, generation=0) == "a"
+    assert cache.stats.evictions == 1
+
+
+def test_semantic_cache_rejects_invalid_parameters():
+    with pytest.raises(ValueError, match="max_entries"):
+        SemanticCache(max_entries=0, threshold=0.9)
+    with pytest.raises(ValueError, match="threshold"):
+        SemanticCache(max_entries=1, threshold=0)
@@ -1,6 +1,16 @@
+from unittest.mock import patch
+
 import pytest
 
-from src.ingestion.chunker import chunk_text, fixed_size_chunks, recursive_chunks
+from src.config import settings
+from src.ingestion.chunker import (
+    chunk_text,
+    chunk_windows,
+    fixed_size_chunks,
+    get_tokenizer,
+    recursive_chunks,
+    token_chunks,
+)
 
 
 class TestFixedSizeChunks:
@@ -103,6 +113,12 @@ class TestRecursiveEdgeCases:
     def test_recursive_empty_string(self):
         assert recursive_chunks("", chunk_size=100) == []
 
+    def test_recursive_never_emits_blank_chunks(self):
+        big = "word " * 40
+        chunks = recursive_chunks(" \n\n" + big + "\n\n \n\n" + big, chunk_size=50, overlap=0)
+        assert chunks
+        assert all(c.text.strip() for c in chunks)
+
     def test_recursive_whitespace_only(self):
         assert recursive_chunks("   \n\n  ", chunk_size=100) == []
 
@@ -114,3 +130,107 @@ class TestRecursiveEdgeCases:
         # All content is preserved
         total_len = sum(len(c.text) for c in chunks)
         assert total_len >= 200
+
+    def test_recursive_overlap_output_is_stable(self):
+        """Chunk boundaries and overlap match the original merge behaviour."""
+        text = "Alpha beta.\n\nGamma delta epsilon.\n\nZeta eta theta iota.\n\nKappa."
+        chunks = recursive_chunks(text, chunk_size=30, overlap=8)
+        assert [c.text for c in chunks] == [
+            "Alpha beta.",
+            "ha beta.\n\nGamma delta epsilon.",
+            "epsilon.\n\nZeta eta theta iota.",
+            "ta iota.\n\nKappa.",
+        ]
+
+    def test_recursive_splits_oversized_paragraph(self):
+        """A paragraph longer than chunk_size is split on finer separators."""
+        long_paragraph = " ".join(f"word{i}" for i in range(60))
+        text = f"Intro.\n\n{long_paragraph}\n\nOutro."
+        chunks = recursive_chunks(text, chunk_size=50, overlap=0)
+        assert chunks[0].text == "Intro."
+        assert chunks[-1].text == "Outro."
+        assert all(len(c.text) <= 50 for c in chunks)
+        assert " ".join(c.text for c in chunks[1:-1]).split() == long_paragraph.split()
+        assert [c.metadata["chunk_index"] for c in chunks] == list(range(len(chunks)))
+
+    def test_recursive_oversized_word_falls_back_to_slices(self):
+        text = "short line\n" + "y" * 120 + "\nlast line"
+        chunks = recursive_chunks(text, chunk_size=50, overlap=0)
+        assert [c.text for c in chunks] == ["short line", "y" * 50, "y" * 50, "y" * 20, "last line"]
+
+
+class TestChunkWindows:
+    def test_chunk_index_continues_across_windows(self):
+        windows = ["First window.\n\nMore text here.\n\n", "Second window.\n\nEnd."]
+        batches = list(chunk_windows(windows, chunk_size=20, overlap=0, metadata={"source": "big.txt"}))
+
+        assert len(batches) == 2
+        indexes = [c.metadata["chunk_index"] for batch in batches for c in batch]
+        assert indexes == list(range(len(indexes)))
+        assert all(c.metadata["source"] == "big.txt" for batch in batches for c in batch)
+
+    def test_skips_blank_windows(self):
+        assert list(chunk_windows(["   ", ""], chunk_size=20)) == []
+
+
+@pytest.fixture
+def word_tokenizer():
+    """A tiny offline tokenizer: every word and punctuation run is one token."""
+    from tokenizers import Tokenizer
+    from tokenizers.models import WordLevel
+    from tokenizers.pre_tokenizers import Whitespace
+
+    tokenizer = Tokenizer(WordLevel(vocab={"[UNK]": 0}, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    return tokenizer
+
+
+def _token_count(tokenizer, text):
+    return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+class TestTokenChunks:
+    def test_chunks_respect_token_budget(self, word_tokenizer):
+        text = "\n\n".join(" ".join(f"w{p}_{i}" for i in range(7)) + "." for p in range(10))
+        chunks = token_chunks(text, chunk_size=20, overlap=0, tokenizer=word_tokenizer)
+        assert len(chunks) > 1
+        assert all(_token_count(word_tokenizer, c.text) <= 20 for c in chunks)
+        assert all(c.metadata["tokens"] <= 20 for c in chunks)
+        assert " ".join(c.text for c in chunks).split() == text.split()
+
+    def test_cuts_at_paragraph_boundaries(self, word_tokenizer):
+        text = "one two three.\n\nfour five six.\n\nseven eight nine."
+        chunks = token_chunks(text, chunk_size=9, overlap=0, tokenizer=word_tokenizer)
+        assert [c.text for c in chunks] == ["one two three.\n\nfour five six.", "seven eight nine."]
+
+    def test_overlap_repeats_trailing_tokens(self, word_tokenizer):
+        text = " ".join(f"t{i}" for i in range(30))
+        chunks = token_chunks(text, chunk_size=10, overlap=3, tokenizer=word_tokenizer)
+        assert chunks[0].text.split()[-3:] == chunks[1].text.split()[:3]
+
+    def test_single_batch_encode_call(self, word_tokenizer):
+        text = "\n\n".join(f"paragraph {i} text." for i in range(50))
+        with patch.object(word_tokenizer, "encode_batch", wraps=word_tokenizer.encode_batch) as spy:
+            token_chunks(text, chunk_size=16, overlap=4, tokenizer=word_tokenizer)
+        spy.assert_called_once()
+
+    def test_blank_text(self, word_tokenizer):
+        assert token_chunks("  \n\n ", chunk_size=10, tokenizer=word_tokenizer) == []
+
+    def test_chunk_text_token_strategy_uses_cached_tokenizer(self, word_tokenizer, tmp_path, monkeypatch):
+        path = tmp_path / "tokenizer.json"
+        word_tokenizer.save(str(path))
+        monkeypatch.setattr(settings, "tokenizer_path", str(path))
+        get_tokenizer.cache_clear()
+        try:
+            chunks = chunk_text("alpha beta gamma", strategy="token", chunk_size=10, metadata={"source": "a"})
+            assert get_tokenizer(str(path)) is get_tokenizer(str(path))
+        finally:
+            get_tokenizer.cache_clear()
+        assert [c.text for c in chunks] == ["alpha beta gamma"]
+        assert chunks[0].metadata["strategy"] == "token"
+        assert chunks[0].metadata["source"] == "a"
+
+    def test_missing_tokenizer_file_raises(self, tmp_path):
+        with pytest.raises(RuntimeError, match="TOKENIZER_PATH"):
+            get_tokenizer(str(tmp_path / "missing.json"))
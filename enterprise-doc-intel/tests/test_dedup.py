@@ -0,0 +1,47 @@
+"""Unit tests for chunk deduplication."""
+
+from __future__ import annotations
+
+import pytest
+
+from src.ingestion.dedup import ChunkDeduplicator
+
+FOOTER = (
+    "This document is confidential and intended solely for internal use by Acme Corp employees. "
+    "Do not distribute outside the company without written approval from the legal department. "
+    "Questions about this policy should be directed to compliance at extension 4410."
+)
+
+
+class TestChunkDeduplicator:
+    def test_first_copy_is_canonical(self):
+        dedup = ChunkDeduplicator()
+        assert dedup.check("a", FOOTER) is None
+
+    def test_exact_duplicate_ignores_case_and_whitespace(self):
+        dedup = ChunkDeduplicator()
+        dedup.check("a", FOOTER)
+        assert dedup.check("b", "  " + FOOTER.upper().replace(" ", "\n")) == "a"
+
+    def test_near_duplicate_maps_to_canonical(self):
+        dedup = ChunkDeduplicator(threshold=0.8)
+        dedup.check("a", FOOTER)
+        assert dedup.check("b", FOOTER.replace("4410", "4411")) == "a"
+
+    def test_different_text_is_not_a_duplicate(self):
+        dedup = ChunkDeduplicator()
+        dedup.check("a", FOOTER)
+        other = "Quarterly revenue grew twelve percent, driven by enterprise subscriptions in Europe and Asia."
+        assert dedup.check("b", other) is None
+        assert dedup.check("c", other) == "b"
+
+    def test_threshold_controls_near_duplicates(self):
+        strict = ChunkDeduplicator(threshold=1.0)
+        strict.check("a", FOOTER)
+        assert strict.check("b", FOOTER.replace("legal department", "finance team")) is None
+
+    def test_invalid_parameters(self):
+        with pytest.raises(ValueError, match="threshold"):
+            ChunkDeduplicator(threshold=0)
+        with pytest.raises(ValueError, match="multiple of bands"):
+            ChunkDeduplicator(num_perm=10, bands=4)
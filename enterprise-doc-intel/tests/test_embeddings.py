@@ -2,32 +2,123 @@
 
 from __future__ import annotations
 
+import sqlite3
+import time
+from pathlib import Path
 from unittest.mock import patch
 
 import pytest
 
-from src.embeddings.provider import EmbeddingError, get_embeddings, get_single_embedding
+from src.config import settings
+from src.embeddings.cache import EmbeddingCache
+from src.embeddings.provider import (
+    EmbeddingError,
+    get_embeddings,
+    get_query_embedding,
+    get_single_embedding,
+    normalize_query,
+    query_embedding_cache_stats,
+    reset_query_embedding_cache,
+)
 
 
-@patch("src.embeddings.provider._client")
+def _echo_embed(model: str, input: list[str], **options) -> dict:
+    """Fake Ollama embed: one vector per input, encoding the input length."""
+    return {"embeddings": [[float(len(text))] for text in input]}
+
+
+@patch("src.embeddings.provider.gateway")
 def test_get_embeddings_returns_vectors(mock_ollama):
-    mock_ollama.embed.return_value = {"embeddings": [[0.1, 0.2, 0.3]]}
+    mock_ollama.embed.return_value = {"embeddings": [[0.1, 0.2, 0.3], [0.4, 0.5, 0.6]]}
 
     result = get_embeddings(["hello", "world"])
 
     assert len(result) == 2
     assert result[0] == [0.1, 0.2, 0.3]
+    mock_ollama.embed.assert_called_once()
+    assert mock_ollama.embed.call_args.kwargs["priority"] == "background"
+
+
+@patch("src.embeddings.provider.gateway")
+def test_get_embeddings_splits_by_batch_size(mock_ollama):
+    mock_ollama.embed.side_effect = _echo_embed
+    texts = ["a" * n for n in range(1, 8)]
+
+    result = get_embeddings(texts, batch_size=3)
+
+    assert mock_ollama.embed.call_count == 3
+    assert result == [[float(n)] for n in range(1, 8)]
+
+
+@pytest.mark.parametrize("batch_size", [0, -1])
+def test_get_embeddings_rejects_non_positive_batch_size(batch_size):
+    with pytest.raises(ValueError, match="batch_size"):
+        get_embeddings(["hello"], batch_size=batch_size)
+
 
+@patch("src.embeddings.provider.gateway")
+def test_get_embeddings_respects_char_cap(mock_ollama):
+    mock_ollama.embed.side_effect = _echo_embed
 
-@patch("src.embeddings.provider._client")
-def test_get_embeddings_raises_on_failure(mock_ollama):
+    result = get_embeddings(["x" * 60, "y" * 60, "z" * 500], batch_size=10, max_batch_chars=100)
+
+    # 60 + 60 exceeds the cap, and the oversized text is sent on its own
+    batches = [call.kwargs["input"] for call in mock_ollama.embed.call_args_list]
+    assert [len(b) for b in batches] == [1, 1, 1]
+    assert result == [[60.0], [60.0], [500.0]]
+
+
+@patch("src.embeddings.provider.time.sleep")
+@patch("src.embeddings.provider.gateway")
+def test_get_embeddings_raises_on_count_mismatch(mock_ollama, mock_sleep):
+    mock_ollama.embed.return_value = {"embeddings": [[0.1]]}
+
+    with pytest.raises(EmbeddingError, match="expected 2 vectors"):
+        get_embeddings(["hello", "world"])
+
+
+@patch("src.embeddings.provider.time.sleep")
+@patch("src.embeddings.provider.gateway")
+def test_get_embeddings_raises_on_failure(mock_ollama, mock_sleep):
     mock_ollama.embed.side_effect = ConnectionError("down")
 
     with pytest.raises(EmbeddingError, match="Ollama embedding failed"):
         get_embeddings(["hello"])
 
+    # Initial attempt plus the configured retries, with doubling backoff
+    assert mock_ollama.embed.call_count == settings.embed_max_retries + 1
+    delays = [call.args[0] for call in mock_sleep.call_args_list]
+    assert delays == [settings.embed_retry_backoff * 2**i for i in range(settings.embed_max_retries)]
+
+
+@patch("src.embeddings.provider.time.sleep")
+@patch("src.embeddings.provider.gateway")
+def test_get_embeddings_retries_transient_failure(mock_ollama, mock_sleep):
+    mock_ollama.embed.side_effect = [ConnectionError("blip"), {"embeddings": [[0.7]]}]
+
+    result = get_embeddings(["hello"])
 
-@patch("src.embeddings.provider._client")
+    assert result == [[0.7]]
+    assert mock_ollama.embed.call_count == 2
+
+
+@patch("src.embeddings.provider.gateway")
+def test_get_embeddings_concurrent_preserves_order(mock_ollama):
+    def slow_first_batch(model: str, input: list[str], **options) -> dict:
+        # Make earlier batches finish last to exercise ordered reassembly.
+        time.sleep(0.01 * (10 - len(input[0])))
+        return _echo_embed(model, input)
+
+    mock_ollama.embed.side_effect = slow_first_batch
+    texts = ["a" * n for n in range(1, 10)]
+
+    result = get_embeddings(texts, batch_size=1, concurrency=4)
+
+    assert mock_ollama.embed.call_count == 9
+    assert result == [[float(n)] for n in range(1, 10)]
+
+
+@patch("src.embeddings.provider.gateway")
 def test_get_single_embedding(mock_ollama):
     mock_ollama.embed.return_value = {"embeddings": [[0.5, 0.6]]}
 
@@ -36,9 +127,151 @@ def test_get_single_embedding(mock_ollama):
     assert result == [0.5, 0.6]
 
 
-@patch("src.embeddings.provider._client")
+@patch("src.embeddings.provider.gateway")
 def test_get_single_embedding_raises_on_failure(mock_ollama):
     mock_ollama.embed.side_effect = ConnectionError("unreachable")
 
     with pytest.raises(EmbeddingError):
         get_single_embedding("hello")
+
+
+# --- Embedding cache ---
+
+
+@patch("src.embeddings.provider.gateway")
+def test_get_embeddings_reuses_cached_vectors(mock_ollama, tmp_path: Path):
+    mock_ollama.embed.side_effect = _echo_embed
+    cache = EmbeddingCache(str(tmp_path / "emb.sqlite3"), max_bytes=1024 * 1024)
+
+    with patch("src.embeddings.provider._cache", cache):
+        first = get_embeddings(["one", "three"])
+        second = get_embeddings(["three", "fourteen", "one"])
+
+    assert first == [[3.0], [5.0]]
+    assert second == [[5.0], [8.0], [3.0]]
+    # Only "fourteen" was new on the second call
+    assert mock_ollama.embed.call_count == 2
+    assert mock_ollama.embed.call_args_list[1].kwargs["input"] == ["fourteen"]
+    assert cache.stats.hits == 2
+    assert cache.stats.misses == 3
+
+
+@patch("src.embeddings.provider.gateway")
+def test_get_embeddings_sends_repeated_text_once(mock_ollama):
+    mock_ollama.embed.side_effect = _echo_embed
+
+    result = get_embeddings(["same", "same", "other"])
+
+    assert result == [[4.0], [4.0], [5.0]]
+    assert mock_ollama.embed.call_args.kwargs["input"] == ["same", "other"]
+
+
+@patch("src.embeddings.provider.gateway")
+def test_get_single_embedding_uses_cache(mock_ollama, tmp_path: Path):
+    mock_ollama.embed.return_value = {"embeddings": [[0.25, 0.5]]}
+    cache = EmbeddingCache(str(tmp_path / "emb.sqlite3"), max_bytes=1024 * 1024)
+
+    with patch("src.embeddings.provider._cache", cache):
+        assert get_single_embedding("hello") == [0.25, 0.5]
+        assert get_single_embedding("hello") == [0.25, 0.5]
+
+    mock_ollama.embed.assert_called_once()
+
+
+def test_embedding_cache_is_keyed_by_model(tmp_path: Path):
+    cache = EmbeddingCache(str(tmp_path / "emb.sqlite3"), max_bytes=1024 * 1024)
+    cache.put_many("model-a", {"text": [1.0, 2.0]})
+
+    assert cache.get_many("model-a", ["text"]) == {"text": [1.0, 2.0]}
+    assert cache.get_many("model-b", ["text"]) == {}
+
+
+def test_normalize_query():
+    assert normalize_query("  What is\tthe\n\nVPN  policy? ") == "What is the VPN policy?"
+    assert normalize_query("ｖｐｎ") == "vpn"
+
+
+@patch("src.embeddings.provider.gateway")
+def test_get_query_embedding_reuses_normalized_queries(mock_ollama):
+    mock_ollama.embed.return_value = {"embeddings": [[0.5]]}
+
+    assert get_query_embedding("What is the VPN policy?") == [0.5]
+    assert get_query_embedding("  what is the  vpn policy? ") == [0.5]
+    get_query_embedding("Something else")
+
+    assert mock_ollama.embed.call_count == 2
+    assert mock_ollama.embed.call_args_list[0].kwargs["input"] == ["What is the VPN policy?"]
+    assert mock_ollama.embed.call_args_list[0].kwargs["priority"] == "interactive"
+    assert query_embedding_cache_stats() == {
+        "memory": {"entries": 2, "hits": 1, "misses": 2, "evictions": 0, "hit_rate": 0.3333},
+    }
+
+
+@patch("src.embeddings.provider.gateway")
+def test_get_query_embedding_evicts_least_recently_used(mock_ollama, monkeypatch):
+    mock_ollama.embed.side_effect = _echo_embed
+    monkeypatch.setattr(settings, "query_embedding_cache_max_entries", 2)
+
+    for query in ["a", "bb", "a", "ccc", "bb"]:
+        get_query_embedding(query)
+
+    assert [call.kwargs["input"] for call in mock_ollama.embed.call_args_list] == [["a"], ["bb"], ["ccc"], ["bb"]]
+
+
+@patch("src.embeddings.provider.gateway")
+def test_get_query_embedding_disk_tier_is_shared(mock_ollama, monkeypatch, tmp_path: Path):
+    mock_ollama.embed.return_value = {"embeddings": [[0.25, 0.5]]}
+    monkeypatch.setattr(settings, "query_embedding_cache_disk", True)
+    monkeypatch.setattr(settings, "query_embedding_cache_path", str(tmp_path / "queries.sqlite3"))
+
+    assert get_query_embedding("hello") == [0.25, 0.5]
+    # A fresh process (or another worker) starts with an empty memory tier
+    reset_query_embedding_cache()
+    assert get_query_embedding("Hello") == [0.25, 0.5]
+
+    mock_ollama.embed.assert_called_once()
+    assert query_embedding_cache_stats()["disk"]["hits"] == 1
+
+
+@patch("src.embeddings.provider.gateway")
+def test_get_query_embedding_survives_a_locked_disk_tier(mock_ollama, monkeypatch, tmp_path: Path):
+    mock_ollama.embed.return_value = {"embeddings": [[0.25, 0.5]]}
+    monkeypatch.setattr(settings, "query_embedding_cache_disk", True)
+    monkeypatch.setattr(settings, "query_embedding_cache_path", str(tmp_path / "queries.sqlite3"))
+    locked = sqlite3.OperationalError("database is locked")
+
+    with (
+        patch.object(EmbeddingCache, "get_many", side_effect=locked),
+        patch.object(EmbeddingCache, "put_many", side_effect=locked),
+    ):
+        assert get_query_embedding("hello") == [0.25, 0.5]
+        # The memory tier still caches the vector.
+        assert get_query_embedding("hello") == [0.25, 0.5]
+
+    mock_ollama.embed.assert_called_once()
+
+
+@patch("src.embeddings.provider.gateway")
+def test_get_query_embedding_without_cache(mock_ollama, monkeypatch):
+    mock_ollama.embed.return_value = {"embeddings": [[0.5]]}
+    monkeypatch.setattr(settings, "query_embedding_cache_enabled", False)
+
+    get_query_embedding("hello")
+    get_query_embedding("hello")
+
+    assert mock_ollama.embed.call_count == 2
+    assert query_embedding_cache_stats() is None
+
+
+@patch("src.embeddings.provider.time.sleep")
+@patch("src.embeddings.provider.gateway")
+def test_get_query_embedding_is_one_request_within_its_timeout(mock_ollama, mock_sleep):
+    mock_ollama.embed.side_effect = ConnectionError("down")
+
+    with pytest.raises(EmbeddingError, match="Ollama embedding failed"):
+        get_query_embedding("hello", timeout=7)
+
+    # No retries: the timeout bounds the whole call, not each attempt.
+    mock_ollama.embed.assert_called_once()
+    assert mock_ollama.embed.call_args.kwargs["timeout"] == 7
+    mock_sleep.assert_not_called()
@@ -0,0 +1,158 @@
+"""Unit tests for the in-process entity name index."""
+
+from __future__ import annotations
+
+import time
+from unittest.mock import MagicMock, patch
+
+from src.config import settings
+from src.knowledge_graph import entity_index
+from src.knowledge_graph.entity_index import (
+    EntityIndex,
+    batched_entity_updates,
+    get_entity_index,
+    load_entity_index,
+    update_entity_index,
+)
+
+
+class TestEntityIndex:
+    def test_matches_case_insensitively(self):
+        index = EntityIndex(["Data Security Policy", "VPN"])
+        assert index.find("What does the data security policy say about the vpn?") == [
+            "Data Security Policy",
+            "VPN",
+        ]
+
+    def test_matches_whole_words_only(self):
+        index = EntityIndex(["VPN", "Security"])
+        assert index.find("vpnclient and cybersecurity") == []
+        assert index.find("VPN-based access, security.") == ["VPN", "Security"]
+
+    def test_overlapping_and_nested_names(self):
+        index = EntityIndex(["Security Policy", "Data Security Policy", "Policy Team"])
+        found = index.find("the data security policy team")
+        assert set(found) == {"Security Policy", "Data Security Policy", "Policy Team"}
+
+    def test_names_with_punctuation(self):
+        index = EntityIndex(["Node.js", "Wi-Fi Policy"])
+        assert index.find("Is node.js allowed on the wi-fi policy network?") == ["Node.js", "Wi-Fi Policy"]
+        assert index.find("node js") == []
+
+    def test_skips_short_names(self):
+        index = EntityIndex(["IT", "AI", "HR Team"])
+        assert index.find("Ask IT or the AI about the HR team") == ["HR Team"]
+
+    def test_same_name_with_different_case_returns_both(self):
+        index = EntityIndex(["VPN", "vpn"])
+        assert sorted(index.find("vpn")) == ["VPN", "vpn"]
+
+    def test_add_and_discard(self):
+        index = EntityIndex(["Remote Work Policy"])
+        index.add(["Leave Policy"])
+        assert index.find("leave policy and remote work policy") == ["Leave Policy", "Remote Work Policy"]
+
+        index.discard(["Remote Work Policy", "Unknown"])
+        assert index.find("leave policy and remote work policy") == ["Leave Policy"]
+        assert index.size == 1
+
+    def test_batch_rebuilds_once_at_the_end(self):
+        index = EntityIndex(["Remote Work Policy"])
+        with patch.object(entity_index, "_Automaton", wraps=entity_index._Automaton) as automaton:
+            with index.batch():
+                index.add(["Leave Policy"])
+                with index.batch():
+                    index.add(["Firewall"])
+                index.discard(["Remote Work Policy"])
+                assert index.find("remote work policy") == ["Remote Work Policy"]
+            assert automaton.call_count == 1
+        assert index.find("leave policy, firewall, remote work policy") == ["Leave Policy", "Firewall"]
+
+    def test_no_match(self):
+        assert EntityIndex(["Remote Work Policy"]).find("What is the weather?") == []
+        assert EntityIndex().find("anything") == []
+
+
+class TestProcessIndex:
+    def test_loads_every_entity_once(self):
+        neo4j = MagicMock()
+        neo4j.get_all_entities.return_value = [{"name": "VPN", "labels": ["Technology"]}]
+
+        assert get_entity_index(neo4j).find("vpn") == ["VPN"]
+        assert get_entity_index(neo4j).find("VPN setup") == ["VPN"]
+
+        neo4j.get_all_entities.assert_called_once_with(limit=None)
+
+    def test_updates_apply_after_load(self):
+        neo4j = MagicMock()
+        neo4j.get_all_entities.return_value = [{"name": "old.md", "labels": ["Document"]}]
+        load_entity_index(neo4j)
+
+        update_entity_index(added=["Firewall"], removed=["old.md"])
+
+        assert get_entity_index(neo4j).find("firewall rules in old.md") == ["Firewall"]
+
+    def test_updates_before_load_are_ignored(self):
+        update_entity_index(added=["Firewall"])
+
+        neo4j = MagicMock()
+        neo4j.get_all_entities.return_value = []
+        assert get_entity_index(neo4j).find("firewall") == []
+
+    def test_batched_updates_rebuild_once(self):
+        neo4j = MagicMock()
+        neo4j.get_all_entities.return_value = []
+        index = load_entity_index(neo4j)
+
+        with patch.object(index, "_rebuild", wraps=index._rebuild) as rebuild:
+            with batched_entity_updates():
+                for name in ["a.md", "b.md", "c.md"]:
+                    update_entity_index(added=[name])
+            assert rebuild.call_count == 1
+        assert get_entity_index(neo4j).find("a.md or c.md") == ["a.md", "c.md"]
+
+
+class TestStaleness:
+    def _neo4j(self, names: list[str]) -> MagicMock:
+        neo4j = MagicMock()
+        neo4j.count_entities.return_value = len(names)
+        neo4j.get_all_entities.return_value = [{"name": n, "labels": ["Technology"]} for n in names]
+        return neo4j
+
+    def _advance(self, monkeypatch, seconds: float) -> None:
+        now = time.monotonic() + seconds
+        monkeypatch.setattr(entity_index.time, "monotonic", lambda: now)
+
+    def test_reloads_after_ttl_when_count_changes(self, monkeypatch):
+        monkeypatch.setattr(settings, "entity_index_ttl", 60)
+        neo4j = self._neo4j(["VPN"])
+        load_entity_index(neo4j)
+
+        # Another process ingests a document.
+        neo4j.count_entities.return_value = 2
+        neo4j.get_all_entities.return_value.append({"name": "Firewall", "labels": ["Technology"]})
+        assert get_entity_index(neo4j).find("firewall") == []
+
+        self._advance(monkeypatch, 61)
+        assert get_entity_index(neo4j).find("firewall") == ["Firewall"]
+        assert neo4j.get_all_entities.call_count == 2
+
+    def test_unchanged_count_keeps_index(self, monkeypatch):
+        monkeypatch.setattr(settings, "entity_index_ttl", 60)
+        neo4j = self._neo4j(["VPN"])
+        index = load_entity_index(neo4j)
+
+        self._advance(monkeypatch, 61)
+        assert get_entity_index(neo4j) is index
+        assert get_entity_index(neo4j) is index
+        assert neo4j.count_entities.call_count == 2  # load + one check per interval
+        neo4j.get_all_entities.assert_called_once()
+
+    def test_failed_check_keeps_index(self, monkeypatch):
+        monkeypatch.setattr(settings, "entity_index_ttl", 60)
+        neo4j = self._neo4j(["VPN"])
+        index = load_entity_index(neo4j)
+
+        neo4j.count_entities.side_effect = ConnectionError("down")
+        self._advance(monkeypatch, 61)
+        assert get_entity_index(neo4j) is index
@@ -2,9 +2,22 @@
 
 from __future__ import annotations
 
-from unittest.mock import MagicMock, patch
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
 
-from src.rag.generator import GenerationResult, generate_answer
+import pytest
+
+from src.cache import corpus_generation
+from src.config import settings
+from src.rag.generator import (
+    GenerationResult,
+    agenerate_answer,
+    answer_cache_stats,
+    astream_answer,
+    generate_answer,
+    reset_answer_cache,
+    stream_answer,
+)
 from src.rag.retriever import RetrievalResult
 from src.vectorstore.chroma import SearchResult
 
@@ -18,7 +31,7 @@ def _make_retrieval():
     )
 
 
-@patch("src.rag.generator._client")
+@patch("src.rag.generator.gateway")
 @patch("src.rag.generator.retrieve", return_value=_make_retrieval())
 def test_generate_answer_returns_result(mock_retrieve, mock_ollama):
     mock_ollama.chat.return_value = {"message": {"content": "The answer is 42."}}
@@ -31,7 +44,7 @@ def test_generate_answer_returns_result(mock_retrieve, mock_ollama):
     assert result.sources[0]["source"] == "doc.md"
 
 
-@patch("src.rag.generator._client")
+@patch("src.rag.generator.gateway")
 @patch("src.rag.generator.retrieve", return_value=_make_retrieval())
 def test_generate_answer_raises_on_ollama_failure(mock_retrieve, mock_ollama):
     mock_ollama.chat.side_effect = ConnectionError("down")
@@ -41,3 +54,198 @@ def test_generate_answer_raises_on_ollama_failure(mock_retrieve, mock_ollama):
         assert False, "Should have raised"
     except RuntimeError as e:
         assert "LLM generation failed" in str(e)
+
+
+@pytest.fixture
+def answer_cache(monkeypatch):
+    monkeypatch.setattr(settings, "answer_cache_enabled", True)
+    reset_answer_cache()
+    yield
+    reset_answer_cache()
+
+
+def _fake_query_embedding(question: str, timeout: float | None = None) -> list[float]:
+    # Paraphrases of the VPN question land next to each other.
+    return [1.0, 0.05] if "vpn" in question.lower() else [0.0, 1.0]
+
+
+@patch("src.rag.generator.embed_query", side_effect=_fake_query_embedding)
+@patch("src.rag.generator.gateway")
+@patch("src.rag.generator.retrieve", return_value=_make_retrieval())
+def test_generate_answer_reuses_answers_for_paraphrases(mock_retrieve, mock_ollama, mock_embed, answer_cache):
+    mock_ollama.chat.return_value = {"message": {"content": "Use the VPN."}}
+
+    first = generate_answer("How do I connect to the VPN?", MagicMock())
+    second = generate_answer("how can I connect to the vpn", MagicMock())
+    other = generate_answer("What is the leave policy?", MagicMock())
+
+    assert first.cached is False
+    assert second.cached is True
+    assert second.answer == "Use the VPN."
+    assert other.cached is False
+    assert mock_ollama.chat.call_count == 2
+    assert answer_cache_stats()["hits"] == 1
+
+
+@patch("src.rag.generator.embed_query", side_effect=_fake_query_embedding)
+@patch("src.rag.generator.gateway")
+@patch("src.rag.generator.retrieve", return_value=_make_retrieval())
+def test_generate_answer_cache_respects_bypass_top_k_and_ingest(mock_retrieve, mock_ollama, mock_embed, answer_cache):
+    mock_ollama.chat.return_value = {"message": {"content": "Use the VPN."}}
+
+    generate_answer("VPN?", MagicMock())
+    assert generate_answer("VPN?", MagicMock(), use_cache=False).cached is False
+    assert generate_answer("VPN?", MagicMock(), top_k=3).cached is False
+    corpus_generation.bump()
+    assert generate_answer("VPN?", MagicMock()).cached is False
+
+    assert mock_ollama.chat.call_count == 4
+
+
+@patch("src.rag.generator.gateway")
+@patch("src.rag.generator.retrieve", return_value=_make_retrieval())
+def test_stream_answer_sends_sources_then_tokens(mock_retrieve, mock_ollama):
+    mock_ollama.chat.return_value = iter(
+        [{"message": {"content": "The answer"}}, {"message": {"content": ""}}, {"message": {"content": " is 42."}}]
+    )
+
+    events = list(stream_answer("question", MagicMock()))
+
+    assert events[0] == {"type": "sources", "sources": [{"source": "doc.md", "score": 0.9}], "graph_context": ""}
+    assert [e["content"] for e in events if e["type"] == "token"] == ["The answer", " is 42."]
+    assert events[-1] == {"type": "done", "cached": False}
+    assert mock_ollama.chat.call_args.kwargs["stream"] is True
+
+
+@patch("src.rag.generator.gateway")
+@patch("src.rag.generator.retrieve", return_value=_make_retrieval())
+def test_stream_answer_raises_on_ollama_failure(mock_retrieve, mock_ollama):
+    mock_ollama.chat.side_effect = ConnectionError("down")
+
+    events = stream_answer("question", MagicMock())
+
+    assert next(events)["type"] == "sources"
+    with pytest.raises(RuntimeError, match="LLM generation failed"):
+        next(events)
+
+
+@patch("src.rag.generator.embed_query", side_effect=_fake_query_embedding)
+@patch("src.rag.generator.gateway")
+@patch("src.rag.generator.retrieve", return_value=_make_retrieval())
+def test_stream_answer_shares_the_answer_cache(mock_retrieve, mock_ollama, mock_embed, answer_cache):
+    mock_ollama.chat.return_value = iter([{"message": {"content": "Use "}}, {"message": {"content": "the VPN."}}])
+
+    list(stream_answer("VPN?", MagicMock()))
+    assert generate_answer("vpn?", MagicMock()).answer == "Use the VPN."
+    events = list(stream_answer("VPN?", MagicMock()))
+
+    assert events[1:] == [{"type": "token", "content": "Use the VPN."}, {"type": "done", "cached": True}]
+    assert mock_ollama.chat.call_count == 1
+
+
+@patch("src.rag.generator.retrieve", return_value=_make_retrieval())
+async def test_agenerate_answer_awaits_the_async_client(mock_retrieve):
+    llm = MagicMock()
+    llm.achat = AsyncMock(return_value={"message": {"content": "The answer is 42."}})
+
+    result = await agenerate_answer("question", MagicMock(), llm=llm)
+
+    assert result.answer == "The answer is 42."
+    assert result.sources[0]["source"] == "doc.md"
+    llm.achat.assert_awaited_once()
+
+
+@patch("src.rag.generator.retrieve", return_value=_make_retrieval())
+async def test_agenerate_answer_raises_on_ollama_failure(mock_retrieve):
+    llm = MagicMock()
+    llm.achat = AsyncMock(side_effect=ConnectionError("down"))
+
+    with pytest.raises(RuntimeError, match="LLM generation failed"):
+        await agenerate_answer("question", MagicMock(), llm=llm)
+
+
+@patch("src.rag.generator.embed_query", side_effect=_fake_query_embedding)
+@patch("src.rag.generator.retrieve", return_value=_make_retrieval())
+async def test_astream_answer_streams_and_caches(mock_retrieve, mock_embed, answer_cache):
+    async def chunks():
+        for content in ["The answer", " is 42."]:
+            yield {"message": {"content": content}}
+
+    llm = MagicMock()
+    llm.achat = AsyncMock(return_value=chunks())
+
+    events = [event async for event in astream_answer("What is the answer?", MagicMock(), llm=llm)]
+    cached = [event async for event in astream_answer("what is the answer?", MagicMock(), llm=llm)]
+
+    assert [e["type"] for e in events] == ["sources", "token", "token", "done"]
+    assert llm.achat.await_args.kwargs["stream"] is True
+    assert cached[1] == {"type": "token", "content": "The answer is 42."}
+    assert cached[-1] == {"type": "done", "cached": True}
+    assert llm.achat.await_count == 1
+
+
+@patch("src.rag.generator.embed_query", side_effect=_fake_query_embedding)
+@patch("src.rag.generator.gateway")
+@patch("src.rag.generator.retrieve", return_value=_make_retrieval())
+def test_generate_answer_hands_the_lookup_embedding_to_retrieve(mock_retrieve, mock_ollama, mock_embed, answer_cache):
+    mock_ollama.chat.return_value = {"message": {"content": "The answer is 42."}}
+
+    generate_answer("How do I set up the VPN?", MagicMock())
+
+    mock_embed.assert_called_once()
+    assert mock_retrieve.call_args.kwargs["query_embedding"] == [1.0, 0.05]
+
+
+@patch("src.rag.retriever.get_query_embedding")
+@patch("src.rag.retriever.extract_entities_from_query", return_value=["VPN"])
+@patch("src.rag.generator.gateway")
+def test_graph_branch_overlaps_the_answer_cache_lookup(mock_ollama, mock_entities, mock_retriever_embed, answer_cache):
+    """With the answer cache on, the graph lookup starts before the question is embedded."""
+    mock_ollama.chat.return_value = {"message": {"content": "Use the VPN."}}
+    graph_started = threading.Event()
+
+    def graph_context(entities, neo4j):
+        graph_started.set()
+        return "'VPN' is related to: Remote Access"
+
+    def slow_embedding(question, timeout=None):
+        # A serial lookup would only start the graph branch after this returns.
+        assert graph_started.wait(1)
+        return _fake_query_embedding(question)
+
+    chroma = MagicMock()
+    chroma.search.return_value = _make_retrieval().vector_results
+
+    with (
+        patch("src.rag.generator.embed_query", side_effect=slow_embedding) as mock_embed,
+        patch("src.rag.retriever.get_graph_context", side_effect=graph_context),
+    ):
+        result = generate_answer("How do I connect to the VPN?", chroma, MagicMock())
+
+    assert result.graph_context == "'VPN' is related to: Remote Access"
+    mock_embed.assert_called_once_with("How do I connect to the VPN?", timeout=settings.retrieval_vector_timeout)
+    mock_retriever_embed.assert_not_called()
+
+
+@patch("src.rag.retriever.get_graph_context", return_value="'VPN' is related to: Remote Access")
+@patch("src.rag.retriever.extract_entities_from_query", return_value=["VPN"])
+@patch("src.embeddings.provider.gateway")
+@patch("src.rag.generator.gateway")
+def test_answer_cache_hit_makes_no_neo4j_calls(mock_ollama, mock_embed_ollama, mock_entities, mock_graph, answer_cache):
+    mock_ollama.chat.return_value = {"message": {"content": "Use the VPN."}}
+    mock_embed_ollama.embed.return_value = {"embeddings": [[1.0, 0.05]]}
+    chroma = MagicMock()
+    chroma.search.return_value = _make_retrieval().vector_results
+    neo4j = MagicMock()
+
+    generate_answer("How do I connect to the VPN?", chroma, neo4j)
+    neo4j.reset_mock()
+    mock_entities.reset_mock()
+    hits = [generate_answer("How do I connect to the VPN?", chroma, neo4j) for _ in range(10)]
+
+    # The question embedding is cached, so the hit is found before any graph work starts.
+    assert all(hit.cached for hit in hits)
+    assert neo4j.mock_calls == []
+    mock_entities.assert_not_called()
+    assert mock_graph.call_count == 1
+    assert mock_embed_ollama.embed.call_count == 1
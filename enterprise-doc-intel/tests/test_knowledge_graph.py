@@ -4,14 +4,22 @@ from __future__ import annotations
 
 from unittest.mock import MagicMock, patch
 
-from src.knowledge_graph.extractor import extract_and_store, extract_entities_and_relations
+from src.knowledge_graph.extraction_cache import ExtractionCache
+from src.knowledge_graph.extractor import (
+    MAX_EXTRACTION_CHARS,
+    extract_and_store,
+    extract_entities_and_relations,
+    extract_from_chunks,
+    merge_extractions,
+    split_for_extraction,
+)
 from src.knowledge_graph.query import extract_entities_from_query, get_graph_context
 
 
 # --- Extractor tests ---
 
 
-@patch("src.knowledge_graph.extractor._client")
+@patch("src.knowledge_graph.extractor.gateway")
 def test_extract_entities_parses_valid_json(mock_ollama):
     mock_ollama.chat.return_value = {
         "message": {
@@ -25,7 +33,7 @@ def test_extract_entities_parses_valid_json(mock_ollama):
     assert result["entities"][0]["name"] == "VPN"
 
 
-@patch("src.knowledge_graph.extractor._client")
+@patch("src.knowledge_graph.extractor.gateway")
 def test_extract_entities_handles_markdown_wrapped_json(mock_ollama):
     mock_ollama.chat.return_value = {
         "message": {
@@ -38,7 +46,7 @@ def test_extract_entities_handles_markdown_wrapped_json(mock_ollama):
     assert len(result["entities"]) == 1
 
 
-@patch("src.knowledge_graph.extractor._client")
+@patch("src.knowledge_graph.extractor.gateway")
 def test_extract_entities_returns_empty_on_bad_json(mock_ollama):
     mock_ollama.chat.return_value = {"message": {"content": "Sorry, I cannot extract entities."}}
 
@@ -55,7 +63,7 @@ def test_extract_entities_skips_empty_text():
     assert result == {"entities": [], "relationships": []}
 
 
-@patch("src.knowledge_graph.extractor._client")
+@patch("src.knowledge_graph.extractor.gateway")
 def test_extract_entities_handles_ollama_failure(mock_ollama):
     mock_ollama.chat.side_effect = ConnectionError("Ollama unreachable")
 
@@ -80,10 +88,21 @@ def test_extract_and_store_creates_entities(mock_extract):
     count = extract_and_store("text", {"source": "doc.md", "type": "markdown"}, neo4j)
 
     assert count == 2
-    # Document node + 2 entities = 3 create_entity calls
-    assert neo4j.create_entity.call_count == 3
-    # 2 MENTIONS + 1 explicit relationship = 3
-    assert neo4j.create_relationship.call_count == 3
+    # Everything is written in one bulk call instead of one query per node/edge
+    neo4j.merge_graph.assert_called_once()
+    neo4j.create_entity.assert_not_called()
+    neo4j.create_relationship.assert_not_called()
+    nodes, edges = neo4j.merge_graph.call_args.args
+    # Document node + 2 entities
+    assert [(n["label"], n["name"]) for n in nodes] == [
+        ("Document", "doc.md"),
+        ("Technology", "VPN"),
+        ("Organization", "IT Team"),
+    ]
+    # 2 MENTIONS + 1 explicit relationship, attached to the extracted labels
+    assert [e["type"] for e in edges] == ["MENTIONS", "MENTIONS", "USES"]
+    assert edges[2]["from_label"] == "Organization"
+    assert edges[2]["to_label"] == "Technology"
 
 
 @patch("src.knowledge_graph.extractor.extract_entities_and_relations")
@@ -96,9 +115,187 @@ def test_extract_and_store_skips_empty_names(mock_extract):
 
     count = extract_and_store("text", {"source": "doc.md"}, neo4j)
 
-    assert count == 2  # raw entity count from LLM response
+    assert count == 0  # distinct named entities after merging
     # Only the Document node, no entity nodes for empty names
-    assert neo4j.create_entity.call_count == 1
+    nodes, edges = neo4j.merge_graph.call_args.args
+    assert [n["label"] for n in nodes] == ["Document"]
+    assert edges == []
+
+
+# --- Extraction cache ---
+
+_VPN_JSON = '{"entities": [{"name": "VPN", "label": "Technology"}], "relationships": []}'
+
+
+@patch("src.knowledge_graph.extractor.gateway")
+def test_extraction_is_cached_per_text(mock_ollama, tmp_path):
+    mock_ollama.chat.return_value = {"message": {"content": _VPN_JSON}}
+    cache = ExtractionCache(str(tmp_path / "extract.sqlite3"), max_bytes=1024 * 1024)
+
+    with patch("src.knowledge_graph.extractor._cache", cache):
+        first = extract_entities_and_relations("We use a VPN.")
+        second = extract_entities_and_relations("We use a VPN.")
+        extract_entities_and_relations("Different text.")
+
+    assert first == second
+    assert second["entities"][0]["name"] == "VPN"
+    assert mock_ollama.chat.call_count == 2
+    assert cache.stats.hits == 1
+
+
+@patch("src.knowledge_graph.extractor.gateway")
+def test_extraction_cache_skips_failures(mock_ollama, tmp_path):
+    mock_ollama.chat.return_value = {"message": {"content": "not json"}}
+    cache = ExtractionCache(str(tmp_path / "extract.sqlite3"), max_bytes=1024 * 1024)
+
+    with patch("src.knowledge_graph.extractor._cache", cache):
+        extract_entities_and_relations("Some text.")
+        extract_entities_and_relations("Some text.")
+
+    assert mock_ollama.chat.call_count == 2
+    assert len(cache) == 0
+
+
+@patch("src.knowledge_graph.extractor.gateway")
+def test_extraction_cache_invalidated_by_prompt_or_model_change(mock_ollama, tmp_path, monkeypatch):
+    from src.config import settings
+
+    mock_ollama.chat.return_value = {"message": {"content": _VPN_JSON}}
+    cache = ExtractionCache(str(tmp_path / "extract.sqlite3"), max_bytes=1024 * 1024)
+
+    with patch("src.knowledge_graph.extractor._cache", cache):
+        extract_entities_and_relations("We use a VPN.")
+        with patch("src.knowledge_graph.extractor.PROMPT_VERSION", "edited"):
+            extract_entities_and_relations("We use a VPN.")
+        monkeypatch.setattr(settings, "ollama_model", "other-model")
+        extract_entities_and_relations("We use a VPN.")
+
+    assert mock_ollama.chat.call_count == 3
+
+
+def test_extraction_cache_round_trip(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "extract.sqlite3"), max_bytes=1024 * 1024)
+    result = {"entities": [{"name": "SSO", "label": "System"}], "relationships": []}
+
+    cache.put("llama3.2", "v1", "text", result)
+
+    assert cache.get("llama3.2", "v1", "text") == result
+    assert cache.get("llama3.2", "v2", "text") is None
+
+
+# --- Chunk-level extraction ---
+
+
+def test_split_for_extraction_covers_long_documents():
+    text = "\n\n".join(f"Paragraph {i} mentions System{i}." for i in range(400))
+
+    chunks = split_for_extraction(text)
+
+    assert len(chunks) > 1
+    assert all(len(c) <= MAX_EXTRACTION_CHARS for c in chunks)
+    assert "System399" in chunks[-1]
+
+
+def test_merge_extractions_deduplicates_entities_and_relationships():
+    merged = merge_extractions(
+        [
+            {
+                "entities": [{"name": "VPN", "label": "Technology"}, {"name": "IT Team", "label": "Organization"}],
+                "relationships": [{"from": "IT Team", "to": "VPN", "type": "USES"}],
+            },
+            {
+                "entities": [{"name": "vpn", "label": "Concept"}, {"name": "", "label": "Concept"}],
+                "relationships": [{"from": "it team", "to": "vpn", "type": "USES"}, {"from": "VPN", "to": "", "type": "USES"}],
+            },
+        ]
+    )
+
+    assert merged["entities"] == [
+        {"name": "VPN", "label": "Technology"},
+        {"name": "IT Team", "label": "Organization"},
+    ]
+    assert merged["relationships"] == [{"from": "IT Team", "to": "VPN", "type": "USES"}]
+
+
+def test_merge_extractions_skips_malformed_output():
+    merged = merge_extractions(
+        [
+            ["VPN", "IT Team"],
+            "no entities here",
+            {
+                "entities": ["VPN", {"name": 42}, {"name": "VPN", "label": None}],
+                "relationships": [None, {"from": "IT Team", "to": "VPN"}],
+            },
+            {"entities": "VPN", "relationships": {"from": "a", "to": "b"}},
+        ]
+    )
+
+    assert merged["entities"] == [{"name": "VPN", "label": "Concept"}]
+    assert merged["relationships"] == [{"from": "IT Team", "to": "VPN", "type": "RELATES_TO"}]
+
+
+@patch("src.knowledge_graph.extractor.extract_entities_and_relations")
+def test_extract_from_chunks_limits_concurrency(mock_extract):
+    import threading
+    import time
+
+    lock = threading.Lock()
+    active = {"now": 0, "peak": 0}
+
+    def slow_extract(text):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.01)
+        with lock:
+            active["now"] -= 1
+        return {"entities": [{"name": text, "label": "Concept"}], "relationships": []}
+
+    mock_extract.side_effect = slow_extract
+
+    merged = extract_from_chunks((f"chunk {i}" for i in range(12)), concurrency=3)
+
+    assert active["peak"] <= 3
+    # Results are merged in chunk order regardless of completion order
+    assert [e["name"] for e in merged["entities"]] == [f"chunk {i}" for i in range(12)]
+
+
+@patch("src.knowledge_graph.extractor.extract_entities_and_relations")
+def test_extract_from_chunks_skips_repeated_and_blank_chunks(mock_extract):
+    mock_extract.return_value = {"entities": [], "relationships": []}
+
+    extract_from_chunks(["Same footer.", "  ", "Body text.", "Same footer."], concurrency=2)
+
+    assert sorted(call.args[0] for call in mock_extract.call_args_list) == ["Body text.", "Same footer."]
+
+
+@patch("src.knowledge_graph.extractor.extract_entities_and_relations")
+def test_extract_and_store_extracts_every_chunk_with_one_write(mock_extract):
+    mock_extract.side_effect = lambda text: {
+        "entities": [{"name": "Shared", "label": "Concept"}, {"name": text.split()[0], "label": "System"}],
+        "relationships": [],
+    }
+    neo4j = MagicMock()
+
+    count = extract_and_store(iter(["Alpha text.", "Bravo text.", "Charlie text."]), {"source": "big.txt"}, neo4j)
+
+    assert mock_extract.call_count == 3
+    assert count == 4  # Shared + Alpha + Bravo + Charlie
+    neo4j.merge_graph.assert_called_once()
+
+
+@patch("src.knowledge_graph.extractor.extract_entities_and_relations")
+def test_extract_and_store_adds_new_names_to_loaded_entity_index(mock_extract):
+    from src.knowledge_graph.entity_index import load_entity_index
+
+    graph = MagicMock()
+    graph.get_all_entities.return_value = []
+    load_entity_index(graph)
+    mock_extract.return_value = {"entities": [{"name": "Firewall", "label": "System"}], "relationships": []}
+
+    extract_and_store("text", {"source": "net.md"}, MagicMock())
+
+    assert extract_entities_from_query("How is the firewall configured?", graph) == ["Firewall"]
 
 
 # --- Query tests ---
@@ -130,21 +327,39 @@ def test_extract_entities_from_query_returns_empty_on_no_match():
 
 def test_get_graph_context_builds_text():
     neo4j = MagicMock()
-    neo4j.search_entities.return_value = [{"name": "VPN", "labels": ["Technology"]}]
-    neo4j.get_neighbors.return_value = [
-        {"name": "IT Team", "labels": ["Organization"], "distance": 1},
+    neo4j.get_neighborhoods.return_value = [
+        {"name": "VPN", "neighbors": [{"name": "IT Team", "labels": ["Organization"], "distance": 1}]},
     ]
 
     context = get_graph_context(["VPN"], neo4j)
 
-    assert "VPN" in context
-    assert "IT Team" in context
+    assert context == "'VPN' is related to: IT Team (Organization)"
+
+
+def test_get_graph_context_batches_all_entities_in_one_call():
+    neo4j = MagicMock()
+    neo4j.get_neighborhoods.return_value = [
+        {"name": "VPN", "neighbors": [{"name": "IT Team", "labels": ["Organization"], "distance": 1}]},
+        {"name": "Remote Work Policy", "neighbors": [{"name": "VPN", "labels": ["Technology"], "distance": 1}]},
+    ]
+
+    context = get_graph_context(["VPN", "Remote Work Policy", "VPN"], neo4j, neighbor_limit=5)
+
+    neo4j.get_neighborhoods.assert_called_once_with(
+        ["VPN", "Remote Work Policy"], max_hops=2, match_limit=3, neighbor_limit=5
+    )
+    assert context.splitlines() == [
+        "'VPN' is related to: IT Team (Organization)",
+        "'Remote Work Policy' is related to: VPN (Technology)",
+    ]
 
 
 def test_get_graph_context_returns_empty_on_no_entities():
     neo4j = MagicMock()
-    neo4j.search_entities.return_value = []
+    neo4j.get_neighborhoods.return_value = []
 
     context = get_graph_context(["nonexistent"], neo4j)
 
     assert context == ""
+    assert get_graph_context([], neo4j) == ""
+    neo4j.get_neighborhoods.assert_called_once()
@@ -0,0 +1,178 @@
+"""Unit tests for the shared LLM gateway."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.config import settings
+from src.llm import BACKGROUND, INTERACTIVE, LLMGateway
+
+RESPONSE = {"message": {"content": "ok"}}
+
+
+def _gateway(monkeypatch, client, interactive: int = 2, background: int = 1) -> LLMGateway:
+    monkeypatch.setattr(settings, "llm_interactive_concurrency", interactive)
+    monkeypatch.setattr(settings, "llm_background_concurrency", background)
+    gateway = LLMGateway(host="http://ollama.test")
+    gateway._client = MagicMock(return_value=client)
+    return gateway
+
+
+def _blocking_client(release: threading.Event, started: threading.Event | None = None) -> MagicMock:
+    def chat(**kwargs):
+        if started is not None:
+            started.set()
+        release.wait(5)
+        if kwargs["messages"][0]["content"] == "fail":
+            raise ConnectionError("down")
+        return RESPONSE
+
+    client = MagicMock()
+    client.chat.side_effect = chat
+    return client
+
+
+def test_identical_concurrent_calls_are_coalesced(monkeypatch):
+    release = threading.Event()
+    started = threading.Event()
+    client = _blocking_client(release, started)
+    gateway = _gateway(monkeypatch, client)
+    request = {"model": "m", "messages": [{"role": "user", "content": "hi"}]}
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        leader = pool.submit(gateway.chat, **request)
+        assert started.wait(5)
+        followers = [pool.submit(gateway.chat, **request) for _ in range(2)]
+        while gateway.coalesced < 2:
+            time.sleep(0.01)
+        release.set()
+        results = [leader.result(), *(f.result() for f in followers)]
+
+    assert results == [RESPONSE] * 3
+    assert client.chat.call_count == 1
+    # Once the call is finished, the same prompt goes to Ollama again.
+    gateway.chat(**request)
+    assert client.chat.call_count == 2
+
+
+def test_coalesced_callers_share_the_error(monkeypatch):
+    release = threading.Event()
+    started = threading.Event()
+    gateway = _gateway(monkeypatch, _blocking_client(release, started))
+    request = {"model": "m", "messages": [{"role": "user", "content": "fail"}]}
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(gateway.chat, **request)
+        assert started.wait(5)
+        follower = pool.submit(gateway.chat, **request)
+        while gateway.coalesced < 1:
+            time.sleep(0.01)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(ConnectionError):
+                future.result()
+
+
+def test_background_calls_do_not_block_interactive(monkeypatch):
+    release = threading.Event()
+    started = threading.Event()
+    client = _blocking_client(release, started)
+    gateway = _gateway(monkeypatch, client, interactive=1, background=1)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        extraction = pool.submit(
+            gateway.chat, model="m", messages=[{"role": "user", "content": "extract"}], priority=BACKGROUND
+        )
+        assert started.wait(5)
+        # The only background slot is taken; an interactive call still gets through.
+        client.chat.side_effect = None
+        client.chat.return_value = RESPONSE
+        assert gateway.chat(model="m", messages=[{"role": "user", "content": "ask"}]) == RESPONSE
+        release.set()
+        extraction.result()
+
+
+def test_interactive_call_is_not_coalesced_with_background(monkeypatch):
+    release = threading.Event()
+    started = threading.Event()
+    client = _blocking_client(release, started)
+    gateway = _gateway(monkeypatch, client, interactive=1, background=1)
+    request = {"model": "m", "messages": [{"role": "user", "content": "same"}]}
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        extraction = pool.submit(gateway.chat, **request, priority=BACKGROUND)
+        assert started.wait(5)
+        # Same prompt, but it must not wait on the background request.
+        client.chat.side_effect = None
+        client.chat.return_value = RESPONSE
+        assert gateway.chat(**request) == RESPONSE
+        assert gateway.coalesced == 0
+        assert client.chat.call_count == 2
+        release.set()
+        extraction.result()
+
+
+def test_stream_holds_a_slot_until_exhausted(monkeypatch):
+    client = MagicMock()
+    client.chat.return_value = iter([{"message": {"content": "a"}}, {"message": {"content": "b"}}])
+    gateway = _gateway(monkeypatch, client, interactive=1)
+
+    stream = gateway.chat(model="m", messages=[], stream=True)
+    assert next(stream)["message"]["content"] == "a"
+    assert not gateway._slots[INTERACTIVE].acquire(blocking=False)
+    assert [c["message"]["content"] for c in stream] == ["b"]
+    assert gateway._slots[INTERACTIVE].acquire(blocking=False)
+    assert client.chat.call_args.kwargs["stream"] is True
+
+
+def test_timeouts_follow_priority_unless_overridden(monkeypatch):
+    monkeypatch.setattr(settings, "llm_interactive_timeout", 30)
+    monkeypatch.setattr(settings, "ollama_timeout", 120)
+    gateway = _gateway(monkeypatch, MagicMock())
+
+    gateway.embed(model="m", input="a")
+    gateway.embed(model="m", input="b", priority=BACKGROUND)
+    gateway.embed(model="m", input="c", timeout=5)
+
+    assert [call.args[0] for call in gateway._client.call_args_list] == [30, 120, 5]
+    with pytest.raises(ValueError, match="Unknown LLM priority"):
+        gateway.embed(model="m", input="d", priority="urgent")
+
+
+def test_clients_share_one_pooled_transport(monkeypatch):
+    gateway = LLMGateway(host="http://ollama.test")
+    try:
+        fast, slow = gateway._client(5), gateway._client(60)
+        assert gateway._client(5) is fast
+        assert fast._client._transport is slow._client._transport is gateway._transport
+    finally:
+        gateway.close()
+
+
+async def test_async_calls_are_coalesced(monkeypatch):
+    release = asyncio.Event()
+
+    async def chat(**kwargs):
+        await release.wait()
+        return RESPONSE
+
+    client = MagicMock()
+    client.chat = AsyncMock(side_effect=chat)
+    gateway = LLMGateway(host="http://ollama.test")
+    gateway._async_client = MagicMock(return_value=client)
+    request = {"model": "m", "messages": [{"role": "user", "content": "hi"}]}
+
+    calls = [asyncio.create_task(gateway.achat(**request)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*calls) == [RESPONSE] * 3
+    assert client.chat.await_count == 1
+    assert gateway.coalesced == 2
+    await gateway.aclose()
@@ -1,6 +1,15 @@
 from pathlib import Path
 
-from src.ingestion.loader import Document, load_directory, load_markdown, load_pdf, load_text
+from src.ingestion.loader import (
+    Document,
+    MappedDocument,
+    iter_documents,
+    load_directory,
+    load_document,
+    load_markdown,
+    load_pdf,
+    load_text,
+)
 
 
 class TestLoaders:
@@ -78,3 +87,95 @@ class TestLoaders:
 
         docs = load_directory(tmp_path)
         assert len(docs) == 2
+
+
+def _write_blank_pdf(path: Path, pages: int) -> Path:
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=200, height=200)
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
+
+
+class TestParallelLoading:
+    def test_splits_large_pdfs_into_page_ranges(self, tmp_path: Path, monkeypatch):
+        from src.config import settings
+
+        monkeypatch.setattr(settings, "pdf_pages_per_task", 2)
+        pdf = _write_blank_pdf(tmp_path / "big.pdf", pages=5)
+        (tmp_path / "notes.md").write_text("Notes")
+
+        docs = list(iter_documents([pdf, tmp_path / "notes.md"], workers=2))
+
+        by_name = {Path(d.metadata["source"]).name: d for d in docs}
+        assert set(by_name) == {"big.pdf", "notes.md"}
+        assert by_name["big.pdf"].metadata["pages"] == 5
+        assert by_name["big.pdf"].content == load_pdf(pdf).content
+
+    def test_isolates_corrupt_pdf(self, tmp_path: Path):
+        good = _write_blank_pdf(tmp_path / "good.pdf", pages=1)
+        bad = tmp_path / "bad.pdf"
+        bad.write_bytes(b"not a pdf")
+
+        docs = list(iter_documents([bad, good], workers=2))
+
+        assert [Path(d.metadata["source"]).name for d in docs] == ["good.pdf"]
+
+    def test_single_worker_loads_in_order(self, tmp_path: Path):
+        paths = [tmp_path / f"{name}.txt" for name in ("c", "a", "b")]
+        for path in paths:
+            path.write_text(path.stem)
+
+        docs = list(iter_documents(paths, workers=1))
+
+        assert [d.content for d in docs] == ["c", "a", "b"]
+
+
+class TestMappedDocuments:
+    def test_large_text_files_are_memory_mapped(self, tmp_path: Path, monkeypatch):
+        from src.config import settings
+
+        monkeypatch.setattr(settings, "lazy_load_min_bytes", 10)
+        small = tmp_path / "small.txt"
+        small.write_text("tiny")
+        large = tmp_path / "large.md"
+        large.write_text("a much larger document")
+
+        assert isinstance(load_document(small), Document)
+        doc = load_document(large)
+        assert isinstance(doc, MappedDocument)
+        assert doc.metadata == {"source": str(large), "type": "markdown"}
+
+    def test_windows_cover_the_file_and_cut_at_paragraphs(self, tmp_path: Path):
+        text = "\n\n".join(f"Paragraph {i} " + "word " * 20 for i in range(20))
+        path = tmp_path / "big.txt"
+        path.write_text(text)
+        doc = MappedDocument(path=path)
+
+        windows = list(doc.windows(window_bytes=300))
+
+        assert len(windows) > 1
+        assert "".join(windows) == text
+        assert all(w.endswith("\n\n") for w in windows[:-1])
+
+    def test_windows_never_split_multibyte_characters(self, tmp_path: Path):
+        text = "é" * 500  # 2 bytes each, no separators
+        path = tmp_path / "accents.txt"
+        path.write_text(text, encoding="utf-8")
+
+        windows = list(MappedDocument(path=path).windows(window_bytes=101))
+
+        assert "".join(windows) == text
+        assert all("�" not in w for w in windows)
+
+    def test_head_and_empty_file(self, tmp_path: Path):
+        path = tmp_path / "doc.txt"
+        path.write_text("0123456789")
+        assert MappedDocument(path=path).head(4) == "0123"
+
+        empty = tmp_path / "empty.txt"
+        empty.write_text("")
+        assert list(MappedDocument(path=empty).windows()) == []
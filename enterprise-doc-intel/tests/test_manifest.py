@@ -0,0 +1,109 @@
+"""Unit tests for the incremental ingestion manifest."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from src.ingestion.manifest import Manifest, file_digest
+
+
+def _write(path: Path, text: str, mtime: int | None = None) -> Path:
+    path.write_text(text)
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+    return path
+
+
+def test_new_files_are_changed(tmp_path: Path):
+    doc = _write(tmp_path / "a.md", "hello")
+    manifest = Manifest(tmp_path / "manifest.json")
+
+    plan = manifest.plan([doc], tmp_path)
+
+    assert plan.changed == [doc]
+    assert plan.unchanged == []
+    assert plan.removed == []
+
+
+def test_recorded_file_is_unchanged(tmp_path: Path):
+    doc = _write(tmp_path / "a.md", "hello")
+    manifest = Manifest(tmp_path / "manifest.json")
+    manifest.record(doc, ["chunk_1"])
+
+    plan = manifest.plan([doc], tmp_path)
+
+    assert plan.unchanged == [doc]
+
+
+def test_touched_file_with_same_content_is_unchanged(tmp_path: Path):
+    doc = _write(tmp_path / "a.md", "hello", mtime=1_000_000_000)
+    manifest = Manifest(tmp_path / "manifest.json")
+    manifest.record(doc, ["chunk_1"])
+    _write(doc, "hello", mtime=2_000_000_000)
+
+    plan = manifest.plan([doc], tmp_path)
+
+    assert plan.unchanged == [doc]
+    assert manifest.entries[str(doc)].mtime_ns == 2_000_000_000
+
+
+def test_modified_file_is_changed(tmp_path: Path):
+    doc = _write(tmp_path / "a.md", "hello", mtime=1_000_000_000)
+    manifest = Manifest(tmp_path / "manifest.json")
+    manifest.record(doc, ["chunk_1"])
+    _write(doc, "hello, world", mtime=2_000_000_000)
+
+    plan = manifest.plan([doc], tmp_path)
+
+    assert plan.changed == [doc]
+
+
+def test_missing_files_under_directory_are_removed(tmp_path: Path):
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    kept = _write(docs_dir / "kept.md", "kept")
+    gone = _write(docs_dir / "gone.md", "gone")
+    elsewhere = _write(tmp_path / "elsewhere.md", "other dir")
+    manifest = Manifest(tmp_path / "manifest.json")
+    for path in (kept, gone, elsewhere):
+        manifest.record(path, [])
+    gone.unlink()
+
+    plan = manifest.plan([kept], docs_dir)
+
+    assert plan.removed == [str(gone)]
+
+
+def test_save_and_load_round_trip(tmp_path: Path):
+    doc = _write(tmp_path / "a.md", "hello")
+    manifest = Manifest(tmp_path / "state" / "manifest.json")
+    manifest.record(doc, ["chunk_1", "chunk_2"])
+    manifest.save()
+
+    loaded = Manifest.load(tmp_path / "state" / "manifest.json")
+
+    assert loaded.entries[str(doc)].chunk_ids == ["chunk_1", "chunk_2"]
+    assert loaded.entries[str(doc)].sha256 == file_digest(doc)
+
+
+def test_unchanged_file_without_graph_is_graph_pending(tmp_path: Path):
+    done = _write(tmp_path / "a.md", "hello")
+    pending = _write(tmp_path / "b.md", "world")
+    manifest = Manifest(tmp_path / "manifest.json")
+    manifest.record(done, ["chunk_1"])
+    manifest.record(pending, ["chunk_2"], graph=False)
+    manifest.save()
+
+    plan = Manifest.load(tmp_path / "manifest.json").plan([done, pending], tmp_path)
+
+    assert plan.unchanged == [done, pending]
+    assert plan.graph_pending == [pending]
+    assert plan.changed == []
+
+
+def test_load_ignores_corrupt_file(tmp_path: Path):
+    path = tmp_path / "manifest.json"
+    path.write_text("{not json")
+
+    assert Manifest.load(path).entries == {}
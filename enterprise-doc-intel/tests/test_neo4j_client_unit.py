@@ -1,3 +1,5 @@
+from unittest.mock import MagicMock
+
 import pytest
 
 pytest.importorskip("neo4j")
@@ -7,6 +9,7 @@ from src.knowledge_graph.neo4j_client import Neo4jClient, _safe_identifier
 
 def _mock_client(responses: list[list[dict]] | None = None):
     client = object.__new__(Neo4jClient)
+    client._driver = MagicMock()
     if responses is not None:
         sequence = iter(responses)
 
@@ -23,30 +26,101 @@ def test_get_subgraph_returns_empty_for_missing_entity():
     assert result == {"nodes": [], "edges": []}
 
 
+def _row(node_id, name, rel_id, source, target, degree=1, rel_type="RELATES_TO"):
+    return {
+        "id": node_id,
+        "name": name,
+        "labels": ["Concept"],
+        "degree": degree,
+        "rel_id": rel_id,
+        "source": source,
+        "target": target,
+        "type": rel_type,
+    }
+
+
+ROOT = [{"id": "1", "name": "root", "labels": ["Concept"]}]
+
+
 def test_get_subgraph_keeps_start_node_when_no_paths():
+    client = _mock_client([ROOT, []])
+    result = client.get_subgraph("root")
+    assert result["nodes"] == [{"id": "1", "name": "root", "labels": ["Concept"]}]
+    assert result["edges"] == []
+
+
+def test_get_subgraph_returns_nodes_and_edges_from_one_traversal():
     client = _mock_client(
         [
-            [{"id": "1", "name": "root", "labels": ["Concept"]}],
-            [],
-            [],
+            ROOT,
+            [_row("2", "child", "r1", "1", "2")],
+            [_row("3", "grandchild", "r2", "2", "3"), _row("1", "root", "r1", "1", "2")],
         ]
     )
     result = client.get_subgraph("root")
-    assert result["nodes"] == [{"id": "1", "name": "root", "labels": ["Concept"]}]
-    assert result["edges"] == []
+    assert [node["id"] for node in result["nodes"]] == ["1", "2", "3"]
+    assert result["edges"] == [
+        {"source": "1", "target": "2", "type": "RELATES_TO"},
+        {"source": "2", "target": "3", "type": "RELATES_TO"},
+    ]
 
 
-def test_get_subgraph_inserts_start_node_if_not_present():
+def test_traverse_stops_at_node_budget_without_dangling_edges():
     client = _mock_client(
         [
-            [{"id": "1", "name": "root", "labels": ["Concept"]}],
-            [{"id": "2", "name": "child", "labels": ["Concept"]}],
-            [{"source": "1", "target": "2", "type": "RELATES_TO"}],
+            ROOT,
+            [_row("2", "a", "r1", "1", "2"), _row("3", "b", "r2", "1", "3"), _row("4", "c", "r3", "1", "4")],
         ]
     )
-    result = client.get_subgraph("root")
-    assert result["nodes"][0]["id"] == "1"
-    assert any(node["id"] == "2" for node in result["nodes"])
+    result = client.traverse("root", max_hops=3, node_limit=3, edge_limit=10)
+    assert [node["id"] for node in result["nodes"]] == ["1", "2", "3"]
+    assert {edge["target"] for edge in result["edges"]} == {"2", "3"}
+
+
+def test_traverse_does_not_expand_high_degree_nodes():
+    calls = []
+    responses = iter(
+        [
+            ROOT,
+            [_row("2", "Company", "r1", "1", "2", degree=5000), _row("3", "VPN", "r2", "1", "3", degree=2)],
+            [_row("4", "IT Team", "r3", "3", "4")],
+        ]
+    )
+    client = _mock_client()
+
+    def fake_run_query(cypher, params=None):
+        calls.append(params)
+        return next(responses)
+
+    client.run_query = fake_run_query  # type: ignore[method-assign]
+
+    result = client.traverse("root", max_hops=2, max_degree=100)
+
+    assert calls[2]["frontier"] == ["3"]
+    assert [(node["name"], node["distance"]) for node in result["nodes"]] == [
+        ("root", 0),
+        ("Company", 1),
+        ("VPN", 1),
+        ("IT Team", 2),
+    ]
+
+
+def test_get_neighbors_excludes_visited_nodes_and_skips_edges():
+    calls = []
+    responses = iter([ROOT, [_row("2", "child", "r1", "1", "2")], []])
+    client = _mock_client()
+
+    def fake_run_query(cypher, params=None):
+        calls.append((cypher, params))
+        return next(responses)
+
+    client.run_query = fake_run_query  # type: ignore[method-assign]
+
+    neighbors = client.get_neighbors("root", max_hops=2)
+
+    assert neighbors == [{"name": "child", "labels": ["Concept"], "distance": 1}]
+    assert calls[2][1]["exclude"] == ["1", "2"]
+    assert "LIMIT $limit" in calls[1][0]
 
 
 # --- _safe_identifier tests ---
@@ -91,3 +165,471 @@ def test_create_relationship_falls_back_on_invalid_rel_type():
 
     client.create_relationship("Concept", "A", "Concept", "B", "INVALID_TYPE")
     assert "RELATES_TO" in calls[0][0]
+
+
+def test_delete_document_mentions_only_drops_mentions():
+    calls = []
+    client = _mock_client()
+    client.run_query = lambda cypher, params=None: calls.append((cypher, params)) or []
+
+    client.delete_document_mentions("policies/a.md")
+
+    assert "MENTIONS" in calls[0][0]
+    assert "DETACH" not in calls[0][0]
+    assert calls[0][1] == {"source": "policies/a.md"}
+
+
+# --- Bulk writes ---
+
+
+def _recording_client():
+    """Client whose write transactions are recorded instead of sent to Neo4j."""
+    transactions = []
+    client = _mock_client()
+    client.run_write_transaction = transactions.append  # type: ignore[method-assign]
+    return client, transactions
+
+
+def test_merge_entities_groups_by_label_in_one_transaction():
+    client, transactions = _recording_client()
+
+    client.merge_entities(
+        [
+            {"label": "Technology", "name": "VPN"},
+            {"label": "Technology", "name": "Firewall"},
+            {"label": "Organization", "name": "IT Team", "properties": {"size": 5}},
+            {"label": "Technology", "name": " VPN "},
+            {"label": "Concept", "name": "  "},
+        ]
+    )
+
+    assert len(transactions) == 1
+    statements = transactions[0]
+    assert len(statements) == 2  # one UNWIND per label
+    by_label = {cypher.split("(e:")[1].split(" ")[0]: params["rows"] for cypher, params in statements}
+    assert by_label["Technology"] == [{"name": "Firewall", "props": {}}, {"name": "VPN", "props": {}}]
+    assert by_label["Organization"] == [{"name": "IT Team", "props": {"size": 5}}]
+    assert all(cypher.startswith("UNWIND $rows") for cypher, _ in statements)
+
+
+def test_merge_entities_sanitizes_labels():
+    client, transactions = _recording_client()
+
+    client.merge_entities([{"label": "Bad Label}) DETACH DELETE (n", "name": "X"}])
+
+    (cypher, _), = transactions[0]
+    assert "(e:Concept {name: row.name})" in cypher
+    assert "DELETE" not in cypher
+
+
+def test_merge_relationships_groups_by_type_and_labels():
+    client, transactions = _recording_client()
+
+    client.merge_relationships(
+        [
+            {"from_label": "Document", "from_name": "a.md", "to_label": "Technology", "to_name": "VPN", "type": "MENTIONS"},
+            {"from_label": "Document", "from_name": "a.md", "to_label": "Technology", "to_name": "SSO", "type": "MENTIONS"},
+            {"from_label": "Organization", "from_name": "IT", "to_label": "Technology", "to_name": "VPN", "type": "BOGUS"},
+            {"from_label": "Concept", "from_name": "", "to_label": "Concept", "to_name": "B", "type": "USES"},
+        ]
+    )
+
+    statements = transactions[0]
+    assert len(statements) == 2
+    cyphers = " ".join(cypher for cypher, _ in statements)
+    assert "[r:MENTIONS]" in cyphers
+    assert "[r:RELATES_TO]" in cyphers  # invalid type falls back
+    assert sum(len(params["rows"]) for _, params in statements) == 3
+
+
+def test_merge_graph_writes_nodes_before_edges_in_one_transaction():
+    client, transactions = _recording_client()
+
+    client.merge_graph(
+        [{"label": "Technology", "name": "VPN"}],
+        [{"from_label": "Document", "from_name": "a.md", "to_label": "Technology", "to_name": "VPN", "type": "MENTIONS"}],
+    )
+
+    assert len(transactions) == 1
+    assert [("MERGE (a:" in cypher) for cypher, _ in transactions[0]] == [False, True]
+
+
+def test_merge_entities_splits_large_batches():
+    client, transactions = _recording_client()
+
+    client.merge_entities([{"label": "Concept", "name": f"c{i}"} for i in range(2500)])
+
+    assert [len(params["rows"]) for _, params in transactions[0]] == [1000, 1000, 500]
+
+
+def test_run_write_transaction_uses_one_session():
+    client = _mock_client()
+    session = client._driver.session.return_value.__enter__.return_value
+    tx = MagicMock()
+    session.execute_write.side_effect = lambda work: work(tx)
+
+    client.run_write_transaction([("RETURN 1", {}), ("RETURN 2", {"x": 1})])
+
+    client._driver.session.assert_called_once()
+    assert [c.args for c in tx.run.call_args_list] == [("RETURN 1", {}), ("RETURN 2", {"x": 1})]
+
+
+# --- Sessions ---
+
+
+def _session_of(client):
+    return client._driver.session.return_value.__enter__.return_value
+
+
+def test_queries_in_session_block_share_one_session():
+    client = _mock_client()
+    session = _session_of(client)
+
+    with client.session():
+        client.search_entities("VPN")
+        client.get_neighbors("VPN")
+        client.get_all_entities()
+
+    client._driver.session.assert_called_once()
+    assert client._driver.session.call_args.kwargs["default_access_mode"] == "READ"
+    assert session.run.call_count == 3
+
+
+def test_nested_session_blocks_reuse_outer_session():
+    client = _mock_client()
+
+    with client.session(write=True) as outer:
+        with client.session() as inner:
+            assert inner is outer
+        client.run_query("RETURN 1")
+
+    client._driver.session.assert_called_once()
+    assert client._driver.session.call_args.kwargs["default_access_mode"] == "WRITE"
+
+
+def test_write_block_inside_read_block_opens_write_session():
+    client = _mock_client()
+
+    with client.session():
+        with client.session(write=True):
+            pass
+
+    modes = [call.kwargs["default_access_mode"] for call in client._driver.session.call_args_list]
+    assert modes == ["READ", "WRITE"]
+
+
+def test_run_query_outside_block_opens_its_own_session():
+    client = _mock_client()
+
+    client.run_query("RETURN 1")
+    client.run_query("RETURN 2")
+
+    assert client._driver.session.call_count == 2
+
+
+def test_session_is_not_shared_between_clients():
+    first, second = _mock_client(), _mock_client()
+
+    with first.session():
+        second.run_query("RETURN 1")
+
+    _session_of(second).run.assert_called_once()
+    _session_of(first).run.assert_not_called()
+
+
+def test_execute_read_uses_managed_read_transaction():
+    client = _mock_client()
+    session = _session_of(client)
+    session.execute_read.side_effect = lambda work, *args: work("tx", *args)
+
+    result = client.execute_read(lambda tx, x: (tx, x), 42)
+
+    assert result == ("tx", 42)
+    session.execute_read.assert_called_once()
+
+
+def test_get_subgraph_runs_in_one_session():
+    client = _mock_client()
+    session = _session_of(client)
+    session.run.return_value = []
+
+    client.get_subgraph("Missing")
+
+    client._driver.session.assert_called_once()
+
+
+# --- Schema and index-backed reads ---
+
+
+def _query_log(client, result=None):
+    calls = []
+
+    def fake_run_query(cypher, params=None):
+        calls.append((cypher, params))
+        return result if result is not None else []
+
+    client.run_query = fake_run_query  # type: ignore[method-assign]
+    return calls
+
+
+def test_schema_statements_cover_every_label():
+    from src.knowledge_graph.neo4j_client import _ALLOWED_LABELS, schema_statements
+
+    statements = schema_statements()
+
+    for label in _ALLOWED_LABELS:
+        assert any(f"(n:{label}) REQUIRE n.name IS UNIQUE" in s for s in statements)
+    assert any(s.startswith("CREATE INDEX entity_name IF NOT EXISTS FOR (n:Entity)") for s in statements)
+    assert any(s.startswith("CREATE FULLTEXT INDEX entity_names IF NOT EXISTS") for s in statements)
+    assert all("IF NOT EXISTS" in s for s in statements)
+
+
+def test_ensure_schema_backfills_label_and_tolerates_failed_constraints():
+    from neo4j.exceptions import ClientError
+
+    client = _mock_client()
+    calls = []
+
+    def fake_run_query(cypher, params=None):
+        calls.append(cypher)
+        if "policy_name_unique" in cypher:
+            raise ClientError("duplicate names")
+        if "count(n)" in cypher:
+            return [{"count": 5 if "(n:Entity)" in cypher else 7}]
+        return []
+
+    client.run_query = fake_run_query  # type: ignore[method-assign]
+
+    client.ensure_schema()
+
+    assert "SET n:Entity" in calls[2]
+    assert any("CREATE FULLTEXT INDEX" in c for c in calls)
+    # Indexes are online before the first lookup uses them.
+    assert calls[-1] == "CALL db.awaitIndexes(300)"
+
+
+def test_ensure_schema_skips_backfill_when_every_node_is_labelled():
+    client = _mock_client()
+    calls = []
+
+    def fake_run_query(cypher, params=None):
+        calls.append(cypher)
+        return [{"count": 7}] if "count(n)" in cypher else []
+
+    client.run_query = fake_run_query  # type: ignore[method-assign]
+
+    client.ensure_schema()
+
+    assert not any("SET n:Entity" in c for c in calls)
+    assert any("CREATE FULLTEXT INDEX" in c for c in calls)
+
+
+def test_reads_match_on_indexed_entity_label():
+    client = _mock_client()
+    calls = _query_log(client)
+
+    client.get_neighbors("VPN")
+    client.get_all_entities()
+
+    assert "(start:Entity {name: $name})" in calls[0][0]
+    assert "MATCH (e:Entity)" in calls[1][0]
+
+
+def test_search_entities_uses_fulltext_index():
+    client = _mock_client()
+    calls = _query_log(client, result=[{"name": "Data Security Policy", "labels": ["Policy"]}])
+
+    result = client.search_entities("Data security?", limit=3)
+
+    assert result == [{"name": "Data Security Policy", "labels": ["Policy"]}]
+    cypher, params = calls[0]
+    assert "db.index.fulltext.queryNodes" in cypher
+    assert params == {"index": "entity_names", "lucene": "*data* AND *security*", "limit": 3}
+
+
+def test_search_entities_ignores_queries_without_words():
+    client = _mock_client()
+    calls = _query_log(client)
+
+    assert client.search_entities("?!") == []
+    assert calls == []
+
+
+def test_search_entities_falls_back_to_scan_without_fulltext_index():
+    from neo4j.exceptions import ClientError
+
+    client = _mock_client()
+    calls = []
+
+    def fake_run_query(cypher, params=None):
+        calls.append(cypher)
+        if "fulltext" in cypher:
+            raise ClientError("no such index")
+        return [{"name": "VPN", "labels": ["Technology"]}]
+
+    client.run_query = fake_run_query  # type: ignore[method-assign]
+
+    assert client.search_entities("vpn") == [{"name": "VPN", "labels": ["Technology"]}]
+    assert client.search_entities("vpn") == [{"name": "VPN", "labels": ["Technology"]}]
+    # The failing index is not retried on every query
+    assert sum("fulltext" in c for c in calls) == 1
+
+
+def test_search_entities_tries_the_fulltext_index_again_after_a_cooldown(monkeypatch):
+    from neo4j.exceptions import ClientError
+
+    from src.knowledge_graph import neo4j_client
+
+    now = [1000.0]
+    monkeypatch.setattr(neo4j_client.time, "monotonic", lambda: now[0])
+    client = _mock_client()
+    failures = [ClientError("index is still populating")]
+    calls = []
+
+    def fake_run_query(cypher, params=None):
+        calls.append(cypher)
+        if "fulltext" in cypher and failures:
+            raise failures.pop()
+        return [{"name": "VPN", "labels": ["Technology"]}]
+
+    client.run_query = fake_run_query  # type: ignore[method-assign]
+
+    client.search_entities("vpn")
+    now[0] += 61
+    client.search_entities("vpn")
+    client.search_entities("vpn")
+
+    # A transient failure does not switch the process to scans for good.
+    assert ["fulltext" in c for c in calls] == [True, False, True, True]
+
+
+def test_reads_hide_internal_entity_label():
+    client = _mock_client()
+    calls = _query_log(client)
+
+    client.search_entities("vpn")
+    client.get_all_entities()
+
+    assert all("WHERE label <> 'Entity'" in cypher for cypher, _ in calls)
+
+
+def _graph_client(edges: list[tuple[str, str]], starts: list[str]):
+    """Client whose get_neighborhoods() queries are answered from an in-memory graph."""
+    adjacency: dict[str, list[str]] = {}
+    for a, b in edges:
+        adjacency.setdefault(a, []).append(b)
+        adjacency.setdefault(b, []).append(a)
+    client = _mock_client()
+    calls = []
+
+    def fake_run_query(cypher, params=None):
+        calls.append((cypher, params))
+        if "queryNodes" in cypher:
+            return [{"id": name, "name": name} for name in starts]
+        result = []
+        for row in params["rows"]:
+            seen = adjacency.get(row["node"], [])[: params["path_limit"]]
+            fresh = sorted({n for n in seen if n not in row["visited"]})[: params["neighbor_limit"]]
+            result += [{"start": row["start"], "id": n, "name": n, "labels": ["Concept"]} for n in fresh]
+        return result
+
+    client.run_query = fake_run_query  # type: ignore[method-assign]
+    return client, calls
+
+
+def test_get_neighborhoods_resolves_names_then_expands_one_hop_per_query():
+    edges = [("VPN", "IT Team"), ("IT Team", "Helpdesk"), ("Remote Work", "Laptop")]
+    client, calls = _graph_client(edges, ["VPN", "Remote Work"])
+
+    result = client.get_neighborhoods(["VPN", "remote work?"], max_hops=9, match_limit=2, neighbor_limit=5)
+
+    assert result == [
+        {
+            "name": "VPN",
+            "neighbors": [
+                {"name": "IT Team", "labels": ["Concept"], "distance": 1},
+                {"name": "Helpdesk", "labels": ["Concept"], "distance": 2},
+            ],
+        },
+        {"name": "Remote Work", "neighbors": [{"name": "Laptop", "labels": ["Concept"], "distance": 1}]},
+    ]
+    cypher, params = calls[0]
+    assert cypher.startswith("UNWIND range(0, size($terms) - 1) AS i")
+    assert params["terms"] == ["*vpn*", "*remote* AND *work*"]
+    assert params["match_limit"] == 2
+    # One query per hop for both entities; the walk ends once no frontier is left.
+    assert len(calls) == 4
+    assert all("WITH neighbor LIMIT $path_limit" in cypher and "*1.." not in cypher for cypher, _ in calls[1:])
+    assert calls[2][1]["rows"] == [
+        {"start": "VPN", "node": "IT Team", "visited": ["IT Team", "VPN"]},
+        {"start": "Remote Work", "node": "Laptop", "visited": ["Laptop", "Remote Work"]},
+    ]
+
+
+def test_get_neighborhoods_returns_a_hubs_direct_neighbors_first(monkeypatch):
+    from src.knowledge_graph import neo4j_client
+
+    monkeypatch.setattr(neo4j_client, "_NEIGHBORHOOD_PATH_LIMIT", 20)
+    # The hub's first relationships lead to nodes with deep subtrees; its 1-hop neighbors outnumber the limit.
+    edges = [("Hub", f"n{i:02}") for i in range(50)]
+    edges += [(f"n{i:02}", f"deep{i:02}-{j}") for i in range(50) for j in range(30)]
+    client, calls = _graph_client(edges, ["Hub"])
+
+    result = client.get_neighborhoods(["hub"], max_hops=2, neighbor_limit=10)
+
+    neighbors = result[0]["neighbors"]
+    assert [n["name"] for n in neighbors] == [f"n{i:02}" for i in range(10)]
+    assert {n["distance"] for n in neighbors} == {1}
+    # Full after the first hop, so the second is never queried.
+    assert len(calls) == 2
+
+
+def test_get_neighborhoods_skips_queries_without_words():
+    client = _mock_client()
+    calls = _query_log(client)
+
+    assert client.get_neighborhoods(["?!"]) == []
+    assert calls == []
+
+
+def test_get_neighborhoods_falls_back_to_scan_without_fulltext_index():
+    from neo4j.exceptions import ClientError
+
+    client = _mock_client()
+    calls = []
+
+    def fake_run_query(cypher, params=None):
+        calls.append((cypher, params))
+        if "fulltext" in cypher:
+            raise ClientError("no such index")
+        return []
+
+    client.run_query = fake_run_query  # type: ignore[method-assign]
+
+    client.get_neighborhoods(["?!", "VPN"])
+
+    cypher, params = calls[-1]
+    assert "CONTAINS toLower($queries[i])" in cypher
+    assert params["queries"] == ["VPN"]
+
+
+def test_merges_add_entity_label():
+    client, transactions = _recording_client()
+
+    client.merge_graph(
+        [{"label": "Technology", "name": "VPN"}],
+        [{"from_label": "Document", "from_name": "a.md", "to_label": "Technology", "to_name": "VPN", "type": "MENTIONS"}],
+    )
+
+    node_cypher, edge_cypher = (cypher for cypher, _ in transactions[0])
+    assert "SET e:Entity" in node_cypher
+    assert "SET a:Entity, b:Entity" in edge_cypher
+
+
+def test_get_all_entities_without_limit():
+    client = _mock_client()
+    calls = _query_log(client)
+
+    client.get_all_entities(limit=None)
+
+    assert "LIMIT" not in calls[0][0]
@@ -2,15 +2,17 @@
 
 from __future__ import annotations
 
+import json
 from unittest.mock import MagicMock, patch
 
+from src.cache import corpus_generation
 from src.ingestion.pipeline import run_pipeline
 
 
 @patch("src.ingestion.pipeline.Neo4jClient")
 @patch("src.ingestion.pipeline.get_embeddings", return_value=[[0.1] * 768])
 @patch("src.ingestion.pipeline.ChromaStore")
-@patch("src.ingestion.pipeline.load_directory")
+@patch("src.ingestion.pipeline.iter_directory")
 def test_pipeline_runs_end_to_end(mock_load, mock_chroma_cls, mock_embed, mock_neo4j_cls):
     from src.ingestion.loader import Document
 
@@ -20,6 +22,7 @@ def test_pipeline_runs_end_to_end(mock_load, mock_chroma_cls, mock_embed, mock_n
     mock_neo4j = MagicMock()
     mock_neo4j_cls.return_value = mock_neo4j
 
+    generation = corpus_generation.value
     with patch("src.ingestion.pipeline.extract_and_store", return_value=2):
         summary = run_pipeline(data_dir="./data/sample_docs")
 
@@ -28,9 +31,10 @@ def test_pipeline_runs_end_to_end(mock_load, mock_chroma_cls, mock_embed, mock_n
     assert summary["entities"] == 2
     mock_chroma.add.assert_called_once()
     mock_neo4j.close.assert_called_once()
+    assert corpus_generation.value == generation + 1
 
 
-@patch("src.ingestion.pipeline.load_directory", return_value=[])
+@patch("src.ingestion.pipeline.iter_directory", return_value=iter([]))
 def test_pipeline_empty_directory(mock_load):
     summary = run_pipeline(data_dir="./data/empty")
 
@@ -40,7 +44,7 @@ def test_pipeline_empty_directory(mock_load):
 @patch("src.ingestion.pipeline.Neo4jClient", side_effect=ConnectionError("Neo4j down"))
 @patch("src.ingestion.pipeline.get_embeddings", return_value=[[0.1] * 768])
 @patch("src.ingestion.pipeline.ChromaStore")
-@patch("src.ingestion.pipeline.load_directory")
+@patch("src.ingestion.pipeline.iter_directory")
 def test_pipeline_continues_without_neo4j(mock_load, mock_chroma_cls, mock_embed, mock_neo4j_cls):
     from src.ingestion.loader import Document
 
@@ -56,7 +60,7 @@ def test_pipeline_continues_without_neo4j(mock_load, mock_chroma_cls, mock_embed
 @patch("src.ingestion.pipeline.Neo4jClient")
 @patch("src.ingestion.pipeline.get_embeddings", return_value=[[0.1] * 768])
 @patch("src.ingestion.pipeline.ChromaStore")
-@patch("src.ingestion.pipeline.load_directory")
+@patch("src.ingestion.pipeline.iter_directory")
 def test_pipeline_neo4j_closed_on_extraction_error(mock_load, mock_chroma_cls, mock_embed, mock_neo4j_cls):
     """Neo4j driver must be closed even if extraction raises mid-loop."""
     from src.ingestion.loader import Document
@@ -72,3 +76,260 @@ def test_pipeline_neo4j_closed_on_extraction_error(mock_load, mock_chroma_cls, m
     # Key assertion: close() called despite exception
     mock_neo4j.close.assert_called_once()
     assert summary["entities"] == 0
+
+
+# --- Incremental mode ---
+
+
+def _incremental_env(tmp_path, monkeypatch):
+    from src.config import settings
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    monkeypatch.setattr(settings, "ingest_manifest_path", str(tmp_path / "manifest.json"))
+    return docs
+
+
+@patch("src.ingestion.pipeline.extract_and_store", return_value=1)
+@patch("src.ingestion.pipeline.Neo4jClient")
+@patch("src.ingestion.pipeline.get_embeddings", side_effect=lambda texts: [[0.1]] * len(texts))
+@patch("src.ingestion.pipeline.ChromaStore")
+def test_incremental_skips_unchanged_files(mock_chroma_cls, mock_embed, mock_neo4j_cls, mock_extract, tmp_path, monkeypatch):
+    docs = _incremental_env(tmp_path, monkeypatch)
+    (docs / "a.md").write_text("Alpha document")
+    (docs / "b.md").write_text("Bravo document")
+
+    first = run_pipeline(data_dir=str(docs), incremental=True)
+    second = run_pipeline(data_dir=str(docs), incremental=True)
+
+    assert first["documents"] == 2
+    assert second == {"documents": 0, "chunks": 0, "entities": 0, "unchanged": 2, "removed": 0}
+    assert mock_embed.call_count == 1
+    assert mock_extract.call_count == 2
+
+
+@patch("src.ingestion.pipeline.extract_and_store", return_value=1)
+@patch("src.ingestion.pipeline.Neo4jClient")
+@patch("src.ingestion.pipeline.get_embeddings", side_effect=lambda texts: [[0.1]] * len(texts))
+@patch("src.ingestion.pipeline.ChromaStore")
+def test_incremental_cleans_up_changed_and_removed_files(
+    mock_chroma_cls, mock_embed, mock_neo4j_cls, mock_extract, tmp_path, monkeypatch
+):
+    docs = _incremental_env(tmp_path, monkeypatch)
+    changed = docs / "changed.md"
+    removed = docs / "removed.md"
+    changed.write_text("Original text")
+    removed.write_text("Soon gone")
+    mock_chroma = MagicMock()
+    mock_chroma_cls.return_value = mock_chroma
+    mock_neo4j = MagicMock()
+    mock_neo4j_cls.return_value = mock_neo4j
+
+    run_pipeline(data_dir=str(docs), incremental=True)
+    first_ids = mock_chroma.add.call_args.kwargs["ids"]
+    mock_chroma.reset_mock()
+
+    changed.write_text("Rewritten text that is longer")
+    removed.unlink()
+    summary = run_pipeline(data_dir=str(docs), incremental=True)
+
+    assert summary["documents"] == 1
+    assert summary["removed"] == 1
+    # Both original chunks are stale: one was rewritten, the other's file is gone
+    stale = [chunk_id for call in mock_chroma.delete.call_args_list for chunk_id in call.args[0]]
+    assert sorted(stale) == sorted(first_ids)
+    mock_neo4j.delete_document_mentions.assert_called_once_with(str(changed))
+    mock_neo4j.delete_document.assert_called_once_with(str(removed))
+
+
+@patch("src.ingestion.pipeline.extract_and_store", return_value=1)
+@patch("src.ingestion.pipeline.Neo4jClient", side_effect=ConnectionError("Neo4j down"))
+@patch("src.ingestion.pipeline.get_embeddings", side_effect=lambda texts: [[0.1]] * len(texts))
+@patch("src.ingestion.pipeline.ChromaStore")
+def test_incremental_retries_only_the_graph_after_graph_failure(
+    mock_chroma_cls, mock_embed, mock_neo4j_cls, mock_extract, tmp_path, monkeypatch
+):
+    docs = _incremental_env(tmp_path, monkeypatch)
+    (docs / "a.md").write_text("Alpha document")
+    mock_chroma = MagicMock()
+    mock_chroma_cls.return_value = mock_chroma
+
+    run_pipeline(data_dir=str(docs), incremental=True)
+    second = run_pipeline(data_dir=str(docs), incremental=True)
+
+    # Vector-only runs (no Neo4j) do not re-chunk, re-embed or rewrite the file.
+    assert second["documents"] == 0
+    assert second["unchanged"] == 1
+    assert "kg_warning" in second
+    assert mock_embed.call_count == 1
+    mock_chroma.add.assert_called_once()
+
+    # Once Neo4j is back, only the graph stage runs, and only once.
+    mock_neo4j_cls.side_effect = None
+    third = run_pipeline(data_dir=str(docs), incremental=True)
+    fourth = run_pipeline(data_dir=str(docs), incremental=True)
+
+    assert third["graph_retried"] == 1
+    assert third["entities"] == 1
+    assert "graph_retried" not in fourth
+    assert mock_extract.call_count == 1
+    assert mock_embed.call_count == 1
+    mock_chroma.add.assert_called_once()
+
+
+@patch("src.ingestion.pipeline.Neo4jClient", side_effect=ConnectionError("Neo4j down"))
+@patch("src.ingestion.pipeline.get_embeddings", side_effect=lambda texts: [[0.1]] * len(texts))
+@patch("src.ingestion.pipeline.ChromaStore")
+def test_incremental_keeps_removed_files_until_the_graph_forgets_them(
+    mock_chroma_cls, mock_embed, mock_neo4j_cls, tmp_path, monkeypatch
+):
+    docs = _incremental_env(tmp_path, monkeypatch)
+    doc = docs / "a.md"
+    doc.write_text("Alpha document")
+    mock_chroma = MagicMock()
+    mock_chroma_cls.return_value = mock_chroma
+
+    run_pipeline(data_dir=str(docs), incremental=True)
+    doc.unlink()
+    run_pipeline(data_dir=str(docs), incremental=True)
+    mock_chroma.delete.assert_called_once()
+
+    # Still pending in the graph, but the chunks are not deleted twice.
+    assert run_pipeline(data_dir=str(docs), incremental=True)["removed"] == 1
+    mock_chroma.delete.assert_called_once()
+
+    # A file that reappears is ingested again, not mistaken for unchanged.
+    doc.write_text("Alpha document")
+    assert run_pipeline(data_dir=str(docs), incremental=True)["documents"] == 1
+
+
+@patch("src.ingestion.pipeline.Neo4jClient")
+@patch("src.ingestion.pipeline.get_embeddings", side_effect=lambda texts: [[0.1]] * len(texts))
+@patch("src.ingestion.pipeline.ChromaStore")
+@patch("src.ingestion.pipeline.iter_directory")
+def test_pipeline_flushes_in_bounded_batches(mock_iter, mock_chroma_cls, mock_embed, mock_neo4j_cls):
+    from src.ingestion.loader import Document
+
+    mock_iter.return_value = iter(
+        Document(content=f"Document number {i}", metadata={"source": f"d{i}.txt", "type": "text"})
+        for i in range(5)
+    )
+    mock_chroma = MagicMock()
+    mock_chroma_cls.return_value = mock_chroma
+
+    with patch("src.ingestion.pipeline.extract_and_store", return_value=0):
+        summary = run_pipeline(data_dir="./data/sample_docs", flush_size=2)
+
+    assert summary["chunks"] == 5
+    batch_sizes = [len(call.kwargs["ids"]) for call in mock_chroma.add.call_args_list]
+    assert batch_sizes == [2, 2, 1]
+    assert max(len(call.args[0]) for call in mock_embed.call_args_list) == 2
+
+
+@patch("src.ingestion.pipeline.Neo4jClient")
+@patch("src.ingestion.pipeline.get_embeddings", side_effect=lambda texts: [[0.1]] * len(texts))
+@patch("src.ingestion.pipeline.ChromaStore")
+@patch("src.ingestion.pipeline.iter_directory")
+def test_pipeline_chunks_mapped_documents_by_window(mock_iter, mock_chroma_cls, mock_embed, mock_neo4j_cls, tmp_path, monkeypatch):
+    from src.config import settings
+    from src.ingestion.loader import MappedDocument
+
+    monkeypatch.setattr(settings, "lazy_window_bytes", 200)
+    path = tmp_path / "export.txt"
+    path.write_text("\n\n".join(f"Record {i}: " + "value " * 10 for i in range(30)))
+    mock_iter.return_value = iter([MappedDocument(path=path, metadata={"source": str(path), "type": "text"})])
+    mock_chroma = MagicMock()
+    mock_chroma_cls.return_value = mock_chroma
+
+    with patch("src.ingestion.pipeline.extract_and_store", return_value=0) as mock_extract:
+        summary = run_pipeline(data_dir="./data/sample_docs", flush_size=1000)
+
+    ids = mock_chroma.add.call_args.kwargs["ids"]
+    indexes = [m["chunk_index"] for m in mock_chroma.add.call_args.kwargs["metadatas"]]
+    assert summary["documents"] == 1
+    assert summary["chunks"] == len(ids) > 1
+    assert len(set(ids)) == len(ids)
+    assert indexes == list(range(len(indexes)))
+    # Extraction streams chunks covering the whole file, not just a prefix
+    extraction_chunks = list(mock_extract.call_args.args[0])
+    assert extraction_chunks[0].startswith("Record 0:")
+    assert "Record 29:" in extraction_chunks[-1]
+
+
+# --- Deduplication ---
+
+_BOILERPLATE = "Confidential. For internal use by Acme Corp employees only. Do not distribute without approval."
+
+
+@patch("src.ingestion.pipeline.Neo4jClient")
+@patch("src.ingestion.pipeline.get_embeddings", side_effect=lambda texts: [[0.1]] * len(texts))
+@patch("src.ingestion.pipeline.ChromaStore")
+@patch("src.ingestion.pipeline.iter_directory")
+def test_pipeline_skips_duplicate_chunks(mock_iter, mock_chroma_cls, mock_embed, mock_neo4j_cls):
+    from src.ingestion.loader import Document
+
+    mock_iter.return_value = iter(
+        Document(content=_BOILERPLATE, metadata={"source": f"policy{i}.md", "type": "markdown"}) for i in range(3)
+    )
+    mock_chroma = MagicMock()
+    mock_chroma_cls.return_value = mock_chroma
+
+    with patch("src.ingestion.pipeline.extract_and_store", return_value=0):
+        summary = run_pipeline(data_dir="./data/sample_docs", flush_size=1)
+
+    assert summary["chunks"] == 3
+    assert summary["duplicates"] == 2
+    mock_chroma.add.assert_called_once()
+    assert sum(len(call.args[0]) for call in mock_embed.call_args_list) == 1
+    # The canonical chunk was stored before its copies were seen, so its metadata is updated afterwards
+    ids, metadatas = mock_chroma.update_metadata.call_args.args
+    assert ids == mock_chroma.add.call_args.kwargs["ids"]
+    assert metadatas[0]["duplicate_count"] == 2
+    assert json.loads(metadatas[0]["duplicate_locations"]) == ["policy1.md#0", "policy2.md#0"]
+
+
+@patch("src.ingestion.pipeline.Neo4jClient")
+@patch("src.ingestion.pipeline.get_embeddings", side_effect=lambda texts: [[0.1]] * len(texts))
+@patch("src.ingestion.pipeline.ChromaStore")
+@patch("src.ingestion.pipeline.iter_directory")
+def test_pipeline_dedup_can_be_disabled(mock_iter, mock_chroma_cls, mock_embed, mock_neo4j_cls, monkeypatch):
+    from src.config import settings
+    from src.ingestion.loader import Document
+
+    monkeypatch.setattr(settings, "dedup_enabled", False)
+    mock_iter.return_value = iter(
+        Document(content=_BOILERPLATE, metadata={"source": f"policy{i}.md", "type": "markdown"}) for i in range(3)
+    )
+    mock_chroma = MagicMock()
+    mock_chroma_cls.return_value = mock_chroma
+
+    with patch("src.ingestion.pipeline.extract_and_store", return_value=0):
+        summary = run_pipeline(data_dir="./data/sample_docs")
+
+    assert summary["duplicates"] == 0
+    assert len(mock_chroma.add.call_args.kwargs["ids"]) == 3
+
+
+@patch("src.ingestion.pipeline.extract_and_store", return_value=0)
+@patch("src.ingestion.pipeline.Neo4jClient")
+@patch("src.ingestion.pipeline.get_embeddings", side_effect=lambda texts: [[0.1]] * len(texts))
+@patch("src.ingestion.pipeline.ChromaStore")
+def test_incremental_keeps_canonical_chunk_still_referenced(
+    mock_chroma_cls, mock_embed, mock_neo4j_cls, mock_extract, tmp_path, monkeypatch
+):
+    docs = _incremental_env(tmp_path, monkeypatch)
+    (docs / "a.md").write_text(_BOILERPLATE)
+    (docs / "b.md").write_text(_BOILERPLATE)
+    mock_chroma = MagicMock()
+    mock_chroma_cls.return_value = mock_chroma
+
+    run_pipeline(data_dir=str(docs), incremental=True)
+    (canonical,) = mock_chroma.add.call_args.kwargs["ids"]
+    mock_chroma.reset_mock()
+
+    (docs / "a.md").write_text("Completely new content for document a.")
+    run_pipeline(data_dir=str(docs), incremental=True)
+
+    # b.md still maps its copy onto a.md's old chunk, so it must not be deleted
+    deleted = [chunk_id for call in mock_chroma.delete.call_args_list for chunk_id in call.args[0]]
+    assert canonical not in deleted
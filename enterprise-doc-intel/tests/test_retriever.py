@@ -2,9 +2,12 @@
 
 from __future__ import annotations
 
+import threading
+import time
 from unittest.mock import MagicMock, patch
 
-from src.rag.retriever import RetrievalResult, retrieve
+from src.config import settings
+from src.rag.retriever import RetrievalResult, retrieve, start_graph_search
 from src.vectorstore.chroma import SearchResult
 
 
@@ -12,7 +15,7 @@ def _make_search_result(text: str = "chunk", source: str = "doc.md", score: floa
     return SearchResult(id="c1", text=text, metadata={"source": source}, score=score)
 
 
-@patch("src.rag.retriever.get_single_embedding", return_value=[0.1] * 768)
+@patch("src.rag.retriever.get_query_embedding", return_value=[0.1] * 768)
 def test_retrieve_vector_only(mock_embed):
     """Vector search works without neo4j."""
     chroma = MagicMock()
@@ -26,7 +29,7 @@ def test_retrieve_vector_only(mock_embed):
     chroma.search.assert_called_once()
 
 
-@patch("src.rag.retriever.get_single_embedding", return_value=[0.1] * 768)
+@patch("src.rag.retriever.get_query_embedding", return_value=[0.1] * 768)
 @patch("src.rag.retriever.get_graph_context", return_value="'Policy' is related to: VPN")
 @patch("src.rag.retriever.extract_entities_from_query", return_value=["Policy"])
 def test_retrieve_hybrid_with_graph(mock_entities, mock_graph_ctx, mock_embed):
@@ -41,7 +44,7 @@ def test_retrieve_hybrid_with_graph(mock_entities, mock_graph_ctx, mock_embed):
     mock_entities.assert_called_once_with("policy question", neo4j)
 
 
-@patch("src.rag.retriever.get_single_embedding", return_value=[0.1] * 768)
+@patch("src.rag.retriever.get_query_embedding", return_value=[0.1] * 768)
 @patch("src.rag.retriever.extract_entities_from_query", side_effect=RuntimeError("Neo4j down"))
 def test_retrieve_graph_failure_degrades_gracefully(mock_entities, mock_embed):
     """Graph failure should not crash the retrieval."""
@@ -55,7 +58,7 @@ def test_retrieve_graph_failure_degrades_gracefully(mock_entities, mock_embed):
     assert result.graph_context == ""
 
 
-@patch("src.rag.retriever.get_single_embedding", return_value=[0.1] * 768)
+@patch("src.rag.retriever.get_query_embedding", return_value=[0.1] * 768)
 def test_retrieve_empty_results(mock_embed):
     """Empty vector results should return cleanly."""
     chroma = MagicMock()
@@ -65,3 +68,72 @@ def test_retrieve_empty_results(mock_embed):
 
     assert result.vector_results == []
     assert result.graph_context == ""
+
+
+@patch("src.rag.retriever.get_query_embedding", return_value=[0.1] * 768)
+@patch("src.rag.retriever.extract_entities_from_query", return_value=["Policy"])
+def test_retrieve_runs_vector_and_graph_branches_concurrently(mock_entities, mock_embed):
+    """The vector search does not wait for the graph lookup to finish."""
+    graph_started = threading.Event()
+
+    def slow_graph_context(entities, neo4j):
+        graph_started.set()
+        time.sleep(0.2)
+        return "'Policy' is related to: VPN"
+
+    def search(embedding, top_k):
+        # Sequential retrieval would only start the graph branch after this returns.
+        assert graph_started.wait(1)
+        return [_make_search_result()]
+
+    chroma = MagicMock()
+    chroma.search.side_effect = search
+
+    with patch("src.rag.retriever.get_graph_context", side_effect=slow_graph_context):
+        result = retrieve("policy question", chroma, MagicMock(), top_k=3)
+
+    assert len(result.vector_results) == 1
+    assert result.graph_context == "'Policy' is related to: VPN"
+
+
+@patch("src.rag.retriever.get_query_embedding", return_value=[0.1] * 768)
+@patch("src.rag.retriever.extract_entities_from_query", return_value=["Policy"])
+def test_retrieve_drops_graph_context_past_its_deadline(mock_entities, mock_embed, monkeypatch):
+    monkeypatch.setattr(settings, "retrieval_graph_timeout", 0.05)
+    monkeypatch.setattr(settings, "retrieval_vector_timeout", 7)
+    release = threading.Event()
+
+    def stuck_graph_context(entities, neo4j):
+        release.wait(5)
+        return "too late"
+
+    chroma = MagicMock()
+    chroma.search.return_value = [_make_search_result()]
+
+    with patch("src.rag.retriever.get_graph_context", side_effect=stuck_graph_context):
+        result = retrieve("policy question", chroma, MagicMock(), top_k=3)
+        release.set()
+
+    assert len(result.vector_results) == 1
+    assert result.graph_context == ""
+    mock_embed.assert_called_once_with("policy question", timeout=7)
+
+
+@patch("src.rag.retriever.get_graph_context")
+def test_cancelled_graph_search_skips_its_remaining_queries(mock_graph):
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_entities(query, neo4j):
+        started.set()
+        release.wait(5)
+        return ["Policy"]
+
+    with patch("src.rag.retriever.extract_entities_from_query", side_effect=slow_entities):
+        search = start_graph_search("policy question", MagicMock())
+        assert started.wait(5)
+        search.cancel()
+        release.set()
+        assert search.result() == ""
+
+    mock_graph.assert_not_called()